@@ -0,0 +1,138 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from background_task.management.commands.process_tasks import _configure_log_std
+from background_task.models import Task
+from background_task.settings import app_settings
+from background_task.tasks import autodiscover, bg_runner, tasks
+from background_task.utils import SignalManager
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from console.tasks import ADMIN_QUEUE
+from physionet import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TaskPool:
+    """
+    Pool of worker threads running tasks from one queue.
+    """
+    def __init__(self, queue, threads, worker_name):
+        self.queue = queue
+        self.threads = threads
+        self.worker_name = worker_name
+        self.running = set()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f'tasks-{queue}')
+
+    def _next_task(self):
+        """
+        Find and lock the next task that is ready to run.
+        """
+        now = timezone.now()
+        queue_filter = Q(queue=self.queue)
+        if self.queue == ADMIN_QUEUE:
+            queue_filter |= Q(queue=None)
+        ready = Task.objects.unlocked(now).filter(
+            queue_filter, run_at__lte=now, failed_at=None,
+        ).order_by(app_settings.BACKGROUND_TASK_PRIORITY_ORDERING + 'priority', 'run_at')
+        for task in ready[:5]:
+            if task.task_name in tasks._tasks:
+                locked_task = task.lock(self.worker_name)
+                if locked_task:
+                    return locked_task
+        return None
+
+    def _run(self, task):
+        LOGGER.info(f'Running {task} on {self.queue} queue, '
+                    f'after waiting {task.locked_at - task.run_at}')
+        start = time.monotonic()
+        try:
+            bg_runner(tasks._tasks[task.task_name], task)
+        finally:
+            connection.close()
+        duration = time.monotonic() - start
+        metrics.TASK_DURATION.observe(duration, task=task.task_name, queue=self.queue)
+        LOGGER.info(f'Finished {task} in {duration:.1f} seconds')
+
+    def start_next(self):
+        """
+        Start the next task, if a thread is available.
+
+        Return True if a task was started.
+        """
+        self.running = {future for future in self.running if not future.done()}
+        if len(self.running) >= self.threads:
+            return False
+        task = self._next_task()
+        if task is None:
+            return False
+        self.running.add(self.executor.submit(self._run, task))
+        return True
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks, with a separate pool of threads for each queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=int, default=0,
+                            help='Run for this many seconds (0 or less to run forever) - default is 0')
+        parser.add_argument('--sleep', type=float, default=5.0,
+                            help='Sleep for this many seconds when no tasks can be started - default is 5')
+        parser.add_argument('--log-std', action='store_true',
+                            help='Redirect stdout and stderr to the logging system')
+
+    def release_stale_locks(self):
+        """
+        Unlock tasks that were locked by worker processes that are no
+        longer running.
+
+        Otherwise, these tasks would not be retried until MAX_RUN_TIME
+        has elapsed.  Workers are identified by process ID, so this
+        assumes that all workers run on the same host.
+        """
+        for task in Task.objects.exclude(locked_by=None).exclude(locked_by=self.worker_name):
+            if not task.locked_by_pid_running():
+                LOGGER.warning(f'Unlocking {task} (worker {task.locked_by} is not running)')
+                Task.objects.filter(id=task.id, locked_by=task.locked_by).update(
+                    locked_by=None, locked_at=None)
+
+    def handle(self, *args, **options):
+        """
+        Run tasks from each of the queues in settings.BACKGROUND_TASK_QUEUES.
+        """
+        sig_manager = SignalManager()
+        if options['log_std']:
+            _configure_log_std()
+        autodiscover()
+
+        self.worker_name = str(os.getpid())
+        self.release_stale_locks()
+        pools = [TaskPool(queue, threads, self.worker_name)
+                 for (queue, threads) in settings.BACKGROUND_TASK_QUEUES.items()]
+
+        duration = options['duration']
+        start_time = time.time()
+        while duration <= 0 or time.time() - start_time <= duration:
+            if sig_manager.kill_now:
+                break
+            started = False
+            for pool in pools:
+                while pool.start_next():
+                    started = True
+            if not started:
+                close_old_connections()
+                time.sleep(options['sleep'])
+
+        LOGGER.info('Waiting for running tasks to finish')
+        for pool in pools:
+            pool.shutdown()
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('background_task', '0002_auto_20170927_1109'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAssociation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('field', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255)),
+                ('read_only', models.BooleanField()),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='associations', to='background_task.task')),
+            ],
+            options={
+                'default_permissions': (),
+                'indexes': [models.Index(fields=['model', 'value'], name='console_tas_model_31ed2f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+import json
+
+from django.db import migrations
+
+# Tasks that were associated with published projects when
+# TaskAssociation was introduced: task name -> (parameter name,
+# parameter index, read_only).  This must not be updated when tasks
+# are added or changed later; new tasks are associated when they are
+# created (see console.tasks.task_post_save_handler.)
+ASSOCIATED_TASKS = {
+    'console.views.make_zip_background': ('pid', 0, False),
+    'console.views.make_checksum_background': ('pid', 0, False),
+    'console.views.make_signal_pyramids_background': ('pid', 0, True),
+    'console.views.send_files_to_gcp': ('pid', 0, True),
+    'console.views.send_files_to_aws': ('pid', 0, True),
+    'project.modelcomponents.activeproject.move_files_as_readonly': ('pid', 0, False),
+}
+
+
+def add_task_associations(apps, schema_editor):
+    """
+    Record the projects associated with tasks that were already queued.
+    """
+    Task = apps.get_model('background_task', 'Task')
+    TaskAssociation = apps.get_model('console', 'TaskAssociation')
+
+    associations = []
+    tasks = Task.objects.filter(task_name__in=ASSOCIATED_TASKS).exclude(associations__isnull=False)
+    for task in tasks.iterator():
+        (param, param_index, read_only) = ASSOCIATED_TASKS[task.task_name]
+        try:
+            (args, kwargs) = json.loads(task.task_params)
+        except ValueError:
+            continue
+        values = []
+        if len(args) > param_index:
+            values.append(args[param_index])
+        if param in kwargs:
+            values.append(kwargs[param])
+        for value in values:
+            associations.append(TaskAssociation(
+                task=task, model='project.PublishedProject', field='pk',
+                value=str(value), read_only=read_only))
+    TaskAssociation.objects.bulk_create(associations)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('console', '0001_task_association'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_task_associations, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,31 @@
+from background_task.models import Task
 from django.db import models
 
-# Create your models here.
+
+class TaskAssociation(models.Model):
+    """
+    Association between a pending background task and a model instance.
+
+    These are created when a task registered with associated_task() is
+    scheduled, and deleted along with the task, so that the tasks
+    associated with an object can be found with a single query.
+
+    - model is the label of the associated model.
+    - field is the name of a field defined in that model.
+    - value is the value of that field (as a string).
+    - read_only is the flag passed to associated_task().
+    """
+    task = models.ForeignKey(Task, related_name='associations', on_delete=models.CASCADE)
+    model = models.CharField(max_length=100)
+    field = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    read_only = models.BooleanField()
+
+    class Meta:
+        default_permissions = ()
+        indexes = [
+            models.Index(fields=['model', 'value']),
+        ]
+
+    def __str__(self):
+        return f'{self.task} - {self.model} {self.field}={self.value}'
@@ -47,8 +47,14 @@ def required_permission(self):
         view = get_resolver().resolve(self.url).func
         return view.required_permission
 
-    def is_visible(self, request):
-        return self.enabled and request.user.has_perm(self.required_permission)
+    def is_visible(self, permissions):
+        """
+        Check whether the link is visible to a user with the given set
+        of permissions (or None for a superuser.)
+        """
+        if not self.enabled:
+            return False
+        return permissions is None or self.required_permission in permissions
 
     def is_active(self, request):
         return request.path.startswith(self.url)
@@ -80,6 +86,13 @@ class NavMenu:
     """
     def __init__(self, items):
         self.items = items
+        self.links = []
+        for item in items:
+            if isinstance(item, NavSubmenu):
+                if item.enabled:
+                    self.links += [link for link in item.items if link.enabled]
+            elif item.enabled:
+                self.links.append(item)
 
     def get_menu_items(self, request):
         """
@@ -101,7 +114,23 @@ def get_menu_items(self, request):
          - 'icon': icon name
          - 'subitems': list of page links
          - 'active': true if this submenu is currently active
+
+        The menu depends only on the user's permissions and on which
+        links are active, so the result is cached for each combination
+        of those, and should not be modified.
         """
+        user = request.user
+        if not user.is_active:
+            permissions = frozenset()
+        elif user.is_superuser:
+            permissions = None
+        else:
+            permissions = frozenset(user.get_all_permissions())
+        active_links = frozenset(link.name for link in self.links if link.is_active(request))
+        return self._get_menu_items(permissions, active_links)
+
+    @functools.lru_cache(maxsize=256)
+    def _get_menu_items(self, permissions, active_links):
         visible_items = []
 
         for item in self.items:
@@ -118,8 +147,8 @@ def get_menu_items(self, request):
             visible_subitems = []
             active = False
             for subitem in subitems:
-                if subitem.is_visible(request):
-                    subitem_active = subitem.is_active(request)
+                if subitem.is_visible(permissions):
+                    subitem_active = subitem.name in active_links
                     active = active or subitem_active
                     visible_subitems.append({
                         'title': subitem.title,
@@ -212,6 +241,8 @@ def get_menu_items(self, request):
         NavLink(_('Editorial'), 'editorial_stats'),
         NavLink(_('Credentialing'), 'credentialing_stats'),
         NavLink(_('Submissions'), 'submission_stats'),
+        NavLink(_('Task queues'), 'task_queues'),
+        NavLink(_('Profiling'), 'profiling'),
         NavLink(_('Export data'), 'downloads'),
     ]),
 
@@ -1,14 +1,44 @@
+import datetime as dt
 import inspect
-import json
+from statistics import median
 
-from background_task.models import Task, task_failed, task_rescheduled
+from background_task.models import CompletedTask, Task, task_failed, task_rescheduled
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 import notification.utility as notification
+from console.models import TaskAssociation
+
+# Background task queues.  Each queue is run by its own pool of worker
+# threads (see the process_task_queues command), so that long-running
+# tasks in one queue cannot delay tasks in another.  The number of
+# threads for each queue is set by settings.BACKGROUND_TASK_QUEUES.
+
+# Tasks that read or write large amounts of project files
+FILES_QUEUE = 'files'
+# CPU-intensive tasks
+COMPUTE_QUEUE = 'compute'
+# Short administrative tasks (and tasks scheduled without a queue)
+ADMIN_QUEUE = 'admin'
+# Delivery of outgoing email (see notification.tasks)
+EMAIL_QUEUE = 'email'
+
+# Task priorities, within a queue
+HIGH_PRIORITY = 10
+LOW_PRIORITY = -10
 
 _model_tasks = {}
 
 
+class TaskConflict(Exception):
+    """
+    A task cannot be scheduled because of another pending task.
+    """
+
+
 def register_associated_task(task_name, model, param, param_index, *,
                              read_only=False, field='pk'):
     """
@@ -26,10 +56,10 @@ def register_associated_task(task_name, model, param, param_index, *,
       parameter is keyword-only.)
     - read_only is true if the task is "read-only".
 
-    This allows get_tasks() to identify tasks that are associated with
-    a particular model instance.  Note that a single task name may
-    have multiple (read-only and/or read-write) associations for
-    different function parameters.
+    This allows get_associated_tasks() to identify tasks that are
+    associated with a particular model instance.  Note that a single
+    task name may have multiple (read-only and/or read-write)
+    associations for different function parameters.
     """
     if not isinstance(model, str):
         model = model._meta.label
@@ -52,15 +82,16 @@ def associated_task(model, param, *, read_only=False, field='pk'):
     - param is the name of a parameter of the decorated function.
     - read_only is True if the task is "read-only".
 
-    This allows get_tasks() to identify tasks that are associated with
-    a particular model instance.
+    This allows get_associated_tasks() to identify tasks that are
+    associated with a particular model instance.
 
-    Conceptually, this should be regarded as an advisory lock on the
-    object, in that multiple "read-only" tasks may be invoked in
-    parallel, but callers should not invoke any "read-write" task
-    while another task is pending.  This is NOT ENFORCED in any way;
-    indeed, there is nothing preventing the object itself from being
-    deleted before the task has an opportunity to run.
+    Conceptually, this should be regarded as a lock on the object, in
+    that multiple "read-only" tasks may be invoked in parallel, but
+    callers should not invoke any "read-write" task while another task
+    is pending.  Scheduling a task that would violate this rule raises
+    TaskConflict, so callers should check get_associated_tasks()
+    first.  Note that there is nothing preventing the object itself
+    from being deleted before the task has an opportunity to run.
 
     This decorator may be used multiple times to define associations
     for multiple function parameters.
@@ -111,43 +142,164 @@ def get_associated_tasks(instance, *, read_only=None):
     If read_only is True, return only "read-only" tasks.  If read_only
     is False, return only "read-write" tasks.
 
-    The order that tasks are returned is unspecified.  Note that if a
+    Tasks are returned in order of task name.  Note that if a
     particular task has multiple associations defined, that task may
     conceivably appear multiple times in the sequence.
     """
-
     model = type(instance)._meta.label
+    fields = {p[0] for param_info in _model_tasks.get(model, {}).values()
+              for p in param_info}
+    if not fields:
+        return
+
+    match = Q()
+    for field in sorted(fields):
+        match |= Q(field=field, value=str(getattr(instance, field)))
+    associations = TaskAssociation.objects.filter(match, model=model)
+    if read_only is not None:
+        associations = associations.filter(read_only=read_only)
+    associations = associations.select_related('task').order_by('task__task_name', 'id')
+    for association in associations:
+        yield (association.task, association.read_only)
+
+
+def _task_associations(task):
+    """
+    Determine the model instances that a task is associated with.
+
+    This function returns a list of unsaved TaskAssociation objects,
+    based on the task's name and parameters.
+    """
+    associations = []
+    (args, kwargs) = task.params()
+    for (model, task_info) in sorted(_model_tasks.items()):
+        for (field, param, param_index, ro_flag) in task_info.get(task.task_name, []):
+            values = []
+            try:
+                values.append(args[param_index])
+            except (TypeError, IndexError):
+                pass
+            try:
+                values.append(kwargs[param])
+            except KeyError:
+                pass
+            for value in values:
+                associations.append(TaskAssociation(
+                    model=model, field=field, value=str(value), read_only=ro_flag))
+    return associations
+
+
+@receiver(pre_save, sender=Task)
+def task_pre_save_handler(sender, instance, raw=False, **kwargs):
+    """
+    Check that a new task does not conflict with pending tasks
+
+    A read-write task conflicts with any other task associated with
+    the same object; a read-only task conflicts with read-write tasks.
+    The next repetition of a repeating task (which is scheduled before
+    the current one is deleted) is not considered to conflict with it.
+    """
+    if raw or not instance._state.adding:
+        return
+    associations = _task_associations(instance)
+    instance._associations = associations
+    if not associations:
+        return
+
+    conflicts = Q()
+    for association in associations:
+        match = Q(model=association.model, field=association.field, value=association.value)
+        if association.read_only:
+            match &= Q(read_only=False)
+        conflicts |= match
+    pending = TaskAssociation.objects.filter(conflicts)
+    if instance.is_repeating_task():
+        pending = pending.exclude(task__task_hash=instance.task_hash)
+    conflict = pending.select_related('task').first()
+    if conflict:
+        raise TaskConflict('Cannot schedule {} while {} is pending'.format(
+            instance, conflict.task))
+
+
+@receiver(post_save, sender=Task)
+def task_post_save_handler(sender, instance, created, raw=False, **kwargs):
+    """
+    Record the model instances that a new task is associated with
+    """
+    if raw or not created:
+        return
+    associations = getattr(instance, '_associations', None)
+    if associations is None:
+        associations = _task_associations(instance)
+    for association in associations:
+        association.task = instance
+    TaskAssociation.objects.bulk_create(associations)
+
 
-    # Consider all possible task_names that might be associated with
-    # this object.
-    for (task_name, param_info) in sorted(_model_tasks[model].items()):
-
-        # If we are only interested in read-only tasks, skip checking
-        # read-write parameters, and vice versa.
-        if read_only is not None:
-            param_info = [p for p in param_info if p[3] == read_only]
-        if not param_info:
-            continue
-
-        # Scan all pending tasks with this task_name.
-        tasks = Task.objects.filter(task_name=task_name)
-        for task in tasks:
-            # Parse the given task's arguments (stored in task_params
-            # as a JSON string) and check whether they match the given
-            # instance.
-            (args, kwargs) = json.loads(task.task_params)
-            for (field, param, param_index, ro_flag) in param_info:
-                value = getattr(instance, field)
-                try:
-                    if value == args[param_index]:
-                        yield (task, ro_flag)
-                except (TypeError, IndexError):
-                    pass
-                try:
-                    if value == kwargs[param]:
-                        yield (task, ro_flag)
-                except KeyError:
-                    pass
+def queue_statistics(now=None):
+    """
+    Summarize the current state of each background task queue.
+
+    This function returns a list of dictionaries, one per queue, with
+    the following keys:
+
+    - queue: the queue name.
+    - threads: the number of tasks that may run concurrently.
+    - waiting: the number of tasks ready to run but not yet started.
+    - max_wait: the time since the oldest waiting task became ready.
+    - scheduled: the number of tasks scheduled to run in the future.
+    - running: the number of tasks currently running.
+    - completed: the number of tasks completed in the past day.
+    - median_run_time, max_run_time: the run times of those tasks.
+    """
+    if now is None:
+        now = timezone.now()
+
+    def new_queue(queue, threads):
+        return {
+            'queue': queue, 'threads': threads, 'waiting': 0, 'max_wait': None,
+            'scheduled': 0, 'running': 0, 'completed': 0,
+            'median_run_time': None, 'max_run_time': None,
+        }
+
+    stats = {queue: new_queue(queue, threads)
+             for (queue, threads) in settings.BACKGROUND_TASK_QUEUES.items()}
+
+    def queue_stats(queue):
+        queue = queue or ADMIN_QUEUE
+        if queue not in stats:
+            # Not processed by any worker
+            stats[queue] = new_queue(queue, 0)
+        return stats[queue]
+
+    locked = set(Task.objects.locked(now).values_list('id', flat=True))
+    pending = Task.objects.filter(failed_at=None).values_list('id', 'queue', 'run_at')
+    for (task_id, queue, run_at) in pending:
+        info = queue_stats(queue)
+        if task_id in locked:
+            info['running'] += 1
+        elif run_at > now:
+            info['scheduled'] += 1
+        else:
+            info['waiting'] += 1
+            if info['max_wait'] is None or now - run_at > info['max_wait']:
+                info['max_wait'] = now - run_at
+
+    # CompletedTask.run_at is the time the task finished, and locked_at
+    # is the time it started.
+    run_times = {}
+    completed = CompletedTask.objects.filter(
+        run_at__gte=now - dt.timedelta(days=1), failed_at=None,
+    ).exclude(locked_at=None).values_list('queue', 'locked_at', 'run_at')
+    for (queue, started, finished) in completed:
+        run_times.setdefault(queue or ADMIN_QUEUE, []).append(finished - started)
+    for (queue, times) in run_times.items():
+        info = queue_stats(queue)
+        info['completed'] = len(times)
+        info['median_run_time'] = median(times)
+        info['max_run_time'] = max(times)
+
+    return list(stats.values())
 
 
 @receiver(task_rescheduled, sender=Task)
@@ -0,0 +1,118 @@
+from django.contrib.auth.models import Group, Permission
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from console.navbar import CONSOLE_NAV_MENU
+from user.models import User
+from user.test_views import TestMixin
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-navbar',
+    }
+}
+
+
+def link_names(menu_items):
+    names = []
+    for item in menu_items:
+        names += [subitem['name'] for subitem in item.get('subitems', [item])]
+    return names
+
+
+def active_names(menu_items):
+    names = []
+    for item in menu_items:
+        names += [subitem['name'] for subitem in item.get('subitems', [item]) if subitem['active']]
+    return names
+
+
+@override_settings(CACHES=TEST_CACHES, PERMISSION_CACHE_TIMEOUT=60)
+class TestNavMenu(TestMixin):
+    """
+    Test the console navigation menu and the permission cache.
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.get(username='rgmark')
+        self.group = Group.objects.create(name='Statistics')
+        self.group.permissions.add(Permission.objects.get(codename='can_view_stats'))
+
+    def menu(self, user, path):
+        request = RequestFactory().get(path)
+        request.user = user
+        return CONSOLE_NAV_MENU.get_menu_items(request)
+
+    def test_visible_links(self):
+        """
+        Check that links are shown according to the user's permissions.
+        """
+        path = reverse('task_queues')
+        self.assertNotIn('task_queues', link_names(self.menu(User.objects.get(username='rgmark'), path)))
+
+        self.user.groups.add(self.group)
+        menu = self.menu(User.objects.get(username='rgmark'), path)
+        self.assertIn('task_queues', link_names(menu))
+        self.assertNotIn('submitted_projects', link_names(menu))
+        self.assertEqual(active_names(menu), ['task_queues'])
+        self.assertTrue(next(item for item in menu if item['name'] == 'stats')['active'])
+
+        admin = User.objects.get(username='admin')
+        menu = self.menu(admin, reverse('console_home'))
+        self.assertIn('submitted_projects', link_names(menu))
+        self.assertEqual(active_names(menu), ['console_home'])
+
+    def test_menu_cache(self):
+        """
+        Check that menus are reused for users with the same permissions.
+        """
+        admin = User.objects.get(username='admin')
+        path = reverse('submitted_projects')
+        first = self.menu(admin, path)
+        hits = CONSOLE_NAV_MENU._get_menu_items.cache_info().hits
+        admin = User.objects.get(username='admin')
+        with self.assertNumQueries(0):
+            second = self.menu(admin, path)
+        self.assertIs(first, second)
+        self.assertEqual(CONSOLE_NAV_MENU._get_menu_items.cache_info().hits, hits + 1)
+        self.assertIsNot(self.menu(admin, reverse('published_projects')), first)
+
+    def test_permission_cache(self):
+        """
+        Check that permissions are cached, and invalidated when changed.
+        """
+        self.assertFalse(User.objects.get(username='rgmark').has_perm('project.can_view_stats'))
+        user = User.objects.get(username='rgmark')
+        with self.assertNumQueries(0):
+            self.assertFalse(user.has_perm('project.can_view_stats'))
+
+        # Adding the user to a group
+        self.user.groups.add(self.group)
+        self.assertTrue(User.objects.get(username='rgmark').has_perm('project.can_view_stats'))
+
+        # Changing the group's permissions
+        self.group.permissions.clear()
+        self.assertFalse(User.objects.get(username='rgmark').has_perm('project.can_view_stats'))
+
+        # Adding users to the group from the other side
+        self.group.permissions.add(Permission.objects.get(codename='can_view_stats'))
+        self.group.user_set.remove(self.user)
+        self.assertFalse(User.objects.get(username='rgmark').has_perm('project.can_view_stats'))
+        self.group.user_set.add(self.user)
+        self.assertTrue(User.objects.get(username='rgmark').has_perm('project.can_view_stats'))
+
+        # Deactivating the user
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(User.objects.get(username='rgmark').has_perm('project.can_view_stats'))
+
+    def test_console_page(self):
+        """
+        Check that the menu is shown in console pages.
+        """
+        self.user.groups.add(self.group)
+        self.client.login(username='rgmark', password='Tester11!')
+        response = self.client.get(reverse('task_queues'))
+        self.assertContains(response, 'id="nav_task_queues"')
+        self.assertNotContains(response, 'id="nav_submitted_projects"')
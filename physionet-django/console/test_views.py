@@ -5,7 +5,10 @@
 
 
 import requests_mock
+from background_task.models import Task
 from background_task.tasks import tasks
+from console.tasks import TaskConflict, get_associated_tasks, queue_statistics
+from console.views import make_checksum_background, make_signal_pyramids_background, make_zip_background
 from django.contrib.sites.models import Site
 from django.test import TestCase
 from django.test.utils import get_runner
@@ -631,6 +634,66 @@ def test_update_doi(self, mocker):
                              project.publish_datetime.year)
             self.assertEqual(attributes['url'], core_url)
 
+    def test_associated_tasks(self):
+        """
+        Test finding and locking tasks associated with a published project.
+        """
+        self.client.login(username='admin', password='Tester11!')
+
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        other_project = PublishedProject.objects.get(slug='demopsn', version='1.0')
+        management_url = reverse('manage_published_project',
+                                 args=(project.slug, project.version))
+
+        response = self.client.post(management_url, data={'make_zip': ''})
+        self.assertEqual(response.status_code, 200)
+        tasks = list(get_associated_tasks(project))
+        self.assertEqual([(task.task_name, ro) for (task, ro) in tasks],
+                         [('console.views.make_zip_background', False)])
+        self.assertEqual(list(get_associated_tasks(project, read_only=True)), [])
+        self.assertEqual(list(get_associated_tasks(other_project)), [])
+
+        # Read-write tasks exclude all other tasks
+        response = self.client.post(management_url, data={'make_checksum_file': ''})
+        self.assertContains(response, 'Project has tasks pending.')
+        with self.assertRaises(TaskConflict):
+            make_signal_pyramids_background(pid=project.id)
+        make_signal_pyramids_background(pid=other_project.id)
+
+        # Read-only tasks exclude only read-write tasks
+        make_signal_pyramids_background(pid=other_project.id)
+        with self.assertRaises(TaskConflict):
+            make_zip_background(pid=other_project.id)
+
+        tasks[0][0].delete()
+        self.assertEqual(list(get_associated_tasks(project)), [])
+        make_signal_pyramids_background(pid=project.id)
+
+    def test_task_queues(self):
+        """
+        Test scheduling tasks on named queues and reporting queue status.
+        """
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        make_signal_pyramids_background(pid=project.id)
+        make_zip_background(pid=PublishedProject.objects.get(slug='demopsn', version='1.0').id)
+        make_checksum_background(pid=PublishedProject.objects.get(slug='demowave', version='1.0.0').id)
+
+        stats = {queue['queue']: queue for queue in queue_statistics()}
+        self.assertEqual(list(stats), ['files', 'compute', 'admin', 'email'])
+        self.assertEqual((stats['files']['waiting'], stats['compute']['waiting'], stats['admin']['waiting']),
+                         (2, 1, 0))
+        self.assertEqual(stats['files']['completed'], 0)
+
+        # Tasks run in order of priority within a queue
+        files_tasks = Task.objects.filter(queue='files').order_by('-priority')
+        self.assertEqual([task.task_name for task in files_tasks],
+                         ['console.views.make_checksum_background', 'console.views.make_zip_background'])
+
+        self.client.login(username='admin', password='Tester11!')
+        response = self.client.get(reverse('task_queues'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<td>compute</td>', html=True)
+
 
 class TestStaticPage(TestMixin):
     """ Test that all views are behaving as expected """
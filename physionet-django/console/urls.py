@@ -105,6 +105,9 @@
     path('usage/editorial/stats/', views.editorial_stats, name='editorial_stats'),
     path('usage/credentialing/stats/', views.credentialing_stats, name='credentialing_stats'),
     path('usage/submission/stats/', views.submission_stats, name='submission_stats'),
+    path('usage/tasks/', views.task_queues, name='task_queues'),
+    path('usage/profiles/', views.profiling, name='profiling'),
+    path('usage/profiles/<profile_id>/', views.profile_file, name='profile_file'),
     path('downloads/', views.downloads, name='downloads'),
     path('download/users/', views.download_users, name='download_users'),
     path('download/projects/', views.download_projects, name='download_projects'),
@@ -205,6 +208,11 @@
     'submission_info': {
         'project_slug': 'p7TCIMkltNswuOB9FZH1',
     },
+    # Profiles are only created on request
+    'profile_file': {
+        'profile_id': '0' * 32,
+        '_skip_': True,
+    },
     # Missing demo data (projects in appropriate submission states)
     'edit_submission': {
         'project_slug': 'xxxxxxxxxxxxxxxxxxxx',
@@ -8,7 +8,16 @@
 
 import notification.utility as notification
 from background_task import background
-from console.tasks import associated_task, get_associated_tasks
+from background_task.models import Task
+from console.tasks import (
+    ADMIN_QUEUE,
+    COMPUTE_QUEUE,
+    FILES_QUEUE,
+    LOW_PRIORITY,
+    associated_task,
+    get_associated_tasks,
+    queue_statistics,
+)
 from dal import autocomplete
 from django.conf import settings
 from django.contrib import messages
@@ -17,8 +26,8 @@
 from django.contrib.contenttypes.forms import generic_inlineformset_factory
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.redirects.models import Redirect
-from django.db.models import Count, DurationField, F, Q, Prefetch
-from django.db.models.functions import Cast, TruncDate
+from django.db.models import Count, DurationField, F, Q, Prefetch, Sum, Value
+from django.db.models.functions import Cast, Coalesce, TruncDate
 from django.forms import Select, Textarea, modelformset_factory
 from django.forms.models import model_to_dict
 from django.http import Http404, HttpResponse, JsonResponse, HttpResponseRedirect, StreamingHttpResponse
@@ -32,14 +41,16 @@
 from notification.models import News
 from physionet.forms import set_saved_fields_cookie
 from physionet.middleware.maintenance import ServiceUnavailable
-from physionet.utility import paginate
+from physionet.middleware.profiling import list_profiles, make_profile_token, profile_path
+from physionet.pagination import cursor_paginate
+from physionet.utility import paginate, serve_file
 from physionet.models import FrontPageButton, Section, StaticPage
 from project import forms as project_forms
 from project.models import (
     GCP,
     GCPLog,
     AWS,
-    AccessLog,
+    AccessLogSummary,
     AccessPolicy,
     ActiveProject,
     DataAccess,
@@ -90,7 +101,7 @@
 
 
 @associated_task(PublishedProject, 'pid')
-@background()
+@background(queue=FILES_QUEUE, schedule={'priority': LOW_PRIORITY})
 def make_zip_background(pid):
     """
     Schedule a background task to make the zip file
@@ -102,7 +113,7 @@ def make_zip_background(pid):
 
 
 @associated_task(PublishedProject, 'pid')
-@background()
+@background(queue=FILES_QUEUE)
 def make_checksum_background(pid):
     """
     Schedule a background task to make the checksum file
@@ -113,6 +124,16 @@ def make_checksum_background(pid):
     project.set_storage_info()
 
 
+@associated_task(PublishedProject, 'pid', read_only=True)
+@background(queue=COMPUTE_QUEUE)
+def make_signal_pyramids_background(pid):
+    """
+    Schedule a background task to make the signal pyramids
+    """
+    project = PublishedProject.objects.get(id=pid)
+    project.make_signal_pyramids()
+
+
 def handling_editor(base_view):
     """
     Access decorator. The user must be the editor of the project.
@@ -573,7 +594,7 @@ def copyedit_submission(request, project_slug, *args, **kwargs):
         dir_breadcrumbs,
         _,
         file_error
-    ) = get_project_file_info(project=project, subdir=subdir)
+    ) = get_project_file_info(project=project, subdir=subdir, request=request)
 
     (upload_files_form, create_folder_form, rename_item_form,
      move_items_form, delete_items_form) = get_file_forms(
@@ -831,7 +852,7 @@ def unsubmitted_projects(request):
     """
     projects = ActiveProject.objects.filter(submission_status=SubmissionStatus.UNSUBMITTED).order_by(
         'creation_datetime')
-    projects = paginate(request, projects, 50)
+    projects = cursor_paginate(request, projects, 50)
     return render(request, 'console/unsubmitted_projects.html',
                   {'projects': projects})
 
@@ -842,13 +863,13 @@ def published_projects(request):
     List of published projects
     """
     projects = PublishedProject.objects.all().order_by('-publish_datetime')
-    projects = paginate(request, projects, 50)
+    projects = cursor_paginate(request, projects, 50)
     return render(request, 'console/published_projects.html',
                   {'projects': projects})
 
 
 @associated_task(PublishedProject, 'pid', read_only=True)
-@background()
+@background(queue=FILES_QUEUE, schedule={'priority': LOW_PRIORITY})
 def send_files_to_gcp(pid):
     """
     Schedule a background task to send the files to GCP.
@@ -867,7 +888,7 @@ def send_files_to_gcp(pid):
 
 
 @associated_task(PublishedProject, "pid", read_only=True)
-@background()
+@background(queue=FILES_QUEUE, schedule={'priority': LOW_PRIORITY})
 def send_files_to_aws(pid):
     """
     Upload project files to AWS S3 buckets.
@@ -895,8 +916,10 @@ def send_files_to_aws(pid):
     project.aws.save()
 
 
-@associated_task(PublishedProject, "pid", read_only=True)
-@background()
+# This task is deliberately not associated with the project: it only
+# changes the bucket policy, not the project's files, so it must never
+# be refused or delayed because of other tasks (see sign_dua)
+@background(queue=ADMIN_QUEUE)
 def update_aws_bucket_policy(pid):
     """
     Update the AWS S3 bucket's access policy based on the
@@ -1045,6 +1068,17 @@ def manage_published_project(request, project_slug, version):
                     verbose_name='Making zip file - {}'.format(project))
                 messages.success(
                     request, 'The zip of the main files has been scheduled.')
+        elif 'make_signal_pyramids' in request.POST:
+            if any(get_associated_tasks(project)):
+                messages.error(request, 'Project has tasks pending.')
+            elif settings.SYSTEM_MAINTENANCE_NO_UPLOAD:
+                raise ServiceUnavailable()
+            else:
+                make_signal_pyramids_background(
+                    pid=project.id,
+                    verbose_name='Making signal pyramids - {}'.format(project))
+                messages.success(
+                    request, 'The signal pyramids have been scheduled.')
         elif 'deprecate_files' in request.POST and not project.deprecated_files:
             deprecate_form = forms.DeprecateFilesForm(data=request.POST)
             if settings.SYSTEM_MAINTENANCE_NO_UPLOAD:
@@ -1147,6 +1181,7 @@ def manage_published_project(request, project_slug, version):
             'publication_form': publication_form,
             'can_make_zip': project.files.can_make_zip(),
             'can_make_checksum': project.files.can_make_checksum(),
+            'can_make_signal_pyramids': project.has_wfdb and project.files.can_make_signal_pyramids(),
         },
     )
 
@@ -1290,7 +1325,7 @@ def archived_submissions(request):
     """
     projects = ActiveProject.objects.filter(submission_status=SubmissionStatus.ARCHIVED
                                             ).order_by('creation_datetime')
-    projects = paginate(request, projects, 50)
+    projects = cursor_paginate(request, projects, 50)
     return render(request, 'console/archived_submissions.html',
                   {'projects': projects})
 
@@ -1314,7 +1349,7 @@ def users(request, group='all'):
     elif group == 'inactive':
         user_list = user_list.filter(is_active=False)
 
-    users = paginate(request, user_list, 50)
+    users = cursor_paginate(request, user_list, 50)
 
     return render(request, 'console/users.html', {'users': users, 'group': group})
 
@@ -1433,7 +1468,7 @@ def users_search(request, group):
         users = users.order_by('username')
 
         if len(search_field) == 0:
-            users = paginate(request, users, 50)
+            users = cursor_paginate(request, users, 50)
 
         return render(request, 'console/users_list.html', {'users': users,
                                                            'group': group})
@@ -1701,6 +1736,30 @@ def view_credential_application(request, application_slug):
                    'form': form, 'CredentialApplication': CredentialApplication})
 
 
+def approved_credential_applications():
+    """
+    Return querysets of accepted credential applications and migrated
+    legacy credentials.
+
+    Both are ordered by approval date, most recent first, so that they
+    can be listed together using cursor_paginate.
+    """
+    successful_apps = (CredentialApplication.objects.filter(
+        status=CredentialApplication.Status.ACCEPTED)
+                       .annotate(approval_datetime=Coalesce('decision_datetime', 'application_datetime'))
+                       .order_by('-approval_datetime', '-id')
+                       .select_related('user__profile', 'responder__profile'))
+
+    legacy_apps = (LegacyCredential.objects.filter(migrated=True,
+                                                   migrated_user__is_credentialed=True)
+                   .annotate(approval_datetime=Coalesce('migration_date', 'migrated_user__credential_datetime',
+                                                        Value(timezone.make_aware(datetime(1970, 1, 1)))))
+                   .order_by('-approval_datetime', '-id')
+                   .select_related('migrated_user__profile'))
+
+    return successful_apps, legacy_apps
+
+
 @console_permission_required('user.change_credentialapplication')
 def credential_applications(request, status):
     """
@@ -1746,33 +1805,24 @@ def credential_applications(request, status):
                                'u_applications': unsuccessful_apps,
                                'p_applications': pending_apps})
 
-    legacy_apps = (LegacyCredential.objects.filter(migrated=True,
-                                                   migrated_user__is_credentialed=True)
-                   .order_by('-migration_date')
-                   .select_related('migrated_user__profile'))
-
-    successful_apps = (CredentialApplication.objects.filter(
-        status=CredentialApplication.Status.ACCEPTED).
-                       order_by('-decision_datetime')
-                       .select_related('user__profile', 'responder__profile'))
+    successful_apps, legacy_apps = approved_credential_applications()
 
     unsuccessful_apps = CredentialApplication.objects.filter(
         status__in=[CredentialApplication.Status.REJECTED,
                     CredentialApplication.Status.WITHDRAWN,
                     CredentialApplication.Status.REVOKED]
-    ).order_by('-decision_datetime').select_related('user__profile', 'responder')
+    ).annotate(
+        decision_date=Coalesce('decision_datetime', 'application_datetime')
+    ).order_by('-decision_date', '-id').select_related('user__profile', 'responder')
 
     pending_apps = (CredentialApplication.objects.filter(
         status=CredentialApplication.Status.PENDING)
                     .order_by('-application_datetime')
                     .select_related('user__profile', 'credential_review'))
 
-    # Merge legacy applications and new applications
-    all_successful_apps = list(chain(successful_apps, legacy_apps))
-
-    all_successful_apps = paginate(request, all_successful_apps, 50)
-    unsuccessful_apps = paginate(request, unsuccessful_apps, 50)
-    pending_apps = paginate(request, pending_apps, 50)
+    all_successful_apps = cursor_paginate(request, [successful_apps, legacy_apps], 50)
+    unsuccessful_apps = cursor_paginate(request, unsuccessful_apps, 50)
+    pending_apps = cursor_paginate(request, pending_apps, 50)
 
     return render(request, 'console/credential_applications.html',
                   {'applications': all_successful_apps,
@@ -1791,23 +1841,22 @@ def search_credential_applications(request):
     if request.POST:
         search_field = request.POST['search']
         pending_status = CredentialApplication.Status.PENDING
-        accepted_status = CredentialApplication.Status.ACCEPTED
         rejected_status = CredentialApplication.Status.REJECTED
         withdrawn_status = CredentialApplication.Status.WITHDRAWN
 
-        legacy_apps = (LegacyCredential.objects.filter(
-            Q(migrated=True)
-            & Q(migrated_user__is_credentialed=True)
-            & (Q(migrated_user__username__icontains=search_field)
-               | Q(migrated_user__profile__first_names__icontains=search_field)
-               | Q(migrated_user__profile__last_name__icontains=search_field)
-               | Q(migrated_user__email__icontains=search_field))).order_by('-migration_date'))
-
-        successful_apps = CredentialApplication.objects.filter(
-            Q(status=accepted_status) & (Q(user__username__icontains=search_field)
-                                         | Q(user__profile__first_names__icontains=search_field)
-                           | Q(user__profile__last_name__icontains=search_field)
-                           | Q(user__email__icontains=search_field))).order_by('-application_datetime')
+        successful_apps, legacy_apps = approved_credential_applications()
+
+        legacy_apps = legacy_apps.filter(
+            Q(migrated_user__username__icontains=search_field)
+            | Q(migrated_user__profile__first_names__icontains=search_field)
+            | Q(migrated_user__profile__last_name__icontains=search_field)
+            | Q(migrated_user__email__icontains=search_field))
+
+        successful_apps = successful_apps.filter(
+            Q(user__username__icontains=search_field)
+            | Q(user__profile__first_names__icontains=search_field)
+            | Q(user__profile__last_name__icontains=search_field)
+            | Q(user__email__icontains=search_field))
 
         unsuccessful_apps = CredentialApplication.objects.filter(
             Q(status__in=[rejected_status, withdrawn_status])
@@ -1821,13 +1870,14 @@ def search_credential_applications(request):
                            | Q(user__profile__last_name__icontains=search_field)
                            | Q(user__email__icontains=search_field))).order_by('-application_datetime')
 
-        # Merge legacy applications with new applications
-        all_successful_apps = list(chain(successful_apps, legacy_apps))
-
         if len(search_field) == 0:
-            all_successful_apps = paginate(request, all_successful_apps, 50)
-            unsuccessful_apps = paginate(request, unsuccessful_apps, 50)
-            pending_apps = paginate(request, pending_apps, 50)
+            all_successful_apps = cursor_paginate(request, [successful_apps, legacy_apps], 50)
+            unsuccessful_apps = cursor_paginate(request, unsuccessful_apps, 50)
+            pending_apps = cursor_paginate(request, pending_apps, 50)
+        else:
+            # Merge legacy applications with new applications
+            all_successful_apps = sorted(chain(successful_apps, legacy_apps),
+                                         key=lambda app: app.approval_datetime, reverse=True)
 
         return all_successful_apps, unsuccessful_apps, pending_apps
 
@@ -1892,7 +1942,7 @@ def training_list(request, status):
         request,
         'console/training_list.html',
         {
-            'trainings': paginate(request, display_training, 50),
+            'trainings': cursor_paginate(request, display_training, 50),
             'training_types': training_types,
             'status': status,
             'review_count': review_training.count(),
@@ -1921,7 +1971,7 @@ def search_training_applications(request, display_training):
 
     # prevent formatting issue if search field is empty
     if len(search_field) == 0:
-        display_training = paginate(request, display_training, 50)
+        display_training = cursor_paginate(request, display_training, 50)
 
     return display_training
 
@@ -2218,6 +2268,42 @@ def editorial_stats(request):
                   'submenu': 'editorial', 'stats': stats})
 
 
+@console_permission_required('project.can_view_stats')
+def task_queues(request):
+    """
+    Status of the background task queues.
+    """
+    running_tasks = Task.objects.exclude(locked_by=None).order_by('locked_at')
+    return render(request, 'console/task_queues.html', {
+        'queues': queue_statistics(), 'running_tasks': running_tasks, 'now': timezone.now()})
+
+
+@console_permission_required('project.can_view_stats')
+def profiling(request):
+    """
+    Create tokens for profiling requests, and list saved profiles.
+    """
+    profiles = [(profile_id, datetime.fromtimestamp(mtime, tz=timezone.get_current_timezone()), size)
+                for (profile_id, mtime, size) in list_profiles()]
+    return render(request, 'console/profiling.html', {
+        'enabled': bool(settings.PROFILING_DIR),
+        'token': make_profile_token(request.user),
+        'token_max_age': timezone.timedelta(seconds=settings.PROFILING_TOKEN_MAX_AGE),
+        'profiles': profiles,
+    })
+
+
+@console_permission_required('project.can_view_stats')
+def profile_file(request, profile_id):
+    """
+    Download a saved profile, in speedscope format.
+    """
+    path = profile_path(profile_id)
+    if not settings.PROFILING_DIR or path is None or not os.path.exists(path):
+        raise Http404()
+    return serve_file(path, attach=True)
+
+
 @console_permission_required('project.can_view_stats')
 def credentialing_stats(request):
     """
@@ -2684,7 +2770,7 @@ def project_access_requests_list(request):
     if q:
         projects = projects.filter(title__icontains=q)
 
-    projects = paginate(request, projects, 50)
+    projects = cursor_paginate(request, projects, 50)
 
     return render(request, 'console/project_access_requests_list.html', {
         'projects': projects
@@ -2701,7 +2787,7 @@ def project_access_requests_detail(request, pk):
         access_requests = access_requests.filter(requester__username__icontains=q)
 
     access_requests = access_requests.order_by('-request_datetime')
-    access_requests = paginate(request, access_requests, 50)
+    access_requests = cursor_paginate(request, access_requests, 50)
 
     return render(request, 'console/project_access_requests_detail.html', {
         'project': project, 'access_requests': access_requests
@@ -2718,7 +2804,8 @@ def access_request(request, pk):
 @console_permission_required('project.can_view_access_logs')
 def project_access_logs(request):
     c_projects = PublishedProject.objects.annotate(
-        log_count=Count('logs', filter=Q(logs__category=LogCategory.ACCESS)))
+        log_count=Coalesce(Sum('access_summaries__log_count',
+                               filter=Q(access_summaries__period=AccessLogSummary.Period.MONTH)), 0))
 
     access_policy = request.GET.get('accessPolicy')
     if access_policy:
@@ -2728,7 +2815,7 @@ def project_access_logs(request):
     if q is not None:
         c_projects = c_projects.filter(title__icontains=q)
 
-    c_projects = paginate(request, c_projects, 50)
+    c_projects = cursor_paginate(request, c_projects.order_by('title', 'id'), 50)
 
     return render(request, 'console/project_access_logs.html', {
         'c_projects': c_projects,
@@ -2739,10 +2826,10 @@ def project_access_logs(request):
 def project_access_logs_detail(request, pid):
     c_project = get_object_or_404(PublishedProject, id=pid)
     logs = (
-        c_project.logs.filter(category=LogCategory.ACCESS)
-        .order_by("-creation_datetime")
+        c_project.access_summaries.filter(period=AccessLogSummary.Period.DAY)
+        .order_by("-date", "user")
         .select_related("user__profile")
-        .annotate(duration=F("last_access_datetime") - F("creation_datetime"))
+        .annotate(duration=F("last_access_datetime") - F("first_access_datetime"))
     )
 
     user = request.GET.get('user')
@@ -2752,9 +2839,9 @@ def project_access_logs_detail(request, pid):
     start_date = request.GET.get('startDate')
     end_date = request.GET.get('endDate')
     if start_date and end_date:
-        logs = logs.filter(creation_datetime__gte=start_date, creation_datetime__lte=end_date)
+        logs = logs.filter(first_access_datetime__gte=start_date, first_access_datetime__lte=end_date)
 
-    logs = paginate(request, logs, 50)
+    logs = cursor_paginate(request, logs, 50)
 
     user_filter_form = UserFilterForm()
 
@@ -2769,11 +2856,10 @@ def download_project_accesses(request, pk):
     headers = ['User', 'Email address', 'First access', 'Last access', 'Duration', 'Count']
 
     data = (
-        AccessLog.objects.filter(
-            content_type=ContentType.objects.get_for_model(PublishedProject), object_id=pk
-        )
+        AccessLogSummary.objects.filter(period=AccessLogSummary.Period.DAY, project=pk)
+        .order_by("date", "user")
         .select_related("user__profile")
-        .annotate(duration=F("last_access_datetime") - F("creation_datetime"))
+        .annotate(duration=F("last_access_datetime") - F("first_access_datetime"))
     )
 
     response = HttpResponse(content_type='text/csv')
@@ -2786,7 +2872,7 @@ def download_project_accesses(request, pk):
         writer.writerow([
             row.user.get_full_name(),
             row.user.email,
-            row.creation_datetime.strftime('%m/%d/%Y, %I:%M:%S %p'),
+            row.first_access_datetime.strftime('%m/%d/%Y, %I:%M:%S %p'),
             row.last_access_datetime.strftime('%m/%d/%Y, %I:%M:%S %p'),
             str(row.duration).split('.')[0],
             row.count
@@ -2800,7 +2886,8 @@ def user_access_logs(request):
     users = (
         User.objects.filter(is_active=True)
         .select_related("profile")
-        .annotate(logs_count=Count("logs", filter=Q(logs__category=LogCategory.ACCESS)))
+        .annotate(logs_count=Coalesce(Sum("access_summaries__log_count",
+                                          filter=Q(access_summaries__period=AccessLogSummary.Period.MONTH)), 0))
     )
 
     q = request.GET.get('q')
@@ -2812,7 +2899,7 @@ def user_access_logs(request):
                 | Q(profile__last_name__icontains=query)
             )
 
-    users = paginate(request, users, 50)
+    users = cursor_paginate(request, users.order_by('username'), 50)
 
     return render(request, 'console/user_access_logs.html', {
         'users': users,
@@ -2823,22 +2910,22 @@ def user_access_logs(request):
 def user_access_logs_detail(request, pid):
     user = get_object_or_404(User, id=pid, is_active=True)
     logs = (
-        user.logs.filter(category=LogCategory.ACCESS)
-        .order_by("-creation_datetime")
-        .prefetch_related("project")
-        .annotate(duration=F("last_access_datetime") - F("creation_datetime"))
+        user.access_summaries.filter(period=AccessLogSummary.Period.DAY)
+        .order_by("-date", "project")
+        .select_related("project")
+        .annotate(duration=F("last_access_datetime") - F("first_access_datetime"))
     )
 
     project = request.GET.get('project')
     if project:
-        logs = logs.filter(object_id=project, content_type=ContentType.objects.get_for_model(PublishedProject))
+        logs = logs.filter(project=project)
 
     start_date = request.GET.get('startDate')
     end_date = request.GET.get('endDate')
     if start_date and end_date:
-        logs = logs.filter(creation_datetime__gte=start_date, creation_datetime__lte=end_date)
+        logs = logs.filter(first_access_datetime__gte=start_date, first_access_datetime__lte=end_date)
 
-    logs = paginate(request, logs, 50)
+    logs = cursor_paginate(request, logs, 50)
 
     project_filter_form = ProjectFilterForm()
 
@@ -2853,8 +2940,10 @@ def download_user_accesses(request, pk):
     headers = ['Project name', 'First access', 'Last access', 'Duration', 'Count']
 
     data = (
-        AccessLog.objects.filter(user=pk).select_related('user__profile')
-        .annotate(duration=F('last_access_datetime') - F('creation_datetime'))
+        AccessLogSummary.objects.filter(period=AccessLogSummary.Period.DAY, user=pk)
+        .order_by('date', 'project')
+        .select_related('project')
+        .annotate(duration=F('last_access_datetime') - F('first_access_datetime'))
     )
 
     response = HttpResponse(content_type='text/csv')
@@ -2866,7 +2955,7 @@ def download_user_accesses(request, pk):
     for row in data:
         writer.writerow([
             row.project,
-            row.creation_datetime.strftime('%m/%d/%Y, %I:%M:%S %p'),
+            row.first_access_datetime.strftime('%m/%d/%Y, %I:%M:%S %p'),
             row.last_access_datetime.strftime('%m/%d/%Y, %I:%M:%S %p'),
             str(row.duration).split('.')[0],
             row.count
@@ -2884,7 +2973,7 @@ def gcp_signed_urls_logs(request):
     if q:
         projects = projects.filter(title__icontains=q)
 
-    projects = paginate(request, projects, 50)
+    projects = cursor_paginate(request, projects.order_by('title', 'id'), 50)
 
     return render(request, 'console/gcp_logs.html', {
         'projects': projects,
@@ -2897,7 +2986,7 @@ def gcp_signed_urls_logs_detail(request, pk):
     logs = project.logs.order_by('-creation_datetime').prefetch_related('project').annotate(
         duration=F('last_access_datetime') - F('creation_datetime'))
 
-    logs = paginate(request, logs, 50)
+    logs = cursor_paginate(request, logs, 50)
 
     return render(request, 'console/gcp_logs_detail.html', {
         'project': project, 'logs': logs,
@@ -4,3 +4,13 @@
 
 
 admin.site.register(models.News)
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'queued_datetime', 'attempts', 'failed_datetime')
+    list_filter = ('failed_datetime',)
+    exclude = ('message',)
+    readonly_fields = ('from_email', 'recipients', 'subject', 'queued_datetime', 'attempts', 'error')
+
+
+admin.site.register(models.OutgoingEmail, OutgoingEmailAdmin)
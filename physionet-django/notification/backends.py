@@ -0,0 +1,63 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+
+from notification.models import OutgoingEmail
+from notification.tasks import schedule_delivery
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Email backend that adds messages to the outbox.
+
+    Rather than connecting to a mail server, which may be slow, while
+    handling a request, messages are saved as OutgoingEmail objects and
+    delivered later by the deliver_queued_email background task, using
+    settings.EMAIL_DELIVERY_BACKEND.
+
+    Messages are saved as part of the current database transaction, so
+    messages sent from a transaction that is rolled back are discarded.
+
+    If `outbox` is false, messages are instead sent immediately using
+    settings.EMAIL_DELIVERY_BACKEND.  This is used for error reports
+    (see physionet.log.SaferAdminEmailHandler), which must be sent even
+    if the database is unavailable.
+    """
+    def __init__(self, fail_silently=False, outbox=True, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        if outbox:
+            self.delivery_connection = None
+        else:
+            self.delivery_connection = get_connection(
+                settings.EMAIL_DELIVERY_BACKEND, fail_silently=fail_silently, **kwargs)
+
+    def open(self):
+        if self.delivery_connection:
+            return self.delivery_connection.open()
+        return False
+
+    def close(self):
+        if self.delivery_connection:
+            self.delivery_connection.close()
+
+    def send_messages(self, email_messages):
+        if self.delivery_connection:
+            return self.delivery_connection.send_messages(email_messages)
+
+        try:
+            entries = [OutgoingEmail.from_message(message)
+                       for message in email_messages if message.recipients()]
+            if entries:
+                OutgoingEmail.objects.bulk_create(entries)
+                transaction.on_commit(schedule_delivery)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            LOGGER.exception('Unable to queue email messages')
+            return 0
+        return len(entries)
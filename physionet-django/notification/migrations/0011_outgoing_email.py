@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:49
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0010_news_link_all_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_email', models.TextField()),
+                ('recipients', models.TextField()),
+                ('subject', models.TextField(blank=True, default='')),
+                ('message', models.BinaryField()),
+                ('queued_datetime', models.DateTimeField(default=django.utils.timezone.now)),
+                ('next_attempt_datetime', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('failed_datetime', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'default_permissions': ('change',),
+            },
+        ),
+    ]
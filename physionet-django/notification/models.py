@@ -1,6 +1,11 @@
+import datetime
+import email.message
 import uuid
 
-from django.db import models
+from django.core.mail import EmailMessage
+from django.core.mail.message import MIMEMixin
+from django.db import models, transaction
+from django.utils import timezone
 
 from project.models import SafeHTMLField
 
@@ -33,3 +38,119 @@ class Meta:
 
     def __str__(self):
         return '{} - {}'.format(self.title, self.publish_datetime.date())
+
+
+class _StoredMIMEMessage(MIMEMixin, email.message.Message):
+    """
+    MIME message parsed from the contents of an OutgoingEmail.
+    """
+
+
+class _StoredEmailMessage(EmailMessage):
+    """
+    EmailMessage whose content has already been rendered as MIME.
+    """
+    def __init__(self, from_email, recipients, data):
+        super().__init__(from_email=from_email)
+        self._recipients = recipients
+        self._data = data
+
+    def recipients(self):
+        return self._recipients
+
+    def message(self):
+        return email.message_from_bytes(self._data, _class=_StoredMIMEMessage)
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+    def pending(self):
+        """
+        Messages that have not yet been delivered and have not failed.
+        """
+        return self.filter(failed_datetime=None)
+
+    def claim(self, limit, lease):
+        """
+        Select messages that are ready to be delivered.
+
+        Up to `limit` messages are returned, and their next attempt is
+        postponed by `lease` (a timedelta), so that other workers will
+        not try to deliver the same messages in the meantime.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                self.pending()
+                .filter(next_attempt_datetime__lte=now)
+                .order_by('next_attempt_datetime', 'id')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:limit]
+            )
+            self.filter(id__in=ids).update(next_attempt_datetime=now + lease)
+        return list(self.filter(id__in=ids).order_by('id'))
+
+
+class OutgoingEmail(models.Model):
+    """
+    Email message waiting to be delivered.
+
+    Messages are added to the outbox by notification.backends.
+    OutboxEmailBackend, and delivered by the deliver_queued_email
+    background task.  Messages are deleted once they have been
+    delivered; messages that could not be delivered after
+    settings.EMAIL_OUTBOX_MAX_ATTEMPTS are kept, with failed_datetime
+    set, so that they can be inspected or requeued.
+    """
+    from_email = models.TextField()
+    recipients = models.TextField()
+    subject = models.TextField(blank=True, default='')
+    message = models.BinaryField()
+    queued_datetime = models.DateTimeField(default=timezone.now)
+    next_attempt_datetime = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    failed_datetime = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        default_permissions = ('change',)
+
+    def __str__(self):
+        return '{} - {}'.format(self.subject, self.recipients.replace('\n', ', '))
+
+    @classmethod
+    def from_message(cls, message):
+        """
+        Create (but do not save) an OutgoingEmail from an EmailMessage.
+        """
+        return cls(
+            from_email=message.from_email,
+            recipients='\n'.join(message.recipients()),
+            subject=message.subject,
+            message=message.message().as_bytes(linesep='\r\n'),
+        )
+
+    def email_message(self):
+        """
+        Return an EmailMessage that can be sent by an email backend.
+        """
+        return _StoredEmailMessage(self.from_email, self.recipients.split('\n'), bytes(self.message))
+
+    def defer(self, error, max_attempts, now=None):
+        """
+        Record a failed delivery attempt.
+
+        The next attempt is scheduled after an exponentially increasing
+        delay (1 minute, 2 minutes, 4 minutes, ...), unless max_attempts
+        have been made, in which case the message is marked as failed.
+        """
+        if now is None:
+            now = timezone.now()
+        self.attempts += 1
+        self.error = str(error)
+        if self.attempts >= max_attempts:
+            self.failed_datetime = now
+        else:
+            self.next_attempt_datetime = now + datetime.timedelta(minutes=2 ** (self.attempts - 1))
+        self.save(update_fields=['attempts', 'error', 'failed_datetime', 'next_attempt_datetime'])
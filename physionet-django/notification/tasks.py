@@ -0,0 +1,115 @@
+import datetime
+import logging
+import time
+
+from background_task import background
+from background_task.models import Task
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db.models import Min
+from django.utils import timezone
+
+from console.tasks import EMAIL_QUEUE
+from notification.models import OutgoingEmail
+
+LOGGER = logging.getLogger(__name__)
+
+# Minimum time that a claimed batch of messages is reserved for one
+# worker (see OutgoingEmailQuerySet.claim)
+CLAIM_LEASE = datetime.timedelta(minutes=10)
+
+
+class _Throttle:
+    """
+    Limit the rate of delivery to a given number of messages per minute.
+    """
+    def __init__(self, rate):
+        self.interval = 60 / rate if rate > 0 else 0
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self.next_time:
+            time.sleep(self.next_time - now)
+            now = self.next_time
+        self.next_time = now + self.interval
+
+
+def deliver_batch(connection, batch, throttle):
+    """
+    Deliver a list of OutgoingEmail objects over a single connection.
+
+    Messages that are delivered successfully are deleted; messages
+    that cannot be delivered are deferred for a later attempt.
+
+    Returns False if the connection could not be opened, in which case
+    the remaining messages have been deferred.
+    """
+    max_attempts = settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    for i, outgoing in enumerate(batch):
+        try:
+            connection.open()
+        except Exception as exc:
+            LOGGER.warning(f'Unable to connect to mail server: {exc}')
+            for deferred in batch[i:]:
+                deferred.defer(exc, max_attempts)
+            return False
+
+        throttle.wait()
+        try:
+            connection.send_messages([outgoing.email_message()])
+        except Exception as exc:
+            LOGGER.warning(f'Unable to deliver message {outgoing.id} to {outgoing.recipients!r}: {exc}')
+            outgoing.defer(exc, max_attempts)
+            if outgoing.failed_datetime:
+                LOGGER.error(f'Giving up on message {outgoing.id} after {outgoing.attempts} attempts')
+            # The connection may no longer be usable
+            connection.close()
+        else:
+            outgoing.delete()
+    return True
+
+
+@background(queue=EMAIL_QUEUE)
+def deliver_queued_email():
+    """
+    Deliver all messages in the outbox that are ready to be sent.
+
+    Messages are claimed in batches of settings.EMAIL_OUTBOX_BATCH_SIZE,
+    and each batch is sent over a single connection, at no more than
+    settings.EMAIL_OUTBOX_RATE_LIMIT messages per minute.  If any
+    messages remain to be retried, the task is rescheduled.
+    """
+    batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+    throttle = _Throttle(settings.EMAIL_OUTBOX_RATE_LIMIT)
+    lease = CLAIM_LEASE + datetime.timedelta(seconds=batch_size * throttle.interval)
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    try:
+        while True:
+            batch = OutgoingEmail.objects.claim(batch_size, lease)
+            if not batch:
+                break
+            LOGGER.info(f'Delivering {len(batch)} queued email messages')
+            if not deliver_batch(connection, batch, throttle):
+                break
+    finally:
+        connection.close()
+
+    next_attempt = OutgoingEmail.objects.pending().aggregate(
+        next_attempt=Min('next_attempt_datetime'))['next_attempt']
+    if next_attempt is not None:
+        schedule_delivery(next_attempt)
+
+
+def schedule_delivery(run_at=None):
+    """
+    Schedule the deliver_queued_email task.
+
+    The task is scheduled to run at `run_at` (or immediately), unless
+    it is already scheduled to run by that time.
+    """
+    if run_at is None:
+        run_at = timezone.now()
+    pending = Task.objects.filter(task_name=deliver_queued_email.name, locked_by=None, failed_at=None)
+    if not pending.filter(run_at__lte=run_at).exists():
+        deliver_queued_email(schedule=run_at)
@@ -1,6 +1,18 @@
 import doctest
+import smtplib
+
+from background_task.models import Task
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from notification import utility
+from notification.models import OutgoingEmail
+from notification.tasks import deliver_queued_email
+from physionet.log import SaferAdminEmailHandler
 
 # Automatically run documentation tests in these modules.
 DOCTEST_MODULES = [
@@ -14,3 +26,83 @@ def load_tests(loader, tests, ignore):
     for module in DOCTEST_MODULES:
         tests.addTests(doctest.DocTestSuite(module, optionflags=DOCTEST_FLAGS))
     return tests
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """
+    Email backend that is unable to send messages.
+    """
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPRecipientsRefused({})
+
+
+@override_settings(
+    EMAIL_BACKEND='notification.backends.OutboxEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class TestOutbox(TestCase):
+    """
+    Test queueing and delivery of email messages.
+    """
+    def send(self):
+        message = EmailMessage('Café menu', 'Soup du jour: écrevisses', 'chef@example.com',
+                               ['alice@example.com'], bcc=['bob@example.com'])
+        message.attach('menu.txt', 'Soup\n', 'text/plain')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(message.send(), 1)
+
+    def test_delivery(self):
+        self.send()
+        self.send()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
+        task_name = deliver_queued_email.name
+        self.assertEqual(Task.objects.filter(task_name=task_name).count(), 1)
+
+        deliver_queued_email.now()
+        self.assertEqual(OutgoingEmail.objects.count(), 0)
+        self.assertEqual(len(mail.outbox), 2)
+        message = mail.outbox[0]
+        self.assertEqual(message.recipients(), ['alice@example.com', 'bob@example.com'])
+        self.assertEqual(message.message()['Subject'], '=?utf-8?q?Caf=C3=A9_menu?=')
+        self.assertNotIn('Bcc', message.message())
+        body, attachment = message.message().get_payload()
+        self.assertEqual(body.get_payload(decode=True).decode(), 'Soup du jour: écrevisses')
+        self.assertEqual(attachment.get_filename(), 'menu.txt')
+
+    @override_settings(EMAIL_DELIVERY_BACKEND='notification.tests.FailingEmailBackend',
+                       EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_retry(self):
+        self.send()
+        # Run the scheduled task
+        Task.objects.all().delete()
+        deliver_queued_email.now()
+        outgoing = OutgoingEmail.objects.get()
+        self.assertEqual(outgoing.attempts, 1)
+        self.assertIsNone(outgoing.failed_datetime)
+        self.assertGreater(outgoing.next_attempt_datetime, timezone.now())
+        # Delivery is rescheduled for the next attempt
+        self.assertTrue(Task.objects.filter(task_name=deliver_queued_email.name,
+                                            run_at=outgoing.next_attempt_datetime).exists())
+
+        OutgoingEmail.objects.update(next_attempt_datetime=timezone.now())
+        deliver_queued_email.now()
+        outgoing = OutgoingEmail.objects.get()
+        self.assertEqual(outgoing.attempts, 2)
+        self.assertIsNotNone(outgoing.failed_datetime)
+        self.assertEqual(OutgoingEmail.objects.pending().count(), 0)
+
+    def test_rollback(self):
+        try:
+            with transaction.atomic():
+                self.send()
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(OutgoingEmail.objects.count(), 0)
+
+    def test_error_report(self):
+        handler = SaferAdminEmailHandler()
+        handler.send_mail('Error', 'Something went wrong')
+        self.assertEqual(OutgoingEmail.objects.count(), 0)
+        self.assertEqual(len(mail.outbox), 1)
@@ -7,7 +7,7 @@
 
 from django.conf import settings
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.mail import EmailMessage, mail_admins, send_mail
+from django.core.mail import EmailMessage, mail_admins, send_mail, send_mass_mail
 from django.template import defaultfilters, loader
 from django.utils import timezone
 from django.urls import reverse
@@ -216,6 +216,34 @@ def invitation_response_notify(invitation, affected_emails):
         send_mail(subject, body, settings.DEFAULT_FROM_EMAIL,
                   [email], fail_silently=False)
 
+
+def outstanding_invitations_removed_notify(invitations):
+    """
+    Notify the inviters when unanswered authorship invitations expire.
+
+    The invitations should be fetched with select_related('project',
+    'inviter__profile').  All messages are sent over one connection.
+    """
+    subject = f'{settings.SITE_NAME} Expired Author Invitation'
+    project_info = {}
+    messages = []
+    for invitation in invitations:
+        project = invitation.project
+        if project.id not in project_info:
+            project_info[project.id] = email_project_info(project)
+        context = {
+            'name': invitation.inviter.get_full_name(),
+            'email': invitation.email,
+            'title': project.title,
+            'project_info': project_info[project.id],
+            'signature': settings.EMAIL_SIGNATURE,
+            'footer': email_footer(),
+        }
+        body = loader.render_to_string('notification/email/outstanding_invitation_removal.html', context)
+        messages.append((subject, body, settings.DEFAULT_FROM_EMAIL, [invitation.inviter.email]))
+    send_mass_mail(messages, fail_silently=False)
+
+
 def submit_notify(project):
     """
     Notify authors when a project is submitted
@@ -1132,3 +1160,25 @@ def notify_submitting_author(request, project):
     body = loader.render_to_string('notification/email/notify_submitting_author.html', context)
     # Not resend the email if there was an integrity error
     send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [author.user.email], fail_silently=False)
+
+
+def unverified_emails_removed_notify(associated_emails, days):
+    """
+    Notify users that email addresses they did not verify within the
+    given number of days have been removed from their accounts.
+
+    The emails should be fetched with select_related('user__profile').
+    All messages are sent over one connection.
+    """
+    subject = f'{settings.SITE_NAME} Unverified Email Removal'
+    messages = []
+    for associated_email in associated_emails:
+        context = {
+            'name': associated_email.user.get_full_name(),
+            'email': associated_email.email,
+            'days': days,
+            'SITE_NAME': settings.SITE_NAME,
+        }
+        body = loader.render_to_string('user/email/unverified_email_removal.html', context)
+        messages.append((subject, body, settings.DEFAULT_FROM_EMAIL, [associated_email.user.email]))
+    send_mass_mail(messages, fail_silently=False)
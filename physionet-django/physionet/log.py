@@ -5,6 +5,7 @@
 from django.views import debug
 from django.utils import log
 from django.conf import settings
+from django.core.mail import get_connection
 from django import template
 
 # Below is based on django/views/templates/technical_500.txt.
@@ -152,6 +153,13 @@ def emit(self, record):
         html_message = reporter.get_traceback_html() if self.include_html else None
         self.send_mail(subject, message, fail_silently=True, html_message=html_message)
 
+    def connection(self):
+        # Error reports are sent immediately rather than being queued
+        # (see notification.backends.OutboxEmailBackend), since the
+        # database may not be working.  Other backends ignore the
+        # 'outbox' argument.
+        return get_connection(backend=self.email_backend, fail_silently=True, outbox=False)
+
 
 class VerboseStreamHandler(logging.StreamHandler):
     def emit(self, record):
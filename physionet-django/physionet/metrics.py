@@ -0,0 +1,321 @@
+"""
+Application metrics, in the Prometheus text exposition format.
+
+Metrics are collected in memory by each process.  If
+settings.METRICS_DIR is set, each process periodically saves a
+snapshot of its metrics to a file in that directory, and exposition()
+combines the snapshots of all processes (including web server workers
+and background task runners), so that any one process can report the
+totals for the whole server.  Snapshots of processes that have exited
+are kept until they are older than settings.METRICS_MAX_AGE seconds,
+or until there are more than settings.METRICS_MAX_FILES snapshots.
+
+Metrics are only collected if settings.METRICS_ENABLED is true.
+"""
+import atexit
+import bisect
+import contextlib
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+LOGGER = logging.getLogger(__name__)
+
+# Default histogram buckets (in seconds), suitable for request latency
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = {}
+_lock = threading.Lock()
+_state = {'pid': None, 'path': None, 'saved': 0}
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for (name, value) in zip(names, escaped)) + '}'
+
+
+class Metric:
+    """
+    Base class for metrics.
+
+    Each metric has a name, a description, and a list of label names.
+    Values are stored separately for each combination of label values.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        with _lock:
+            _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def merge(self, values, other):
+        """Add the values from another snapshot to `values`."""
+        raise NotImplementedError
+
+    def samples(self, key, value):
+        """Generate (suffix, label names, label values, value) tuples."""
+        raise NotImplementedError
+
+    def exposition(self, values):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for key in sorted(values):
+            for (suffix, names, labels, value) in self.samples(key, values[key]):
+                lines.append(f'{self.name}{suffix}{_format_labels(names, labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(Metric):
+    """
+    Metric whose value only increases, such as a number of events.
+    """
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        _autosave()
+
+    def merge(self, values, other):
+        for key, value in other.items():
+            values[key] = values.get(key, 0) + value
+
+    def samples(self, key, value):
+        yield ('', self.labelnames, key, value)
+
+
+class Histogram(Metric):
+    """
+    Metric that counts observed values (such as durations) in buckets.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            # Count in each bucket (non-cumulative), followed by the sum
+            counts = self.values.setdefault(key, [0] * len(self.buckets) + [0])
+            counts[index] += 1
+            counts[-1] += value
+        _autosave()
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe the time taken to execute a block of code."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def merge(self, values, other):
+        for key, counts in other.items():
+            if key in values:
+                values[key] = [a + b for (a, b) in zip(values[key], counts)]
+            else:
+                values[key] = list(counts)
+
+    def samples(self, key, counts):
+        names = self.labelnames + ('le',)
+        total = 0
+        for bound, count in zip(self.buckets, counts):
+            total += count
+            yield ('_bucket', names, key + (_format_value(bound),), total)
+        yield ('_sum', self.labelnames, key, counts[-1])
+        yield ('_count', self.labelnames, key, total)
+
+
+def _snapshot():
+    with _lock:
+        return {name: [[list(key), value] for (key, value) in metric.values.items()]
+                for (name, metric) in _registry.items() if metric.values}
+
+
+def save():
+    """
+    Save this process's metrics to a file in settings.METRICS_DIR.
+    """
+    if not settings.METRICS_DIR:
+        return
+    pid = os.getpid()
+    if _state['pid'] != pid or os.path.dirname(_state['path']) != settings.METRICS_DIR:
+        # Use a unique name for each process, since process IDs are
+        # eventually reused
+        _state['pid'] = pid
+        _state['path'] = os.path.join(settings.METRICS_DIR, f'{pid}-{uuid.uuid4().hex[:8]}.json')
+        prune()
+    _state['saved'] = time.monotonic()
+    try:
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=settings.METRICS_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(_snapshot(), f)
+            os.replace(tmp_path, _state['path'])
+        except BaseException:
+            _remove(tmp_path)
+            raise
+    except OSError:
+        LOGGER.exception('Unable to save metrics')
+
+
+def prune():
+    """
+    Remove old snapshots from settings.METRICS_DIR.
+
+    Snapshots (and leftover temporary files) that have not been
+    updated for settings.METRICS_MAX_AGE seconds are removed, as are
+    the least recently updated snapshots in excess of
+    settings.METRICS_MAX_FILES.  This process's own snapshot is kept.
+    """
+    try:
+        entries = [entry for entry in os.scandir(settings.METRICS_DIR)
+                   if entry.name.endswith(('.json', '.tmp')) and entry.path != _state['path']]
+    except FileNotFoundError:
+        return
+    snapshots = []
+    cutoff = time.time() - settings.METRICS_MAX_AGE
+    for entry in entries:
+        try:
+            mtime = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if mtime >= cutoff and entry.name.endswith('.json'):
+            snapshots.append((mtime, entry.path))
+        elif mtime < cutoff:
+            _remove(entry.path)
+    snapshots.sort(reverse=True)
+    for (_, path) in snapshots[max(settings.METRICS_MAX_FILES - 1, 0):]:
+        _remove(path)
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        LOGGER.exception('Unable to remove %s', path)
+
+
+def _autosave():
+    if settings.METRICS_DIR and time.monotonic() - _state['saved'] >= settings.METRICS_SAVE_INTERVAL:
+        save()
+
+
+atexit.register(save)
+
+
+def exposition():
+    """
+    Return the current value of all metrics in text format.
+
+    If settings.METRICS_DIR is set, this includes the most recently
+    saved values from all processes.
+    """
+    snapshots = []
+    if settings.METRICS_DIR:
+        save()
+        prune()
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    else:
+        snapshots.append(_snapshot())
+
+    with _lock:
+        metrics = list(_registry.values())
+    output = []
+    for metric in metrics:
+        values = {}
+        for snapshot in snapshots:
+            metric.merge(values, {tuple(key): value for (key, value) in snapshot.get(metric.name, [])})
+        output.append(metric.exposition(values))
+    return ''.join(output)
+
+
+class TimedTemplates(DjangoTemplates):
+    """
+    Django template backend that records template rendering times.
+    """
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with TEMPLATE_RENDER_DURATION.time(template=self.template.name or '<string>'):
+            return super().render(context, request)
+
+
+REQUEST_DURATION = Histogram(
+    'physionet_request_duration_seconds',
+    'Time taken to handle HTTP requests, by URL name',
+    ['view', 'method'])
+
+REQUEST_DB_DURATION = Histogram(
+    'physionet_request_db_duration_seconds',
+    'Time spent in database queries per HTTP request, by URL name',
+    ['view'])
+
+TEMPLATE_RENDER_DURATION = Histogram(
+    'physionet_template_render_seconds',
+    'Time taken to render templates',
+    ['template'])
+
+FILES_SERVED = Counter(
+    'physionet_files_served_total',
+    'Number of files served by physionet.utility.serve_file',
+    ['method'])
+
+FILE_BYTES_SERVED = Counter(
+    'physionet_file_served_bytes_total',
+    'Size of files served by physionet.utility.serve_file',
+    ['method'])
+
+TASK_DURATION = Histogram(
+    'physionet_background_task_duration_seconds',
+    'Time taken to run background tasks, by task name',
+    ['task', 'queue'],
+    buckets=(1, 5, 15, 60, 300, 900, 3600, 4 * 3600, 12 * 3600))
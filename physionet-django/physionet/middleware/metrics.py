@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from physionet import metrics
+from physionet.middleware.querycount import QueryRecorder
+
+
+class MetricsMiddleware:
+    """
+    Middleware that records the time taken to handle each request.
+
+    The total time, and the time spent in database queries, are
+    recorded in histograms labelled by URL name (see physionet.metrics).
+    Requests that do not match any URL are labelled '<unresolved>'.
+
+    If settings.METRICS_ENABLED is false, the middleware is not used.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        metrics.REQUEST_DURATION.observe(duration, view=view_name, method=request.method)
+        metrics.REQUEST_DB_DURATION.observe(recorder.time, view=view_name)
+        return response
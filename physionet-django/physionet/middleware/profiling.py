@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+
+LOGGER = logging.getLogger(__name__)
+
+# Query parameter or request header used to request profiling
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile-Token'
+
+# Permission required to create profiles
+PROFILE_PERMISSION = 'project.can_view_stats'
+
+_TOKEN_SALT = 'physionet.middleware.profiling'
+
+_PROFILE_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def make_profile_token(user):
+    """
+    Create a token that allows a user to profile requests.
+
+    The token is valid for settings.PROFILING_TOKEN_MAX_AGE seconds.
+    """
+    return signing.TimestampSigner(salt=_TOKEN_SALT).sign(str(user.id))
+
+
+def check_profile_token(token):
+    """
+    Check a token created by make_profile_token.
+
+    Returns the user who created the token, if the token is valid and
+    the user is (still) permitted to profile requests, or None
+    otherwise.
+    """
+    try:
+        user_id = signing.TimestampSigner(salt=_TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    user = get_user_model().objects.filter(id=user_id, is_active=True).first()
+    if user and user.has_perm(PROFILE_PERMISSION):
+        return user
+    return None
+
+
+def profile_path(profile_id):
+    """
+    Return the path of a saved profile, or None if the ID is invalid.
+    """
+    if not _PROFILE_ID_PATTERN.fullmatch(profile_id):
+        return None
+    return os.path.join(settings.PROFILING_DIR, profile_id + '.speedscope.json')
+
+
+def list_profiles():
+    """
+    List saved profiles, most recent first.
+
+    Returns a list of (profile ID, modification time, size) tuples.
+    """
+    profiles = []
+    try:
+        entries = list(os.scandir(settings.PROFILING_DIR))
+    except FileNotFoundError:
+        return profiles
+    for entry in entries:
+        profile_id = entry.name.split('.')[0]
+        if entry.name.endswith('.speedscope.json') and _PROFILE_ID_PATTERN.fullmatch(profile_id):
+            try:
+                info = entry.stat()
+            except FileNotFoundError:
+                continue
+            profiles.append((profile_id, info.st_mtime, info.st_size))
+    profiles.sort(key=lambda profile: profile[1], reverse=True)
+    return profiles
+
+
+class Sampler(threading.Thread):
+    """
+    Sampling profiler for a single thread.
+
+    While running, this thread records the call stack of the target
+    thread every `interval` seconds.  Sampling has no effect on the
+    target thread other than briefly holding the interpreter lock.
+
+    Under uWSGI, Python threads only run if the enable-threads option
+    is set.
+    """
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = []
+        self.frame_index = {}
+        self.samples = []
+        self.weights = []
+        self._done = threading.Event()
+
+    def _frame(self, code):
+        index = self.frame_index.get(code)
+        if index is None:
+            index = self.frame_index[code] = len(self.frames)
+            self.frames.append({
+                'name': getattr(code, 'co_qualname', code.co_name),
+                'file': code.co_filename,
+                'line': code.co_firstlineno,
+            })
+        return index
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(self._frame(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def speedscope(self, name):
+        """
+        Return the samples in speedscope's file format.
+
+        See https://www.speedscope.app/file-format-schema.json
+        """
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'physionet',
+            'activeProfileIndex': 0,
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(self.weights),
+                'samples': self.samples,
+                'weights': self.weights,
+            }],
+        }
+
+
+class ProfilingMiddleware:
+    """
+    Middleware that profiles requests on demand.
+
+    A request is profiled if it includes a valid token (see
+    make_profile_token), either as the '_profile' query parameter or
+    the 'X-Profile-Token' header.  The profile is saved in
+    settings.PROFILING_DIR, in speedscope format, and the response
+    includes the headers 'X-Profile-Id' and 'X-Profile-URL'
+    identifying the profile.  At most settings.PROFILING_MAX_FILES
+    profiles are kept.
+
+    Other requests are not affected.  If settings.PROFILING_DIR is
+    empty, the middleware is not used.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.PROFILING_DIR:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        token = request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+        if not token:
+            return self.get_response(request)
+        if check_profile_token(token) is None:
+            LOGGER.warning(f'Invalid profiling token for {request.path}')
+            return self.get_response(request)
+
+        sampler = Sampler(threading.get_ident(), settings.PROFILING_INTERVAL)
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+
+        profile_id = uuid.uuid4().hex
+        query = request.GET.copy()
+        query.pop(PROFILE_PARAM, None)
+        name = f'{request.method} {request.path}'
+        if query:
+            name += '?' + query.urlencode()
+        try:
+            self._save(profile_id, sampler.speedscope(name))
+        except OSError:
+            LOGGER.exception('Unable to save profile')
+            return response
+        LOGGER.info(f'Saved profile {profile_id} for {name}')
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-URL'] = request.build_absolute_uri(reverse('profile_file', args=(profile_id,)))
+        return response
+
+    def _save(self, profile_id, profile):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=settings.PROFILING_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, profile_path(profile_id))
+
+        for (old_id, mtime, size) in list_profiles()[settings.PROFILING_MAX_FILES:]:
+            try:
+                os.unlink(profile_path(old_id))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,113 @@
+import collections
+import contextlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+    Record the database queries executed within a block of code.
+
+    Queries are recorded on all database connections belonging to the
+    current thread.  For example:
+
+        with QueryRecorder() as recorder:
+            response = view(request)
+        print(recorder.count, recorder.time, recorder.duplicates())
+
+    Queries are identified by their SQL text (not including parameter
+    values), so a query that is executed once for each item in a list
+    (an "N+1" query) appears as a single signature with a high count.
+    """
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = contextlib.ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._execute))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def _execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        """Number of queries executed."""
+        return len(self.queries)
+
+    @property
+    def time(self):
+        """Total time (in seconds) spent executing queries."""
+        return sum(duration for (sql, duration) in self.queries)
+
+    def duplicates(self):
+        """
+        Return a list of (sql, count) for queries executed more than
+        once, most frequent first.
+        """
+        counts = collections.Counter(sql for (sql, duration) in self.queries)
+        return [(sql, n) for (sql, n) in counts.most_common() if n > 1]
+
+    def duplicate_count(self):
+        """Number of queries that repeated an earlier query."""
+        return sum(n - 1 for (sql, n) in self.duplicates())
+
+
+class QueryCountMiddleware:
+    """
+    Middleware that reports the database queries made by each request.
+
+    If settings.QUERY_COUNT_HEADERS is true, the response includes the
+    headers X-DB-Query-Count (number of queries), X-DB-Query-Time
+    (total query time, in milliseconds) and X-DB-Duplicate-Queries
+    (number of queries that repeated an earlier query with the same
+    SQL.)
+
+    If settings.QUERY_COUNT_LOG_THRESHOLD is nonzero, a warning is
+    logged for each request that makes at least that many queries,
+    including the view name and the most frequently repeated query.
+
+    If neither setting is enabled, the middleware is not used.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = settings.QUERY_COUNT_HEADERS
+        self.log_threshold = settings.QUERY_COUNT_LOG_THRESHOLD
+        if not self.headers and not self.log_threshold:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        if self.headers:
+            response['X-DB-Query-Count'] = recorder.count
+            response['X-DB-Query-Time'] = f'{recorder.time * 1000:.1f}'
+            response['X-DB-Duplicate-Queries'] = recorder.duplicate_count()
+
+        if self.log_threshold and recorder.count >= self.log_threshold:
+            match = request.resolver_match
+            view_name = match.view_name if match else request.path
+            message = (f'{view_name}: {recorder.count} queries '
+                       f'({recorder.duplicate_count()} duplicate) in {recorder.time * 1000:.1f} ms')
+            duplicates = recorder.duplicates()
+            if duplicates:
+                sql, n = duplicates[0]
+                message += f'; repeated {n} times: {sql}'
+            LOGGER.warning(message)
+        return response
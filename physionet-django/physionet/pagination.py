@@ -0,0 +1,327 @@
+"""
+Keyset ("cursor") pagination.
+
+Unlike Django's Paginator, which fetches a page using OFFSET and counts
+the total number of rows on every request, a CursorPaginator fetches
+each page by filtering on the sort key of the last row of the
+previous page.  Given a suitable index, every page costs the same to
+fetch, however deep it is.
+
+A CursorPaginator can also merge several querysets, possibly of
+different models, that are sorted the same way (for example, current
+and legacy credentialing records, both sorted by date).  Each page is
+produced by a k-way merge of at most (page size + 1) rows from each
+source.
+"""
+import base64
+import collections.abc
+import datetime
+import functools
+import heapq
+import itertools
+import json
+import operator
+
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+# Counts estimated below this value are replaced by an exact count
+APPROXIMATE_COUNT_THRESHOLD = 1000
+
+# Value of the 'before' parameter that requests the last page
+LAST_PAGE = 'last'
+
+
+def approximate_count(queryset):
+    """
+    Return the approximate number of rows in a queryset.
+
+    On PostgreSQL, this uses the query planner's estimate, which
+    avoids scanning the table.  Small estimates (and other databases)
+    use an exact count.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate >= APPROXIMATE_COUNT_THRESHOLD:
+            return estimate
+    return queryset.count()
+
+
+class _Descending:
+    """Wrapper that reverses the ordering of a value."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class _Source:
+    """
+    An ordered queryset, with its sort key.
+
+    The primary key is appended to the sort key, if not already
+    present, so that every row has a distinct key.
+    """
+    def __init__(self, queryset):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if not ordering:
+            raise ValueError(f'{queryset.model.__name__} queryset must be ordered')
+        meta = queryset.model._meta
+        self.queryset = queryset
+        self.fields = []
+        for item in ordering:
+            if not isinstance(item, str) or item == '?':
+                raise ValueError(f'Cannot paginate by {item!r}')
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            try:
+                field = meta.get_field(name)
+            except FieldDoesNotExist:
+                pass
+            else:
+                # Ordering by a foreign key means ordering by the
+                # related model's ordering, or by its primary key
+                if field.many_to_one and not field.related_model._meta.ordering:
+                    name = field.attname
+            self.fields.append((name, descending))
+        if self.fields[-1][0] not in ('pk', meta.pk.name, meta.pk.attname):
+            self.fields.append(('pk', self.fields[-1][1]))
+        self.model_fields = [self._model_field(name) for (name, _) in self.fields]
+
+    def _model_field(self, name):
+        """Return the model field (or output field) for a sort key."""
+        if name in self.queryset.query.annotations:
+            try:
+                return self.queryset.query.annotations[name].output_field
+            except FieldError:
+                return None
+        model = self.queryset.model
+        field = None
+        for attr in name.split('__'):
+            if field is not None:
+                model = field.related_model
+            field = model._meta.pk if attr == 'pk' else model._meta.get_field(attr)
+        return field
+
+    def clean(self, values):
+        """
+        Convert cursor values, decoded from JSON, into values of the
+        sort key fields.
+
+        Raises ValidationError (or ValueError) if the values are not
+        valid for the fields.
+        """
+        cleaned = []
+        for field, value in zip(self.model_fields, values):
+            if not isinstance(value, (str, int, float, bool)):
+                raise ValueError(f'Invalid cursor value {value!r}')
+            if field is not None:
+                value = field.to_python(value)
+                if value is None:
+                    raise ValueError('Invalid cursor value')
+            cleaned.append(value)
+        return cleaned
+
+    def key(self, obj):
+        """Return the sort key values of an object."""
+        values = []
+        for name, _ in self.fields:
+            value = obj
+            for attr in name.split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def fetch(self, limit, reverse, cursor=None, inclusive=False):
+        """
+        Fetch up to `limit` rows following the cursor values.
+
+        If `reverse` is true, the ordering is reversed.  If
+        `inclusive` is true, a row whose key equals the cursor is
+        included.
+        """
+        queryset = self.queryset.order_by(*(
+            ('-' if descending != reverse else '') + name for (name, descending) in self.fields))
+        if cursor is not None:
+            clauses = []
+            equal = {}
+            for (name, descending), value in zip(self.fields, cursor):
+                lookup = 'lt' if descending != reverse else 'gt'
+                clauses.append(Q(**equal, **{f'{name}__{lookup}': value}))
+                equal[name] = value
+            if inclusive:
+                clauses.append(Q(**equal))
+            queryset = queryset.filter(functools.reduce(operator.or_, clauses))
+        return list(queryset[:limit])
+
+    def sort_key(self, obj, reverse):
+        return tuple(_Descending(value) if descending != reverse else value
+                     for (value, (_, descending)) in zip(self.key(obj), self.fields))
+
+
+class CursorPaginator:
+    """
+    Paginator for one or more ordered querysets.
+
+    All of the querysets must be ordered by the same number of fields,
+    in the same directions, with comparable values.  Fields used for
+    ordering should not be nullable (use an annotation with Coalesce
+    if necessary.)  Rows that compare equal are ordered by the
+    position of their queryset in `sources`.
+
+    The total count (`paginator.count`) is only computed if it is
+    used; if `approximate` is true, it is estimated using
+    approximate_count.
+    """
+    keyset = True
+
+    def __init__(self, sources, per_page, approximate=True):
+        if isinstance(sources, collections.abc.Iterable) and not hasattr(sources, 'query'):
+            sources = list(sources)
+        else:
+            sources = [sources]
+        self.sources = [_Source(queryset) for queryset in sources]
+        self.per_page = per_page
+        self.approximate = approximate
+        if len({tuple(descending for (_, descending) in source.fields) for source in self.sources}) > 1:
+            raise ValueError('Querysets must be ordered in the same directions')
+
+    @functools.cached_property
+    def count(self):
+        if self.approximate:
+            return sum(approximate_count(source.queryset) for source in self.sources)
+        return sum(source.queryset.count() for source in self.sources)
+
+    def _encode(self, index, obj):
+        data = [index, [_encode_value(value) for value in self.sources[index].key(obj)]]
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        """
+        Decode a cursor.  Returns None if the cursor is invalid (for
+        example, if it has been altered), so that the first page is
+        shown instead.
+        """
+        try:
+            index, values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if (type(index) is int and 0 <= index < len(self.sources)
+                    and isinstance(values, list) and len(values) == len(self.sources[index].fields)):
+                return index, self.sources[index].clean(values)
+        except (ValueError, TypeError, ValidationError):
+            pass
+        return None
+
+    def _fetch(self, cursor, reverse):
+        limit = self.per_page + 1
+        streams = []
+        for index, source in enumerate(self.sources):
+            if cursor is None:
+                rows = source.fetch(limit, reverse)
+            else:
+                # Rows with equal keys are ordered by source, so
+                # include them if this source comes later
+                later = index < cursor[0] if reverse else index > cursor[0]
+                rows = source.fetch(limit, reverse, cursor[1], inclusive=later)
+            position = -index if reverse else index
+            streams.append([(source.sort_key(obj, reverse), position, index, obj) for obj in rows])
+        return [(index, obj) for (_, _, index, obj) in itertools.islice(heapq.merge(*streams), limit)]
+
+    def get_page(self, after=None, before=None):
+        """
+        Return the page following the cursor `after`, or the page
+        preceding the cursor `before`.
+
+        If `before` is LAST_PAGE, return the last page.  If neither is
+        given, or the cursor is invalid, return the first page.
+        """
+        if before:
+            cursor = None if before == LAST_PAGE else self._decode(before)
+            if cursor is not None or before == LAST_PAGE:
+                rows = self._fetch(cursor, reverse=True)
+                more = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                return self._page(rows, has_previous=more, has_next=cursor is not None)
+
+        cursor = self._decode(after) if after else None
+        rows = self._fetch(cursor, reverse=False)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self._page(rows, has_previous=cursor is not None, has_next=more)
+
+    def _page(self, rows, has_previous, has_next):
+        previous_cursor = self._encode(*rows[0]) if has_previous and rows else None
+        next_cursor = self._encode(*rows[-1]) if has_next and rows else None
+        return CursorPage([obj for (_, obj) in rows], self, previous_cursor, next_cursor)
+
+
+class CursorPage(collections.abc.Sequence):
+    """
+    A page of results from a CursorPaginator.
+
+    Like Django's Page, this provides has_next, has_previous and
+    has_other_pages; the `next_cursor` and `previous_cursor`
+    attributes are used to link to the adjacent pages.
+    """
+    def __init__(self, object_list, paginator, previous_cursor, next_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def cursor_paginate(request, sources, maximum, approximate=True):
+    """
+    Return a page of one or more ordered querysets, using keyset
+    pagination.
+
+    Parameters
+    ----------
+    request : HTTP request; the 'after' and 'before' query parameters
+        select the page.
+    sources : Ordered queryset, or list of querysets to be merged.
+    maximum : Maximum number of elements in a page.
+    approximate : Whether paginator.count may be an estimate.
+
+    Returns a CursorPage.
+    """
+    paginator = CursorPaginator(sources, maximum, approximate=approximate)
+    return paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
@@ -78,6 +78,9 @@
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'physionet.middleware.metrics.MetricsMiddleware',
+    'physionet.middleware.querycount.QueryCountMiddleware',
+    'physionet.middleware.profiling.ProfilingMiddleware',
     'physionet.middleware.maintenance.SystemMaintenanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -196,6 +199,20 @@
 # Django background tasks max attempts
 MAX_ATTEMPTS = 5
 
+# Maximum run time of a background task, in seconds, after which it is
+# assumed to have failed and may be started again.  (Tasks left locked
+# by a worker that exited are unlocked when process_task_queues starts.)
+MAX_RUN_TIME = config('BACKGROUND_TASK_MAX_RUN_TIME', cast=int, default=2 * 24 * 60 * 60)
+
+# Number of tasks from each background task queue that may run at the
+# same time (see console.tasks)
+BACKGROUND_TASK_QUEUES = {
+    'files': config('BACKGROUND_TASK_FILES_THREADS', cast=int, default=2),
+    'compute': config('BACKGROUND_TASK_COMPUTE_THREADS', cast=int, default=1),
+    'admin': config('BACKGROUND_TASK_ADMIN_THREADS', cast=int, default=2),
+    'email': 1,
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/1.11/howto/static-files/
 
@@ -210,6 +227,112 @@
 else:
     GOOGLE_APPLICATION_CREDENTIALS = None
 
+# Caching
+
+# The default cache should be shared by all server processes (e.g.
+# 'django.core.cache.backends.memcached.PyMemcacheCache' or
+# 'django.core.cache.backends.redis.RedisCache') for data that is
+# invalidated when it changes, such as users' permissions
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Seconds to cache each user's permissions (0 to disable); only enable
+# this if the default cache is shared by all processes
+PERMISSION_CACHE_TIMEOUT = config('PERMISSION_CACHE_TIMEOUT', cast=int, default=0)
+
+# Seconds to remember valid HTTP Basic authentication credentials, so
+# that clients that don't support cookies (such as wget) don't need to
+# have their password verified for every request (0 to disable)
+HTTP_AUTH_CACHE_TIMEOUT = config('HTTP_AUTH_CACHE_TIMEOUT', cast=int, default=600)
+
+# Seconds to cache each project's anonymous access URL (0 to disable);
+# only enable this if the default cache is shared by all processes
+ANONYMOUS_ACCESS_CACHE_TIMEOUT = config('ANONYMOUS_ACCESS_CACHE_TIMEOUT', cast=int, default=0)
+
+# Maximum number of attempts to enter the passphrase for an anonymous
+# access URL from one address, within the given number of seconds (0
+# for no limit)
+ANONYMOUS_ACCESS_MAX_ATTEMPTS = config('ANONYMOUS_ACCESS_MAX_ATTEMPTS', cast=int, default=10)
+ANONYMOUS_ACCESS_ATTEMPT_WINDOW = config('ANONYMOUS_ACCESS_ATTEMPT_WINDOW', cast=int, default=900)
+
+# After this many attempts for one URL in total within the window (0
+# for no limit), each address may only try once per interval (seconds)
+ANONYMOUS_ACCESS_MAX_URL_ATTEMPTS = config('ANONYMOUS_ACCESS_MAX_URL_ATTEMPTS', cast=int, default=100)
+ANONYMOUS_ACCESS_SLOW_INTERVAL = config('ANONYMOUS_ACCESS_SLOW_INTERVAL', cast=int, default=60)
+
+# Signed download links
+
+# Secret shared with nginx for signing links to protected directories
+# (empty to disable); when enabled, requests for a directory of a
+# published project are redirected to a link that nginx serves
+# directly (see physionet.utility.secure_link_url)
+SECURE_LINK_SECRET = config('SECURE_LINK_SECRET', default='')
+
+# URL path prefix of signed links, and seconds until they expire
+SECURE_LINK_PREFIX = config('SECURE_LINK_PREFIX', default='/signed-files')
+SECURE_LINK_MAX_AGE = config('SECURE_LINK_MAX_AGE', cast=int, default=86400)
+
+# Content-addressed store for published files (empty to disable); it
+# must be on the same filesystem as MEDIA_ROOT and STATIC_ROOT, since
+# identical files are shared using hard links (see project.contentstore)
+CONTENT_STORE_ROOT = config('CONTENT_STORE_ROOT', default='')
+
+# Query count instrumentation
+
+# Add headers reporting the number and duration of database queries
+# to each response (see physionet.middleware.querycount)
+QUERY_COUNT_HEADERS = config('QUERY_COUNT_HEADERS', cast=bool, default=False)
+
+# Log a warning for each request that makes at least this many database
+# queries (0 to disable)
+QUERY_COUNT_LOG_THRESHOLD = config('QUERY_COUNT_LOG_THRESHOLD', cast=int, default=0)
+
+# Metrics (see physionet.metrics)
+
+# If true, collect metrics and report them at /metrics/
+METRICS_ENABLED = config('METRICS_ENABLED', cast=bool, default=False)
+
+# Bearer token that allows a monitoring system to read /metrics/
+# (users with the can_view_stats permission may also read it)
+METRICS_TOKEN = config('METRICS_TOKEN', default=None)
+
+# Directory where each process saves its metrics, so that the totals
+# for all processes can be reported (if unset, /metrics/ reports only
+# the process that handles the request)
+METRICS_DIR = config('METRICS_DIR', default=None)
+
+# Seconds between saves of each process's metrics
+METRICS_SAVE_INTERVAL = config('METRICS_SAVE_INTERVAL', cast=int, default=15)
+
+# Saved metrics are removed once they have not been updated for this
+# many seconds, and the oldest are removed if there are more than this
+# many files (the totals reported for older processes are then lost)
+METRICS_MAX_AGE = config('METRICS_MAX_AGE', cast=int, default=7 * 24 * 60 * 60)
+METRICS_MAX_FILES = config('METRICS_MAX_FILES', cast=int, default=200)
+
+if METRICS_ENABLED:
+    TEMPLATES[0]['BACKEND'] = 'physionet.metrics.TimedTemplates'
+
+# On-demand profiling of individual requests (see
+# physionet.middleware.profiling)
+
+# Directory where profiles are saved (profiling is disabled unless this
+# is set)
+PROFILING_DIR = config('PROFILING_DIR', default='')
+
+# Maximum number of profiles to keep
+PROFILING_MAX_FILES = config('PROFILING_MAX_FILES', cast=int, default=100)
+
+# Seconds between samples of the call stack
+PROFILING_INTERVAL = config('PROFILING_INTERVAL', cast=float, default=0.005)
+
+# Seconds for which a profiling token is valid
+PROFILING_TOKEN_MAX_AGE = config('PROFILING_TOKEN_MAX_AGE', cast=int, default=24 * 60 * 60)
+
 # Maintenance mode
 
 # If true, disable all POSTs and other requests to make changes
@@ -630,8 +753,34 @@ class StorageTypes:
 ENABLE_FILE_DOWNLOADS_OPTION = config('ENABLE_FILE_DOWNLOADS_OPTION', cast=bool, default=False)
 COPY_FILES_TO_NEW_VERSION = config('COPY_FILES_TO_NEW_VERSION', cast=bool, default=True)
 
+# Build min/max signal pyramids for WFDB records when projects are published
+ENABLE_SIGNAL_PYRAMIDS = config('ENABLE_SIGNAL_PYRAMIDS', cast=bool, default=False)
+
 LOG_TIMEDELTA = config('LOG_TIMEDELTA', cast=int, default='10')
 
+# Seconds between writes of buffered access logs to the database (0 to
+# write each access immediately), and the number of buffered entries
+# that are written immediately
+LOG_FLUSH_INTERVAL = config('LOG_FLUSH_INTERVAL', cast=int, default=30)
+LOG_FLUSH_MAX_ENTRIES = config('LOG_FLUSH_MAX_ENTRIES', cast=int, default=1000)
+
+# Days to keep individual access log entries, once they have been
+# summarized by the rollup_access_logs command (0 to keep them forever)
+ACCESS_LOG_RETENTION_DAYS = config('ACCESS_LOG_RETENTION_DAYS', cast=int, default=0)
+
+# Backend used by the deliver_queued_email task to send messages that
+# were queued by notification.backends.OutboxEmailBackend
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Maximum number of queued messages to send over one connection
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', cast=int, default=100)
+
+# Maximum number of queued messages to send per minute (0 for no limit)
+EMAIL_OUTBOX_RATE_LIMIT = config('EMAIL_OUTBOX_RATE_LIMIT', cast=int, default=0)
+
+# Number of attempts to deliver a queued message before giving up
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', cast=int, default=8)
+
 # Ticket system for user support
 TICKET_SYSTEM_URL = config('TICKET_SYSTEM_URL', default=None)
 
@@ -47,3 +47,4 @@
 if RUNNING_TEST_SUITE:
     MEDIA_ROOT = os.path.join(MEDIA_ROOT, 'test')
     STATICFILES_DIRS[0] = os.path.join(STATICFILES_DIRS[0], 'test')
+    LOG_FLUSH_INTERVAL = 0
@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import tempfile
+import time
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from physionet import metrics
+from physionet.utility import serve_file
+
+
+def sample(text, name, **labels):
+    """
+    Find the value of a sample in the metrics exposition format.
+    """
+    label_text = ','.join(f'{key}="{value}"' for (key, value) in labels.items())
+    if label_text:
+        label_text = '{' + label_text + '}'
+    match = re.search(rf'^{re.escape(name + label_text)} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_DIR=None)
+class TestMetrics(TestCase):
+    """
+    Test collection and reporting of metrics.
+    """
+    def setUp(self):
+        self.counter = metrics.Counter('test_events_total', 'Test events', ['kind'])
+        self.histogram = metrics.Histogram('test_duration_seconds', 'Test durations', buckets=(0.1, 1))
+
+    def tearDown(self):
+        del metrics._registry['test_events_total']
+        del metrics._registry['test_duration_seconds']
+
+    def test_exposition(self):
+        self.counter.inc(kind='a')
+        self.counter.inc(2, kind='a "quoted"')
+        for value in (0.05, 0.1, 0.5, 2):
+            self.histogram.observe(value)
+        text = metrics.exposition()
+        self.assertIn('# TYPE test_events_total counter\n'
+                      'test_events_total{kind="a"} 1\n'
+                      'test_events_total{kind="a \\"quoted\\""} 2\n', text)
+        self.assertIn('# TYPE test_duration_seconds histogram\n'
+                      'test_duration_seconds_bucket{le="0.1"} 2\n'
+                      'test_duration_seconds_bucket{le="1"} 3\n'
+                      'test_duration_seconds_bucket{le="+Inf"} 4\n'
+                      'test_duration_seconds_sum 2.65\n'
+                      'test_duration_seconds_count 4\n', text)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.counter.inc(kind='a')
+        self.assertEqual(self.counter.values, {})
+
+    def test_multiple_processes(self):
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            with open(os.path.join(metrics_dir, '1-other.json'), 'w') as f:
+                json.dump({'test_events_total': [[['a'], 5]],
+                           'test_duration_seconds': [[[], [1, 0, 0, 0.05]]]}, f)
+            with override_settings(METRICS_DIR=metrics_dir):
+                self.counter.inc(kind='a')
+                self.histogram.observe(0.5)
+                text = metrics.exposition()
+        self.assertEqual(sample(text, 'test_events_total', kind='a'), 6)
+        self.assertEqual(sample(text, 'test_duration_seconds_bucket', le='0.1'), 1)
+        self.assertEqual(sample(text, 'test_duration_seconds_count'), 2)
+
+    @override_settings(METRICS_MAX_AGE=3600, METRICS_MAX_FILES=3)
+    def test_prune(self):
+        """
+        Check that snapshots of old processes are removed.
+        """
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            now = time.time()
+            for name, age in (('1-old.json', 7200), ('2-a.json', 30), ('3-b.json', 20),
+                              ('4-c.json', 10), ('5-old.tmp', 7200)):
+                path = os.path.join(metrics_dir, name)
+                with open(path, 'w') as f:
+                    json.dump({'test_events_total': [[['a'], 1]]}, f)
+                os.utime(path, (now - age, now - age))
+            with override_settings(METRICS_DIR=metrics_dir):
+                text = metrics.exposition()
+                own = os.path.basename(metrics._state['path'])
+            self.assertEqual(sorted(os.listdir(metrics_dir)), sorted(['3-b.json', '4-c.json', own]))
+        self.assertEqual(sample(text, 'test_events_total', kind='a'), 2)
+
+    def test_templates(self):
+        backend = metrics.TimedTemplates({'NAME': 'timed', 'DIRS': [], 'APP_DIRS': False, 'OPTIONS': {}})
+        before = sample(metrics.exposition(), 'physionet_template_render_seconds_count', template='<string>')
+        self.assertEqual(backend.from_string('{{ x }}').render({'x': 'hello'}), 'hello')
+        after = sample(metrics.exposition(), 'physionet_template_render_seconds_count', template='<string>')
+        self.assertEqual(after, before + 1)
+
+    def test_serve_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.txt') as f:
+            f.write(b'x' * 1000)
+            f.flush()
+            before = sample(metrics.exposition(), 'physionet_file_served_bytes_total', method='direct')
+            serve_file(f.name)
+            after = sample(metrics.exposition(), 'physionet_file_served_bytes_total', method='direct')
+        self.assertEqual(after, before + 1000)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint(self):
+        self.client.get(reverse('home'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertGreater(sample(text, 'physionet_request_duration_seconds_count', view='home', method='GET'), 0)
+        self.assertIn('physionet_request_db_duration_seconds_count{view="home"}', text)
+
+        self.client.login(username='admin', password='Tester11!')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+
+        self.client.login(username='rgmark', password='Tester11!')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_endpoint_disabled(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 404)
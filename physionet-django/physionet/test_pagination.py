@@ -0,0 +1,122 @@
+import base64
+import json
+
+from django.db.models.functions import Coalesce
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from physionet.pagination import LAST_PAGE, CursorPaginator, cursor_paginate
+from project.models import ActiveProject, PublishedProject
+from user.models import User
+from user.test_views import TestMixin
+
+
+class TestCursorPaginator(TestCase):
+    """
+    Test keyset pagination of one or more querysets.
+    """
+    def walk(self, paginator, backward=False):
+        """Return the objects on each page, following the page links."""
+        pages = []
+        page = paginator.get_page(before=LAST_PAGE) if backward else paginator.get_page()
+        while True:
+            pages.append(list(page))
+            if backward and page.has_previous():
+                page = paginator.get_page(before=page.previous_cursor)
+            elif not backward and page.has_next():
+                page = paginator.get_page(after=page.next_cursor)
+            else:
+                break
+        if backward:
+            pages.reverse()
+        return pages
+
+    def test_single_source(self):
+        users = User.objects.order_by('-is_admin', 'username')
+        expected = list(users)
+        self.assertGreater(len(expected), 3)
+
+        pages = self.walk(CursorPaginator(users, 3))
+        self.assertTrue(all(len(page) == 3 for page in pages[:-1]))
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(sum(self.walk(CursorPaginator(users, 3), backward=True), []), expected)
+
+    def test_merge(self):
+        """
+        Check that several querysets are merged in order, including
+        rows with equal keys.
+        """
+        active = ActiveProject.objects.annotate(date=Coalesce('submission_datetime', 'creation_datetime'))
+        published = PublishedProject.objects.annotate(date=Coalesce('publish_datetime', 'publish_datetime'))
+        # Make some of the keys identical
+        first = published.order_by('id').first()
+        ActiveProject.objects.filter(id__in=active.order_by('id').values('id')[:2]).update(
+            submission_datetime=first.publish_datetime, creation_datetime=first.publish_datetime)
+
+        sources = [active.order_by('-date', '-id'), published.order_by('-date', '-id')]
+        expected = sorted(list(sources[0]) + list(sources[1]),
+                          key=lambda obj: (obj.date, -isinstance(obj, PublishedProject), obj.id), reverse=True)
+        for per_page in (1, 2, 5):
+            paginator = CursorPaginator(sources, per_page)
+            self.assertEqual(sum(self.walk(paginator), []), expected)
+            self.assertEqual(sum(self.walk(paginator, backward=True), []), expected)
+            self.assertEqual(paginator.count, len(expected))
+
+    def test_invalid(self):
+        users = User.objects.order_by('username')
+        paginator = CursorPaginator(users, 2)
+        first_page = list(paginator.get_page())
+        tampered = [[0, ['a', 'x']], [0, ['a', [1]]], [0, ['a', None]], [0, ['a', 'True']],
+                    [True, ['a', 1]], [0.0, ['a', 1]], {'0': 1}]
+        for cursor in ['x', 'WzAsIFsiYSJdXQ', 'WzUsIFsiYSIsIDFdXQ'] + [
+                base64.urlsafe_b64encode(json.dumps(data).encode()).decode() for data in tampered]:
+            self.assertEqual(list(paginator.get_page(after=cursor)), first_page)
+            self.assertEqual(list(paginator.get_page(before=cursor)), first_page)
+
+        # Dates are checked as well
+        projects = PublishedProject.objects.order_by('-publish_datetime')
+        paginator = CursorPaginator(projects, 1)
+        first_page = list(paginator.get_page())
+        for value in ('2020-13-45', 'not a date'):
+            cursor = base64.urlsafe_b64encode(json.dumps([0, [value, 1]]).encode()).decode()
+            self.assertEqual(list(paginator.get_page(after=cursor)), first_page)
+
+        with self.assertRaises(ValueError):
+            CursorPaginator(User.objects.all(), 2)
+        with self.assertRaises(ValueError):
+            CursorPaginator([users, User.objects.order_by('-username')], 2)
+
+    def test_deep_pages(self):
+        """
+        Check that fetching a page costs the same number of queries,
+        however deep it is.
+        """
+        users = User.objects.order_by('username')
+        paginator = CursorPaginator(users, 1)
+        last_page = paginator.get_page(before=LAST_PAGE)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(before=last_page.previous_cursor)
+        request = RequestFactory().get('/', {'after': page.next_cursor})
+        with self.assertNumQueries(1):
+            self.assertEqual(list(cursor_paginate(request, users, 1)), list(last_page))
+
+
+class TestCursorPaginationViews(TestMixin):
+    """
+    Test console listings that use keyset pagination.
+    """
+    def test_listings(self):
+        self.client.login(username='admin', password='Tester11!')
+        for url in (reverse('credential_applications', args=('successful',)),
+                    reverse('credential_applications', args=('unsuccessful',)),
+                    reverse('credential_applications', args=('pending',)),
+                    reverse('users', args=('all',)),
+                    reverse('training_list', args=('review',)),
+                    reverse('training_list', args=('valid',)),
+                    reverse('user_access_logs'),
+                    reverse('project_access_logs'),
+                    reverse('published_projects')):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            response = self.client.get(url, {'before': LAST_PAGE})
+            self.assertEqual(response.status_code, 200, url)
@@ -0,0 +1,91 @@
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from physionet.middleware.profiling import check_profile_token, list_profiles, make_profile_token
+
+
+class TestProfiling(TestCase):
+    """
+    Test on-demand profiling of requests.
+    """
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        settings_override = override_settings(PROFILING_DIR=self.profile_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        User = get_user_model()
+        self.admin = User.objects.get(username='admin')
+        self.user = User.objects.get(username='rgmark')
+
+    def test_token(self):
+        """
+        Check that only users with the required permission can create
+        valid tokens.
+        """
+        self.assertEqual(check_profile_token(make_profile_token(self.admin)), self.admin)
+        self.assertIsNone(check_profile_token(make_profile_token(self.user)))
+        self.assertIsNone(check_profile_token(make_profile_token(self.admin) + 'x'))
+        with override_settings(PROFILING_TOKEN_MAX_AGE=-1):
+            self.assertIsNone(check_profile_token(make_profile_token(self.admin)))
+
+    def test_profile_request(self):
+        """
+        Check that a request with a valid token is profiled.
+        """
+        token = make_profile_token(self.admin)
+        response = self.client.get(reverse('home'), {'_profile': token, 'x': '1'})
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+        self.assertEqual([profile[0] for profile in list_profiles()], [profile_id])
+
+        self.client.login(username='admin', password='Tester11!')
+        response = self.client.get(reverse('profile_file', args=(profile_id,)))
+        self.assertEqual(response.status_code, 200)
+        profile = json.loads(response.content)
+        self.assertEqual(profile['name'], 'GET /?x=1')
+        self.assertEqual(profile['profiles'][0]['type'], 'sampled')
+        self.assertNotIn(token, json.dumps(profile))
+
+        response = self.client.get(reverse('profiling'))
+        self.assertContains(response, profile_id)
+
+        # The token can also be sent as a header
+        response = self.client.get(reverse('home'), HTTP_X_PROFILE_TOKEN=token)
+        self.assertIn('X-Profile-Id', response)
+
+    def test_invalid_token(self):
+        """
+        Check that requests without a valid token are not profiled.
+        """
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('X-Profile-Id', response)
+        response = self.client.get(reverse('home'), {'_profile': make_profile_token(self.user)})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list_profiles(), [])
+
+    def test_max_files(self):
+        """
+        Check that old profiles are removed.
+        """
+        token = make_profile_token(self.admin)
+        with override_settings(PROFILING_MAX_FILES=2):
+            for _ in range(3):
+                self.client.get(reverse('home'), HTTP_X_PROFILE_TOKEN=token)
+        self.assertEqual(len(list_profiles()), 2)
+
+    def test_permissions(self):
+        """
+        Check that profiles are only visible to authorized users.
+        """
+        self.client.login(username='rgmark', password='Tester11!')
+        response = self.client.get(reverse('profiling'))
+        self.assertNotEqual(response.status_code, 200)
+        response = self.client.get(reverse('profile_file', args=('0' * 32,)))
+        self.assertNotEqual(response.status_code, 200)
@@ -0,0 +1,78 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from physionet.middleware.querycount import QueryRecorder
+from user.models import User
+from user.test_views import TestMixin
+
+
+class TestQueryRecorder(TestCase):
+    """
+    Test recording of database queries.
+    """
+    def test_duplicates(self):
+        with QueryRecorder() as recorder:
+            for username in ('rgmark', 'admin', 'aewj'):
+                User.objects.get(username=username)
+            User.objects.count()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicate_count(), 2)
+        [(sql, n)] = recorder.duplicates()
+        self.assertEqual(n, 3)
+        self.assertIn('"username" = %s', sql)
+
+        # Queries after the block are not recorded
+        User.objects.count()
+        self.assertEqual(recorder.count, 4)
+
+    @override_settings(QUERY_COUNT_HEADERS=True)
+    def test_headers(self):
+        response = self.client.get(reverse('home'))
+        self.assertGreater(int(response['X-DB-Query-Count']), 0)
+        self.assertGreaterEqual(float(response['X-DB-Query-Time']), 0)
+        self.assertIn('X-DB-Duplicate-Queries', response)
+
+    @override_settings(QUERY_COUNT_LOG_THRESHOLD=1)
+    def test_log(self):
+        with self.assertLogs('physionet.middleware.querycount', 'WARNING') as logs:
+            response = self.client.get(reverse('home'))
+        self.assertNotIn('X-DB-Query-Count', response)
+        self.assertRegex(logs.output[0], r'home: \d+ queries')
+
+
+class TestQueryBudgets(TestMixin):
+    """
+    Test that frequently used views do not make excessive queries.
+
+    If one of these tests fails, check the repeated queries listed in
+    the failure message before raising the limit.
+    """
+    def test_published_project(self):
+        url = reverse('published_project', args=('demobsn', '1.0'))
+        response = self.assertMaxQueries(40, self.client.get, url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_project_authors(self):
+        self.client.login(username='rgmark', password='Tester11!')
+        url = reverse('project_authors', args=('T108xFtYkRAxiRiuOLEJ',))
+        response = self.assertMaxQueries(40, self.client.get, url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_console(self):
+        self.client.login(username='admin', password='Tester11!')
+        with self.assertMaxQueries(35):
+            response = self.client.get(reverse('submission_info', args=('p7TCIMkltNswuOB9FZH1',)))
+        self.assertEqual(response.status_code, 200)
+        with self.assertMaxQueries(20):
+            response = self.client.get(reverse('submitted_projects'))
+        self.assertEqual(response.status_code, 200)
+        with self.assertMaxQueries(45):
+            response = self.client.get(reverse('published_projects'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_failure_message(self):
+        message = r'3 queries executed, 2 expected at most. Repeated queries:\n3 x SELECT'
+        with self.assertRaisesRegex(AssertionError, message):
+            with self.assertMaxQueries(2):
+                for username in ('rgmark', 'admin', 'aewj'):
+                    User.objects.get(username=username)
@@ -1,10 +1,13 @@
+import base64
+import hashlib
 import os
 import shutil
 import tempfile
 import unittest
 import zipfile
 
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
 
 from physionet import utility
 
@@ -77,3 +80,38 @@ def test_zip_permissions(self):
         with open(zip_path2, 'rb') as zf2:
             contents2 = zf2.read()
         self.assertEqual(contents1, contents2)
+
+
+@override_settings(MEDIA_X_ACCEL_ALIAS='/protected', SECURE_LINK_SECRET='secret',
+                   SECURE_LINK_PREFIX='/signed-files', SECURE_LINK_MAX_AGE=60)
+class TestSecureLink(TestCase):
+    """
+    Test signed links for nginx's secure_link module.
+    """
+
+    def test_signature(self):
+        """
+        Test that the link is signed the way nginx expects.
+        """
+        dir_path = os.path.join(settings.MEDIA_ROOT, 'published-projects', 'demo', '1.0', 'a b') + '/'
+        url = utility.secure_link_url(dir_path, 7)
+
+        prefix, token, expires, user_id, scope = url.split('/', 5)[1:]
+        self.assertEqual(prefix, 'signed-files')
+        self.assertEqual(user_id, '7')
+        self.assertEqual(scope, 'published-projects/demo/1.0/a%20b/-/')
+        signed = f'{expires}/7/published-projects/demo/1.0/a b/ secret'
+        expected = base64.urlsafe_b64encode(hashlib.md5(signed.encode()).digest()).decode().rstrip('=')
+        self.assertEqual(token, expected)
+
+    def test_invalid(self):
+        """
+        Test that directories that cannot be signed are rejected.
+        """
+        media_root = settings.MEDIA_ROOT
+        self.assertIsNone(utility.secure_link_url('/etc/', 1))
+        self.assertIsNone(utility.secure_link_url(media_root + '/', 1))
+        self.assertIsNone(utility.secure_link_url(media_root + '/published-projects/-/', 1))
+        self.assertIsNone(utility.secure_link_url(media_root + '/published-projects/../', 1))
+        with self.settings(SECURE_LINK_SECRET=''):
+            self.assertIsNone(utility.secure_link_url(media_root + '/published-projects/', 1))
@@ -41,6 +41,7 @@
 
     path('', views.home, name='home'),
     path('ping/', views.ping),
+    path('metrics/', views.metrics, name='metrics'),
 
     # about pages
     path('about/timeline', views.timeline, name='timeline'),
@@ -117,4 +118,8 @@
     'lightwave_server_compat': {
         '_skip_': lambda: (shutil.which('sandboxed-lightwave') is None),
     },
+    'metrics': {
+        '_user_': 'admin',
+        '_skip_': lambda: not settings.METRICS_ENABLED,
+    },
 }
@@ -1,3 +1,5 @@
+import base64
+import hashlib
 import logging
 import os
 import re
@@ -5,6 +7,7 @@
 import struct
 import subprocess
 import tempfile
+import time
 import urllib.parse
 
 from django.conf import settings
@@ -12,6 +15,8 @@
 from django.utils.html import format_html
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
+from physionet import metrics
+
 LOGGER = logging.getLogger(__name__)
 
 CONTENT_TYPE = {
@@ -113,6 +118,13 @@ def serve_file(file_path, attach=True, allow_directory=False, sandbox=True):
         response = HttpResponse()
         response['X-Accel-Redirect'] = urllib.parse.quote(accel_path)
         response['Content-Type'] = ''
+        if settings.METRICS_ENABLED:
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+            metrics.FILES_SERVED.inc(method='x-accel')
+            metrics.FILE_BYTES_SERVED.inc(size, method='x-accel')
     else:
         if file_path.endswith('/') and allow_directory:
             html = '<!DOCTYPE html><html><body><ul>\n'
@@ -124,6 +136,8 @@ def serve_file(file_path, attach=True, allow_directory=False, sandbox=True):
             with open(file_path, 'rb') as f:
                 response = HttpResponse(f.read())
                 response['Content-Type'] = file_content_type(file_path)
+            metrics.FILES_SERVED.inc(method='direct')
+            metrics.FILE_BYTES_SERVED.inc(len(response.content), method='direct')
     base = os.path.basename(file_path)
     try:
         if sandbox:
@@ -137,6 +151,39 @@ def serve_file(file_path, attach=True, allow_directory=False, sandbox=True):
     return response
 
 
+def secure_link_url(dir_path, user_id):
+    """
+    Return a signed, expiring URL for a directory in MEDIA_ROOT.
+
+    The URL lets the client download the directory listing and any
+    file within the directory (or its subdirectories) directly from
+    nginx, using the secure_link module, until it expires after
+    settings.SECURE_LINK_MAX_AGE seconds.  The signature covers the
+    expiration time, the user ID and the directory; see
+    deploy/common/etc/nginx/snippets/physionet-https.conf.
+
+    Return None if signed links are not enabled, or if the directory
+    cannot be served this way.
+    """
+    secret = settings.SECURE_LINK_SECRET
+    media_root = settings.MEDIA_ROOT
+    if not (secret and settings.MEDIA_X_ACCEL_ALIAS and dir_path.startswith(media_root + '/')):
+        return None
+
+    # The scope of the link is the directory relative to MEDIA_ROOT.
+    # A '-' path component marks the end of the scope in the URL.
+    parts = [part for part in dir_path[len(media_root) + 1:].split('/') if part]
+    if not parts or any(part in ('.', '..', '-') for part in parts):
+        return None
+    scope = '/'.join(parts) + '/'
+
+    expires = int(time.time()) + settings.SECURE_LINK_MAX_AGE
+    digest = hashlib.md5(f'{expires}/{user_id}/{scope} {secret}'.encode()).digest()
+    token = base64.urlsafe_b64encode(digest).decode().rstrip('=')
+    return '{}/{}/{}/{}/{}-/'.format(settings.SECURE_LINK_PREFIX, token, expires, user_id,
+                                     urllib.parse.quote(scope))
+
+
 def sorted_tree_files(directory, *, prefix=''):
     """
     Return the recursive contents of a directory in order.
@@ -1,3 +1,4 @@
+import hmac
 from collections import OrderedDict
 from os import path
 from re import fullmatch
@@ -13,6 +14,7 @@
 from django.http import Http404, HttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from notification.models import News
+from physionet import metrics as physionet_metrics
 from physionet.models import FrontPageButton, Section, StaticPage
 from physionet.middleware.maintenance import allow_post_during_maintenance
 from project.models import AccessPolicy, DUA, License, ProjectType, PublishedProject
@@ -48,6 +50,27 @@ def ping(request):
     return HttpResponse(status=200)
 
 
+def metrics(request):
+    """
+    Report metrics in the Prometheus text format.
+
+    The client must either send the bearer token settings.METRICS_TOKEN,
+    or be logged in as a user with permission to view statistics.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404()
+
+    authorization = request.headers.get('Authorization', '').encode()
+    token = settings.METRICS_TOKEN
+    if not (token and hmac.compare_digest(authorization, f'Bearer {token}'.encode())
+            or request.user.has_perm('project.can_view_stats')):
+        response = HttpResponse('Authentication required', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    return HttpResponse(physionet_metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def license_content(request, license_slug):
     """
     Content for an individual license
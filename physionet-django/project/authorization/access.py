@@ -1,12 +1,28 @@
+import hashlib
+import hmac
 from datetime import datetime
 
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db.models import Q
 
 from events.models import Event, EventDataset
 from project.authorization.events import has_access_to_event_dataset
-from project.models import AccessPolicy, DUASignature, DataAccessRequest, PublishedProject
+from project.models import (
+    AccessPolicy,
+    DUASignature,
+    DataAccessRequest,
+    PublishedProject,
+    anonymous_url_cache_key,
+)
 from user.models import Training, TrainingType
 
+# Signed cookie that grants anonymous access to a project, and the
+# number of seconds for which it is valid
+ANONYMOUS_ACCESS_COOKIE = 'anonymousaccess'
+ANONYMOUS_ACCESS_MAX_AGE = 60 * 60
+
 
 def get_public_projects_query():
     """Returns query filter for public published projects"""
@@ -134,3 +150,73 @@ def can_view_project_files(project, user):
     Currently used to allow direct file downloads and to show project files on the platform
     """
     return can_access_project(project, user) and project.allow_file_downloads
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def has_anonymous_access(request, project):
+    """
+    Checks if the request has a valid anonymous access cookie for the project
+    The database is not queried if the request has no cookie.  If
+    settings.ANONYMOUS_ACCESS_CACHE_TIMEOUT is set, the digest of the
+    project's current anonymous access URL is cached.
+    """
+    url = request.get_signed_cookie(ANONYMOUS_ACCESS_COOKIE, None, max_age=ANONYMOUS_ACCESS_MAX_AGE)
+    if not url:
+        return False
+
+    timeout = settings.ANONYMOUS_ACCESS_CACHE_TIMEOUT
+    key = anonymous_url_cache_key(ContentType.objects.get_for_model(project).id, project.pk)
+    digest = cache.get(key) if timeout else None
+    if digest is None:
+        current_url = project.get_anonymous_url()
+        digest = _digest(current_url) if current_url else ''
+        if timeout:
+            cache.set(key, digest, timeout)
+    return bool(digest) and hmac.compare_digest(digest, _digest(url))
+
+
+def _count_attempt(key, window):
+    if cache.add(key, 1, window):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The counter expired since it was added
+        cache.set(key, 1, window)
+        return 1
+
+
+def anonymous_login_throttled(request, anonymous_url):
+    """
+    Records an attempt to enter the passphrase for an anonymous access URL
+    Returns the number of seconds that the client should wait before
+    trying again, or 0 if the passphrase may be checked.
+
+    Each client address may make settings.ANONYMOUS_ACCESS_MAX_ATTEMPTS
+    attempts within settings.ANONYMOUS_ACCESS_ATTEMPT_WINDOW seconds.
+    Once the URL has received more than
+    settings.ANONYMOUS_ACCESS_MAX_URL_ATTEMPTS attempts in total, each
+    address is also limited to one attempt every
+    settings.ANONYMOUS_ACCESS_SLOW_INTERVAL seconds; this slows down
+    guessing from many addresses without locking out the reviewer.
+
+    The address is REMOTE_ADDR, since nginx does not pass a trusted
+    X-Forwarded-For header.
+    """
+    window = settings.ANONYMOUS_ACCESS_ATTEMPT_WINDOW
+    url_key = f'project.anonymouslogin:{_digest(anonymous_url)}'
+    client_key = f'{url_key}:{_digest(request.META.get("REMOTE_ADDR", ""))}'
+
+    limit = settings.ANONYMOUS_ACCESS_MAX_ATTEMPTS
+    if limit and _count_attempt(client_key, window) > limit:
+        return window
+
+    limit = settings.ANONYMOUS_ACCESS_MAX_URL_ATTEMPTS
+    if limit and _count_attempt(url_key, window) > limit:
+        interval = settings.ANONYMOUS_ACCESS_SLOW_INTERVAL
+        if not cache.add(client_key + ':slow', 1, interval):
+            return interval
+    return 0
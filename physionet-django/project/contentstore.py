@@ -0,0 +1,130 @@
+"""
+Content-addressed storage for published project files.
+
+Published files never change, and many of them are identical to files
+in other projects or other versions of the same project (for example,
+when a new version is uploaded from scratch rather than copied from the
+previous one.)  A ContentStore keeps a single copy of each distinct
+file, named by its SHA-256 digest, and project files are hard links to
+these copies ("blobs").
+
+Since project files remain ordinary files, they are listed and served
+exactly as before.  The link count of a blob acts as its reference
+count: a blob with no other links is no longer part of any project,
+and is removed by collect_garbage.
+
+Hard links only work within a single filesystem, and may be refused
+by filesystems that enforce per-directory quotas; in that case, files
+are simply left as they are.
+"""
+import contextlib
+import logging
+import os
+import stat
+
+LOGGER = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def _writable_directory(directory):
+    """
+    Temporarily make a directory writable by its owner.
+
+    Published project directories are read-only (mode 0555); their
+    original mode is restored afterwards.
+    """
+    mode = stat.S_IMODE(os.stat(directory).st_mode)
+    if mode & stat.S_IWUSR:
+        yield directory
+        return
+    os.chmod(directory, mode | stat.S_IWUSR)
+    try:
+        yield directory
+    finally:
+        os.chmod(directory, mode)
+
+
+class ContentStore:
+    """
+    Directory of files named by their SHA-256 digests.
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def blob_path(self, sha256):
+        """Return the path of the blob with the given digest."""
+        return os.path.join(self.root, sha256[0:2], sha256[2:4], sha256)
+
+    def add(self, path, sha256, preserve_mtime=False):
+        """
+        Add a file to the store.
+
+        If the store already contains a blob with the given digest,
+        the file is replaced with a link to that blob; otherwise, the
+        file becomes the blob.  `sha256` must be the digest of the
+        file's current contents, and the file must not be modified
+        afterwards.
+
+        Replacing a file changes its modification time to that of
+        the blob.  If `preserve_mtime` is true (as it should be for
+        files that clients may already have downloaded), the file is
+        only replaced if both times are the same.
+
+        Returns True if the file is now stored as a blob, or False if
+        it could not be linked.
+        """
+        blob = self.blob_path(sha256)
+        try:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)
+                return True
+            except FileExistsError:
+                pass
+
+            file_stat = os.stat(path)
+            blob_stat = os.stat(blob)
+            if os.path.samestat(file_stat, blob_stat):
+                return True
+            if file_stat.st_size != blob_stat.st_size:
+                LOGGER.error('Size of %s does not match %s', blob, path)
+                return False
+            if preserve_mtime and file_stat.st_mtime_ns != blob_stat.st_mtime_ns:
+                return False
+
+            # Replace the file atomically, so that it is never missing
+            with _writable_directory(os.path.dirname(path)) as directory:
+                tmp_path = os.path.join(directory, '.{}.{}.tmp'.format(sha256, os.getpid()))
+                os.link(blob, tmp_path)
+                try:
+                    os.replace(tmp_path, path)
+                except OSError:
+                    os.unlink(tmp_path)
+                    raise
+            return True
+        except FileNotFoundError:
+            # The blob may have been removed by collect_garbage after
+            # it was found above
+            if os.path.exists(path) and not os.path.exists(blob):
+                return self.add(path, sha256, preserve_mtime)
+            raise
+        except OSError as exc:
+            LOGGER.warning('Cannot store %s as %s: %s', path, blob, exc)
+            return False
+
+    def collect_garbage(self):
+        """
+        Remove blobs that are no longer linked to any project file.
+
+        Returns the number of blobs removed and their total size.
+        """
+        count = size = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                blob = os.path.join(directory, name)
+                st = os.stat(blob)
+                if st.st_nlink == 1:
+                    os.unlink(blob)
+                    count += 1
+                    size += st.st_size
+        return count, size
@@ -1,14 +1,16 @@
 import csv
 
-import chardet
-
 from project.fileviews.base import FileView, GzippedFileView
-from project.fileviews.text import probably_binary
+from project.fileviews.text import StreamDecoder, probably_binary
 
 MAX_ROWS = 500
 MAX_COLUMNS = 50
 MAX_BYTES = 512 * 1024
 
+# Maximum number of bytes that may be scanned (or decompressed) to
+# locate the first row requested by read_rows()
+MAX_SCAN_BYTES = 64 * 1024 * 1024
+
 
 class CSVFileView(FileView):
     """
@@ -18,9 +20,10 @@ class CSVFileView(FileView):
     (more than 50 columns, 500 rows, or 512 kilobytes in total) will
     be truncated to avoid overloading the browser.
 
-    The character encoding is heuristically determined by the chardet
-    library.  Format variations are heuristically determined by the
-    csv library.
+    The character encoding is assumed to be UTF-8 if possible, and
+    otherwise heuristically determined by the chardet library (see
+    StreamDecoder.)  Format variations are heuristically determined by
+    the csv library.
     """
 
     def render(self, request, delimiters=[',']):
@@ -29,35 +32,27 @@ def render(self, request, delimiters=[',']):
         if probably_binary(text) or b'\n' not in text:
             return super().render(request)
 
-        detector = chardet.UniversalDetector()
-        detector.feed(text)
-
-        # Decode initial text as Latin-1 and try to detect format
-        text = text.decode('ISO-8859-1')
-        s = csv.Sniffer()
-        try:
-            dialect = s.sniff(text, delimiters=delimiters)
-            has_header = s.has_header(text)
-        except csv.Error:
-            dialect = None
-            has_header = False
+        # Decode initial text and try to detect format
+        decoder = StreamDecoder()
+        limit = MAX_BYTES - len(text)
+        text = decoder.decode(text)
+        dialect, has_header = sniff_dialect(text, delimiters)
 
         # Read lines from input, stopping after reading at most MAX_BYTES
-        def wrapper(file, text):
-            limit = MAX_BYTES - len(text)
+        def wrapper(file, text, limit):
             while text:
                 lines = text.split('\n')
                 text = lines.pop()
                 yield from lines
-                ntext = file.read(4096)
-                limit -= len(ntext)
+                data = file.read(4096)
+                limit -= len(data)
                 if limit < 0:
                     raise SizeLimitExceeded()
+                ntext = decoder.decode(data, final=(not data))
                 if not ntext and text:
                     yield text
                     raise MissingNewline()
-                detector.feed(ntext)
-                text += ntext.decode('ISO-8859-1')
+                text += ntext
 
         # Read data and parse at most MAX_ROWS
         truncated_rows = None
@@ -65,7 +60,7 @@ def wrapper(file, text):
         missing_newline = False
         rows = []
         try:
-            reader = csv.reader(wrapper(self.file, text), dialect=dialect)
+            reader = csv.reader(wrapper(self.file, text, limit), dialect=dialect)
             for row in reader:
                 if len(rows) >= MAX_ROWS:
                     raise SizeLimitExceeded()
@@ -78,17 +73,9 @@ def wrapper(file, text):
         except MissingNewline:
             missing_newline = True
 
-        # Try to guess encoding
-        detector.close()
-        encoding = detector.result['encoding']
-        if not encoding or not rows:
+        if not rows:
             return super().render(request)
 
-        # If encoding is not Latin-1, recode the parsed strings
-        if encoding.upper() not in ('ISO-8859-1', 'ASCII'):
-            rows = ((v.encode('ISO-8859-1').decode(encoding) for v in r)
-                    for r in rows)
-
         rows = iter(rows)
         if has_header:
             header_row = next(rows)
@@ -107,6 +94,73 @@ class GzippedCSVFileView(GzippedFileView, CSVFileView):
     pass
 
 
+def sniff_dialect(text, delimiters=[',']):
+    """
+    Guess the format of a CSV file from an initial sample.
+
+    Returns a tuple (dialect, has_header); dialect is None if the
+    format could not be determined.
+    """
+    s = csv.Sniffer()
+    try:
+        return s.sniff(text, delimiters=delimiters), s.has_header(text)
+    except csv.Error:
+        return None, False
+
+
+def read_rows(file, index, start, count, delimiters=[',']):
+    """
+    Read a page of rows from a CSV file.
+
+    file is a seekable binary file object, and index is a
+    project.rowindex.LineIndex for that file, which will be extended
+    as needed.  Rows are numbered from zero, and are assumed to
+    correspond to lines of the file (quoted values containing line
+    breaks are not supported.)  At most `count` rows (limited to
+    MAX_ROWS and MAX_BYTES), each with at most MAX_COLUMNS values, are
+    returned.
+
+    Returns a tuple (header_row, start, rows), where header_row is the
+    first row if the file appears to have a header (otherwise None),
+    and start is the index of the first row returned.
+
+    Raises project.rowindex.ScanLimitExceeded if locating the first
+    row would require scanning more than MAX_SCAN_BYTES beyond the
+    part of the file that has already been indexed.
+    """
+    file.seek(0)
+    sample = StreamDecoder().decode(file.read(16384))
+    dialect, has_header = sniff_dialect(sample, delimiters)
+    header_row = None
+    if has_header:
+        header_row = next(csv.reader([sample.split('\n', 1)[0]], dialect=dialect), None)
+
+    start, _ = index.find(file, start, MAX_SCAN_BYTES)
+    decoder = StreamDecoder()
+    lines = []
+    text = ''
+    limit = MAX_BYTES
+    count = min(count, MAX_ROWS)
+    while len(lines) < count and limit > 0:
+        data = file.read(min(16384, limit))
+        limit -= len(data)
+        text += decoder.decode(data, final=(not data))
+        if not data:
+            if text:
+                lines.append(text)
+            # End of file reached; record the total number of rows
+            index.extend(file, start + len(lines))
+            break
+        *new_lines, text = text.split('\n')
+        lines += new_lines
+    lines = lines[:count]
+
+    rows = [row[:MAX_COLUMNS] for row in csv.reader(lines, dialect=dialect)]
+    if header_row is not None:
+        header_row = header_row[:MAX_COLUMNS]
+    return header_row, start, rows
+
+
 class SizeLimitExceeded(Exception):
     pass
 
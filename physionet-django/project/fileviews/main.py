@@ -7,6 +7,7 @@
 from project.fileviews.csv import CSVFileView, GzippedCSVFileView
 from project.fileviews.image import ImageFileView
 from project.fileviews.inline import InlineFileView
+from project.fileviews.parquet import ParquetFileView
 from project.fileviews.text import TextFileView
 
 _suffixes = {
@@ -18,6 +19,7 @@
     '.jpeg': ImageFileView,
     '.jpg': ImageFileView,
     '.png': ImageFileView,
+    '.parquet': ParquetFileView,
     '.pdf': InlineFileView,
     '.svg': ImageFileView,
 }
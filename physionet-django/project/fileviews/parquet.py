@@ -0,0 +1,39 @@
+from project import parquet
+from project.fileviews.base import FileView
+
+MAX_COLUMNS = 50
+
+
+class ParquetFileView(FileView):
+    """
+    Class for displaying Apache Parquet files.
+
+    The file's schema and column statistics are read from the footer
+    metadata, and a sample of rows is read from the first row group,
+    so only a small part of the file needs to be read regardless of
+    its size.  The statistics are also available as JSON (see
+    project.views.published_project_file_columns.)
+    """
+
+    def render(self, request):
+        try:
+            metadata = parquet.read_metadata(self.file, self.size())
+            columns = parquet.column_statistics(metadata)
+        except parquet.ParquetError:
+            return super().render(request)
+
+        try:
+            rows, unsupported = parquet.read_sample(self.file, metadata)
+        except parquet.ParquetError:
+            rows, unsupported = [], [c['name'] for c in columns]
+
+        truncated_columns = None
+        if len(columns) > MAX_COLUMNS:
+            truncated_columns = MAX_COLUMNS
+        return super().render(request, 'project/file_view_parquet.html',
+                              metadata=metadata,
+                              columns=columns,
+                              header_row=[c['name'] for c in columns[:MAX_COLUMNS]],
+                              data_rows=[row[:MAX_COLUMNS] for row in rows],
+                              unsupported_columns=unsupported,
+                              truncated_columns=truncated_columns)
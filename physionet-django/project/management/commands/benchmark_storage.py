@@ -0,0 +1,505 @@
+"""
+Benchmark file-heavy code paths against a synthetic project.
+
+A synthetic file tree is generated (optionally with a few very large
+files), and each benchmark is run several times.  The results are
+written as JSON, including the current git commit, so that results
+from different commits can be compared using --compare.
+
+The 'local' backend exercises LocalProjectFiles and the functions it
+is built on (sorted_tree_files, get_tree_size, DemoQuotaManager,
+zip_dir, serve_file).  The 'gcs' backend exercises GCSProjectFiles
+against a GCS emulator such as fake-gcs-server (see the 'gcs' service
+in docker-compose.yml); it must not be pointed at a real GCS account.
+
+Examples:
+
+    ./manage.py benchmark_storage --files 100000 --shape wide > before.json
+    ./manage.py benchmark_storage --files 100000 --shape wide --compare before.json
+    ./manage.py benchmark_storage --backend gcs --gcs-endpoint http://localhost:4443
+"""
+import concurrent.futures
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from physionet.settings.base import StorageTypes
+from physionet.utility import serve_file, sorted_tree_files
+from project.projectfiles.gcs import GCSProjectFiles
+from project.projectfiles.local import LocalProjectFiles
+from project.quota import DemoQuotaManager, GCSQuotaManager
+from project.utility import get_tree_size
+
+SHAPES = ('flat', 'wide', 'deep')
+
+# Size of the random block from which file contents are taken
+_BLOCK_SIZE = 1024 * 1024
+
+# Marker file recording the parameters of a tree created with --root
+_TREE_MARKER = '.benchmark-tree.json'
+
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(value):
+    """
+    Parse a size such as '512', '64K' or '1G' as a number of bytes.
+    """
+    value = value.strip().upper().rstrip('B')
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ''
+    try:
+        return int(float(value[:len(value) - len(unit)]) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise CommandError(f'Invalid size: {value}')
+
+
+class SyntheticTree:
+    """
+    Layout of a synthetic project.
+
+    - 'flat' puts all files in the top-level directory.
+    - 'wide' puts files in about sqrt(N) directories of sqrt(N) files.
+    - 'deep' spreads files over a chain of `depth` nested directories.
+
+    Large files, if any, are placed in a 'large' directory.
+    """
+    def __init__(self, files, shape, file_size, large_files, large_size, depth, seed):
+        self.params = {
+            'files': files, 'shape': shape, 'file_size': file_size,
+            'large_files': large_files, 'large_size': large_size,
+            'depth': depth, 'seed': seed,
+        }
+        self.files = files
+        self.shape = shape
+        self.file_size = file_size
+        self.large_files = large_files
+        self.large_size = large_size
+        self.depth = depth
+        self.block = random.Random(seed).randbytes(max(_BLOCK_SIZE, file_size))
+
+    def _directory(self, index):
+        if self.shape == 'wide':
+            return 'd{:05d}'.format(index // math.ceil(math.sqrt(self.files)))
+        if self.shape == 'deep':
+            return '/'.join('l{:02d}'.format(level) for level in range(index % self.depth))
+        return ''
+
+    def small_files(self):
+        """Generate the relative paths of the small files."""
+        for index in range(self.files):
+            yield os.path.join(self._directory(index), '{:07d}.dat'.format(index))
+
+    def large_file_names(self):
+        """Return the relative paths of the large files."""
+        return ['large/{:02d}.bin'.format(index) for index in range(self.large_files)]
+
+    @property
+    def listing_dir(self):
+        """The (largest) directory used for listing benchmarks."""
+        return self._directory(0)
+
+    def content(self, index):
+        """Return the content of the small file with the given index."""
+        offset = (index * 7919) % (len(self.block) - self.file_size + 1)
+        return self.block[offset:offset + self.file_size]
+
+    def large_chunks(self):
+        """Generate the content of a large file, in chunks."""
+        remaining = self.large_size
+        while remaining > 0:
+            chunk = self.block[:remaining]
+            remaining -= len(chunk)
+            yield chunk
+
+
+class SyntheticProject:
+    """
+    Minimal stand-in for a project, as used by the ProjectFiles
+    methods being benchmarked.
+    """
+    def __init__(self, file_root, zip_path):
+        self._file_root = file_root
+        self._zip_path = zip_path
+        self.compressed_storage_size = 0
+
+    def file_root(self):
+        return self._file_root
+
+    def zip_name(self, full=False):
+        return self._zip_path if full else os.path.basename(self._zip_path)
+
+    def file_manifest_path(self):
+        return os.path.join(os.path.dirname(self._zip_path), 'manifest.ndjson')
+
+    def slugged_label(self):
+        return 'benchmark'
+
+    def set_storage_info(self):
+        pass
+
+    def save(self):
+        pass
+
+
+def _file_url(subdir, file):
+    return '/files/benchmark/1.0/' + os.path.join(subdir, file)
+
+
+class LocalBenchmarks:
+    """
+    Benchmarks for LocalProjectFiles.
+
+    Each benchmark is a generator that performs any setup, yields the
+    function to be timed, and then cleans up.
+    """
+    names = ('sorted_tree_files', 'get_tree_size', 'quota_refresh', 'list_directory',
+             'make_checksum_file', 'make_zip', 'cp_dir', 'serve_file_small', 'serve_file_large')
+
+    def __init__(self, tree, root=None):
+        self.tree = tree
+        self.files = LocalProjectFiles()
+        self.scratch = tempfile.mkdtemp(prefix='benchmark-')
+        self.keep_root = root is not None
+        self.root = root or os.path.join(self.scratch, 'tree')
+        self.project = SyntheticProject(self.root, os.path.join(self.scratch, 'benchmark.zip'))
+
+    def build(self):
+        """Create the tree, unless an identical tree already exists."""
+        marker = os.path.join(self.root, _TREE_MARKER)
+        try:
+            with open(marker) as f:
+                if json.load(f) == self.tree.params:
+                    return False
+        except (OSError, ValueError):
+            pass
+        if os.path.exists(self.root):
+            if os.listdir(self.root) and not os.path.exists(marker):
+                raise CommandError(f'{self.root} is not empty')
+            shutil.rmtree(self.root)
+
+        os.makedirs(self.root)
+        directories = {self.root}
+        for index, path in enumerate(self.tree.small_files()):
+            path = os.path.join(self.root, path)
+            directory = os.path.dirname(path)
+            if directory not in directories:
+                os.makedirs(directory, exist_ok=True)
+                directories.add(directory)
+            with open(path, 'wb') as f:
+                f.write(self.tree.content(index))
+        for path in self.tree.large_file_names():
+            path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                for chunk in self.tree.large_chunks():
+                    f.write(chunk)
+        if self.keep_root:
+            with open(marker, 'w') as f:
+                json.dump(self.tree.params, f)
+        return True
+
+    def cleanup(self):
+        shutil.rmtree(self.scratch)
+
+    def bench_sorted_tree_files(self):
+        yield lambda: sum(1 for _ in sorted_tree_files(self.root))
+
+    def bench_get_tree_size(self):
+        yield lambda: get_tree_size(self.root)
+
+    def bench_quota_refresh(self):
+        quota_manager = DemoQuotaManager(project_path=self.root, creation_time=timezone.now())
+        yield quota_manager.refresh
+
+    def bench_list_directory(self):
+        path = os.path.join(self.root, self.tree.listing_dir)
+        yield lambda: self.files.get_project_directory_content(
+            path, self.tree.listing_dir, _file_url, _file_url)
+
+    def bench_make_checksum_file(self):
+        yield lambda: self.files.make_checksum_file(self.project)
+        os.unlink(os.path.join(self.root, 'SHA256SUMS.txt'))
+
+    def bench_make_zip(self):
+        yield lambda: self.files.make_zip(self.project)
+        os.unlink(self.project.zip_name(full=True))
+
+    def bench_cp_dir(self):
+        target = os.path.join(self.scratch, 'copy')
+        yield lambda: self.files.cp_dir(self.root, target, ignored_files=[])
+        shutil.rmtree(target)
+
+    def bench_serve_file_small(self):
+        path = os.path.join(self.root, next(self.tree.small_files()))
+        yield lambda: serve_file(path)
+
+    def bench_serve_file_large(self):
+        large_files = self.tree.large_file_names()
+        if not large_files:
+            return
+        path = os.path.join(self.root, large_files[0])
+        yield lambda: serve_file(path)
+
+
+class GCSBenchmarks:
+    """
+    Benchmarks for GCSProjectFiles, using a GCS emulator.
+
+    The synthetic tree is uploaded to a new bucket (under the prefix
+    'tree/'), which is deleted afterwards.
+    """
+    names = ('list_directory', 'storage_used', 'quota_refresh', 'cp_dir')
+
+    def __init__(self, tree, endpoint, workers):
+        self.tree = tree
+        self.endpoint = endpoint
+        self.workers = workers
+        self.bucket_name = 'benchmark-' + uuid.uuid4().hex[:12]
+        self.root = self.bucket_name + '/tree'
+        self.files = GCSProjectFiles()
+        self.project = SyntheticProject(self.root, None)
+        self._saved_environ = None
+        self._settings = None
+
+    def _start(self):
+        from google.auth.credentials import AnonymousCredentials
+
+        # The client reads STORAGE_EMULATOR_HOST when it is created.
+        # Signed URLs cannot be created with anonymous credentials, so
+        # public URLs are used instead.
+        self._saved_environ = os.environ.get('STORAGE_EMULATOR_HOST')
+        os.environ['STORAGE_EMULATOR_HOST'] = self.endpoint
+        self._settings = override_settings(
+            STORAGE_TYPE=StorageTypes.GCP,
+            DEFAULT_FILE_STORAGE='physionet.storage.MediaStorage',
+            GS_PROJECT_ID='benchmark',
+            GS_CREDENTIALS=AnonymousCredentials(),
+            GS_QUERYSTRING_AUTH=False,
+        )
+        self._settings.enable()
+
+    def _client(self):
+        from google.cloud.storage import Client
+
+        return Client(project='benchmark', credentials=settings.GS_CREDENTIALS)
+
+    def _delete_prefix(self, bucket, prefix):
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            list(pool.map(lambda blob: blob.delete(), bucket.list_blobs(prefix=prefix)))
+
+    def build(self):
+        self._start()
+        bucket = self._client().create_bucket(self.bucket_name)
+
+        def upload(item):
+            index, path = item
+            bucket.blob('tree/' + path).upload_from_string(self.tree.content(index))
+
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            list(pool.map(upload, enumerate(self.tree.small_files())))
+        if self.tree.large_files:
+            with tempfile.NamedTemporaryFile() as f:
+                for chunk in self.tree.large_chunks():
+                    f.write(chunk)
+                f.flush()
+                for path in self.tree.large_file_names():
+                    bucket.blob('tree/' + path).upload_from_filename(f.name)
+        return True
+
+    def cleanup(self):
+        try:
+            bucket = self._client().bucket(self.bucket_name)
+            self._delete_prefix(bucket, '')
+            bucket.delete()
+        finally:
+            self._settings.disable()
+            if self._saved_environ is None:
+                del os.environ['STORAGE_EMULATOR_HOST']
+            else:
+                os.environ['STORAGE_EMULATOR_HOST'] = self._saved_environ
+
+    def bench_list_directory(self):
+        path = os.path.join(self.root, self.tree.listing_dir)
+        yield lambda: self.files.get_project_directory_content(
+            path, self.tree.listing_dir, _file_url, _file_url)
+
+    def bench_storage_used(self):
+        yield lambda: self.files.published_project_storage_used(self.project)
+
+    def bench_quota_refresh(self):
+        yield GCSQuotaManager(self.root).refresh
+
+    def bench_cp_dir(self):
+        yield lambda: self.files.cp_dir(self.root, self.bucket_name + '/copy', ignored_files=[])
+        self._delete_prefix(self._client().bucket(self.bucket_name), 'copy/')
+
+
+def run_benchmark(benchmark, repeat):
+    """
+    Run a benchmark generator function `repeat` times.
+
+    Returns a list of elapsed times in seconds, or None if the
+    benchmark is not applicable.
+    """
+    times = []
+    for _ in range(repeat):
+        steps = benchmark()
+        func = next(steps, None)
+        if func is None:
+            return None
+        try:
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        finally:
+            next(steps, None)
+    return times
+
+
+def summarize(times):
+    return {
+        'times': times,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+    }
+
+
+def git_commit():
+    """Return the current git commit ID, or None if unknown."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+            check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(old, new):
+    """
+    Compare two sets of results, returning a list of lines of text.
+
+    Ratios are computed from the median times; a ratio below 1 means
+    the new results are faster.
+    """
+    lines = []
+    if old.get('backend') != new['backend'] or old.get('parameters') != new['parameters']:
+        lines.append('Warning: results were produced with different parameters')
+    lines.append('{:<24} {:>12} {:>12} {:>8}'.format(
+        'benchmark', (old.get('commit') or 'old')[:12], (new['commit'] or 'new')[:12], 'ratio'))
+    for name, result in new['results'].items():
+        previous = old.get('results', {}).get(name)
+        if previous is None:
+            continue
+        ratio = result['median'] / previous['median'] if previous['median'] else math.inf
+        lines.append('{:<24} {:>12.4f} {:>12.4f} {:>8.2f}'.format(
+            name, previous['median'], result['median'], ratio))
+    return lines
+
+
+class Command(BaseCommand):
+    help = 'Benchmark project file operations against a synthetic project'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=('local', 'gcs'), default='local',
+                            help='Storage backend to benchmark (default: local)')
+        parser.add_argument('--files', type=int, default=10000,
+                            help='Number of small files (default: 10000)')
+        parser.add_argument('--shape', choices=SHAPES, default='wide',
+                            help='Layout of the directory tree (default: wide)')
+        parser.add_argument('--depth', type=int, default=20,
+                            help='Number of nested directories for --shape=deep (default: 20)')
+        parser.add_argument('--file-size', type=parse_size, default=parse_size('1K'),
+                            help='Size of each small file (default: 1K)')
+        parser.add_argument('--large-files', type=int, default=2,
+                            help='Number of large files (default: 2)')
+        parser.add_argument('--large-size', type=parse_size, default=parse_size('64M'),
+                            help='Size of each large file (default: 64M)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed for generating file contents')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Number of times to run each benchmark (default: 3)')
+        parser.add_argument('--only', action='append', metavar='BENCHMARK',
+                            help='Run only the named benchmark (may be repeated)')
+        parser.add_argument('--root', metavar='DIR',
+                            help='Create the local tree in DIR and keep it, so that it can be '
+                                 'reused by later runs with the same parameters')
+        parser.add_argument('--gcs-endpoint', default=os.environ.get('STORAGE_EMULATOR_HOST'),
+                            help='URL of the GCS emulator (default: $STORAGE_EMULATOR_HOST)')
+        parser.add_argument('--gcs-workers', type=int, default=16,
+                            help='Number of concurrent uploads when creating the GCS tree')
+        parser.add_argument('--output', '-o', metavar='FILE',
+                            help='Write JSON results to FILE (default: standard output)')
+        parser.add_argument('--compare', metavar='FILE',
+                            help='Compare the results with a previous JSON results file')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['files'] < 1 or options['depth'] < 1:
+            raise CommandError('--repeat, --files and --depth must be positive')
+        tree = SyntheticTree(options['files'], options['shape'], options['file_size'],
+                             options['large_files'], options['large_size'],
+                             options['depth'], options['seed'])
+
+        if options['backend'] == 'gcs':
+            if not options['gcs_endpoint']:
+                raise CommandError('--gcs-endpoint or STORAGE_EMULATOR_HOST is required')
+            benchmarks = GCSBenchmarks(tree, options['gcs_endpoint'], options['gcs_workers'])
+        else:
+            benchmarks = LocalBenchmarks(tree, options['root'])
+
+        names = options['only'] or benchmarks.names
+        unknown = set(names) - set(benchmarks.names)
+        if unknown:
+            raise CommandError('Unknown benchmarks: ' + ', '.join(sorted(unknown))
+                               + ' (available: ' + ', '.join(benchmarks.names) + ')')
+
+        results = {
+            'commit': git_commit(),
+            'date': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': options['backend'],
+            'parameters': tree.params,
+            'repeat': options['repeat'],
+            'results': {},
+        }
+        try:
+            self.stderr.write(f'Creating {options["shape"]} tree with {options["files"]} files...')
+            start = time.perf_counter()
+            if benchmarks.build():
+                results['build_time'] = time.perf_counter() - start
+            for name in names:
+                times = run_benchmark(getattr(benchmarks, 'bench_' + name), options['repeat'])
+                if times is None:
+                    self.stderr.write(f'{name:<24} skipped')
+                    continue
+                results['results'][name] = summarize(times)
+                self.stderr.write(f'{name:<24} {results["results"][name]["median"]:.4f}s')
+        finally:
+            benchmarks.cleanup()
+
+        text = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(text + '\n')
+        else:
+            self.stdout.write(text)
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                old = json.load(f)
+            for line in compare_results(old, results):
+                self.stderr.write(line)
@@ -0,0 +1,47 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from project.contentstore import ContentStore
+from project.models import PublishedProject
+from project.utility import readable_size
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Store the files of published projects in the content store '
+            '(settings.CONTENT_STORE_ROOT), and remove stored files that are no '
+            'longer part of any project.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collect-garbage', action='store_true',
+                            help='Only remove stored files that are no longer used')
+
+    def handle(self, *args, **options):
+        """
+        Add the files of existing published projects to the content
+        store, then remove unused blobs.
+
+        Checksums are taken from each project's manifest, and the
+        checksum files and manifests are left as they are.  A file is
+        only replaced by a link to an identical stored copy if both
+        have the same modification time, so that clients mirroring
+        the project will not download it again.
+        """
+        if not settings.CONTENT_STORE_ROOT:
+            raise CommandError('CONTENT_STORE_ROOT is not set')
+
+        if not options['collect_garbage']:
+            for project in PublishedProject.objects.filter(deprecated_files=False).order_by('id'):
+                if project.files.can_deduplicate():
+                    try:
+                        count = project.files.deduplicate_files(project)
+                    except FileNotFoundError:
+                        LOGGER.warning('No manifest for %s', project)
+                        continue
+                    LOGGER.info('Stored %d files of %s', count, project)
+
+        count, size = ContentStore(settings.CONTENT_STORE_ROOT).collect_garbage()
+        self.stdout.write(f'Removed {count} unused files ({readable_size(size)})')
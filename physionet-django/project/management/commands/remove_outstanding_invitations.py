@@ -0,0 +1,56 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+import notification.utility as notification
+from project.models import AuthorInvitation
+
+LOGGER = logging.getLogger(__name__)
+
+# Days after which unanswered authorship invitations expire
+INVITATION_DAY_LIMIT = 15
+
+# Number of invitations closed per transaction
+CHUNK_SIZE = 500
+
+
+def remove_outstanding_invitations(limit):
+    """
+    Close up to `limit` authorship invitations that have not been
+    answered within INVITATION_DAY_LIMIT days, and notify the inviters.
+
+    Returns the number of invitations closed.
+    """
+    now = timezone.now()
+    expired = AuthorInvitation.objects.filter(
+        is_active=True, request_datetime__lt=now - timezone.timedelta(days=INVITATION_DAY_LIMIT))
+    removed = 0
+    while removed < limit:
+        with transaction.atomic():
+            chunk = list(expired.select_related('project', 'inviter__profile').select_for_update(of=('self',))
+                         .order_by('id')[:min(CHUNK_SIZE, limit - removed)])
+            if not chunk:
+                break
+            expired.filter(id__in=[invitation.id for invitation in chunk]).update(
+                is_active=False, response_datetime=now)
+            notification.outstanding_invitations_removed_notify(chunk)
+        for invitation in chunk:
+            LOGGER.info(f'Removed author invitation for project {invitation.project.title} '
+                        f'from {invitation.inviter.email} to {invitation.email}')
+        removed += len(chunk)
+    return removed
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10000,
+                            help='Maximum number of invitations to close - default is 10000')
+
+    def handle(self, *args, **options):
+        """
+        Close authorship invitations that have not been answered.
+        """
+        removed = remove_outstanding_invitations(options['limit'])
+        LOGGER.info(f'Total author invitations removed {removed}')
@@ -0,0 +1,101 @@
+import datetime as dt
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from project.models import AccessLog, AccessLogSummary, PublishedProject
+
+LOGGER = logging.getLogger(__name__)
+
+
+def rollup_access_logs(since):
+    """
+    Recompute the daily and monthly access log summaries, for all
+    accesses from the start of the given date onwards.
+    """
+    Period = AccessLogSummary.Period
+    start = timezone.make_aware(dt.datetime.combine(since, dt.time.min))
+    month = since.replace(day=1)
+
+    daily = AccessLog.objects.filter(
+        content_type=ContentType.objects.get_for_model(PublishedProject),
+        object_id__in=PublishedProject.objects.values('id'),
+        creation_datetime__gte=start,
+    ).annotate(date=TruncDate('creation_datetime')).values('date', 'object_id', 'user_id').annotate(
+        first=Min('creation_datetime'), last=Max('last_access_datetime'),
+        total=Sum('count'), logs=Count('id'))
+
+    with transaction.atomic():
+        AccessLogSummary.objects.filter(period=Period.DAY, date__gte=since).delete()
+        AccessLogSummary.objects.bulk_create((
+            AccessLogSummary(period=Period.DAY, date=row['date'], project_id=row['object_id'],
+                             user_id=row['user_id'], first_access_datetime=row['first'],
+                             last_access_datetime=row['last'], count=row['total'], log_count=row['logs'])
+            for row in daily.iterator()), batch_size=1000)
+
+        monthly = AccessLogSummary.objects.filter(period=Period.DAY, date__gte=month).annotate(
+            month=TruncMonth('date')).values('month', 'project_id', 'user_id').annotate(
+            first=Min('first_access_datetime'), last=Max('last_access_datetime'),
+            total=Sum('count'), logs=Sum('log_count'))
+
+        AccessLogSummary.objects.filter(period=Period.MONTH, date__gte=month).delete()
+        AccessLogSummary.objects.bulk_create((
+            AccessLogSummary(period=Period.MONTH, date=row['month'], project_id=row['project_id'],
+                             user_id=row['user_id'], first_access_datetime=row['first'],
+                             last_access_datetime=row['last'], count=row['total'], log_count=row['logs'])
+            for row in monthly.iterator()), batch_size=1000)
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=dt.date.fromisoformat,
+                            help='Recompute summaries from this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        """
+        Summarize new access logs by day and by month, and delete access
+        logs older than settings.ACCESS_LOG_RETENTION_DAYS.
+
+        By default, summaries are recomputed from the day before the
+        most recent day that has already been summarized, since logs
+        may be updated for some time after they are created (and
+        buffered updates may be saved later still.)  If any log has
+        been accessed more recently than the latest summarized access,
+        summaries are recomputed from the day that log was created.
+        Days whose logs may already have been deleted are never
+        recomputed.
+        """
+        today = timezone.localdate()
+        since = options['since']
+        if since is None:
+            latest = AccessLogSummary.objects.filter(period=AccessLogSummary.Period.DAY).aggregate(
+                date=Max('date'), last=Max('last_access_datetime'))
+            if latest['date'] is not None:
+                since = latest['date'] - dt.timedelta(days=1)
+                changed = AccessLog.objects.filter(
+                    content_type=ContentType.objects.get_for_model(PublishedProject),
+                    last_access_datetime__gt=latest['last'],
+                ).aggregate(Min('creation_datetime'))['creation_datetime__min']
+                if changed is not None:
+                    since = min(since, timezone.localdate(changed))
+        if since is None:
+            first = AccessLog.objects.aggregate(Min('creation_datetime'))['creation_datetime__min']
+            since = timezone.localdate(first) if first else today
+
+        retention = settings.ACCESS_LOG_RETENTION_DAYS
+        if retention > 0:
+            cutoff = timezone.now() - dt.timedelta(days=retention)
+            since = max(since, timezone.localdate(cutoff) + dt.timedelta(days=1))
+
+        rollup_access_logs(since)
+        LOGGER.info(f'Summarized access logs since {since}.')
+
+        if retention > 0:
+            deleted, _ = AccessLog.objects.filter(creation_datetime__lt=cutoff).delete()
+            LOGGER.info(f'Deleted {deleted} access log entries older than {retention} days.')
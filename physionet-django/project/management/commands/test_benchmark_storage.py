@@ -0,0 +1,59 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from project.management.commands.benchmark_storage import LocalBenchmarks, parse_size
+
+
+class TestBenchmarkStorage(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.output = os.path.join(self.tmpdir.name, 'results.json')
+
+    def run_benchmarks(self, *args):
+        stderr = io.StringIO()
+        call_command('benchmark_storage', '--files', '50', '--large-files', '1', '--large-size', '100K',
+                     '--repeat', '2', '--output', self.output, *args, stderr=stderr)
+        with open(self.output) as f:
+            return json.load(f), stderr.getvalue()
+
+    def test_local(self):
+        for shape in ('flat', 'wide', 'deep'):
+            results, _ = self.run_benchmarks('--shape', shape)
+            self.assertEqual(results['backend'], 'local')
+            self.assertEqual(results['parameters']['shape'], shape)
+            self.assertEqual(set(results['results']), set(LocalBenchmarks.names))
+            for result in results['results'].values():
+                self.assertEqual(len(result['times']), 2)
+                self.assertLessEqual(result['min'], result['median'])
+
+    def test_reuse_and_compare(self):
+        root = os.path.join(self.tmpdir.name, 'tree')
+        old, _ = self.run_benchmarks('--root', root, '--only', 'get_tree_size')
+        self.assertIn('build_time', old)
+        self.assertEqual(len(os.listdir(os.path.join(root, 'd00000'))), 8)
+
+        previous = os.path.join(self.tmpdir.name, 'previous.json')
+        os.rename(self.output, previous)
+        new, log = self.run_benchmarks('--root', root, '--only', 'get_tree_size', '--compare', previous)
+        self.assertNotIn('build_time', new)
+        self.assertRegex(log, r'get_tree_size +[0-9.]+ +[0-9.]+ +[0-9.]+')
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(CommandError):
+            self.run_benchmarks('--only', 'nonexistent')
+        with self.assertRaises(CommandError):
+            self.run_benchmarks('--backend', 'gcs', '--gcs-endpoint', '')
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size('64K'), 65536)
+        self.assertEqual(parse_size('1.5mb'), 1572864)
+        self.assertEqual(parse_size('1G'), 1024 ** 3)
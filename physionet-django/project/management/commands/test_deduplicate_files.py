@@ -0,0 +1,85 @@
+import io
+import os
+import shutil
+import stat
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings
+
+from project.contentstore import ContentStore
+from project.models import PublishedProject
+from user.test_views import TestMixin
+
+
+class TestDeduplicateFiles(TestMixin):
+
+    def setUp(self):
+        super().setUp()
+        self.store_root = os.path.join(settings.MEDIA_ROOT, 'content-store')
+        self.store = ContentStore(self.store_root)
+        # Published files and directories keep their read-only
+        # permissions (see TestMixin.setUp)
+        self.project = PublishedProject.objects.get(slug='demoeicu')
+        self.root = self.project.file_root()
+        with open(os.path.join(self.root, 'SHA256SUMS.txt')) as f:
+            self.checksums = dict(reversed(line.rstrip('\n').split(' ', 1)) for line in f)
+
+    def make_blob(self, name, mtime_offset=0):
+        """Store a separate copy of a project file."""
+        path = os.path.join(self.root, name)
+        blob = self.store.blob_path(self.checksums[name])
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        shutil.copyfile(path, blob)
+        st = os.stat(path)
+        os.utime(blob, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_offset))
+        return blob
+
+    def deduplicate(self, *args):
+        with override_settings(CONTENT_STORE_ROOT=self.store_root):
+            call_command('deduplicate_files', *args, stdout=io.StringIO())
+
+    def test_deduplicate(self):
+        names = sorted(name for name in self.checksums if os.path.isfile(os.path.join(self.root, name)))
+        unique = [name for name in names if list(self.checksums.values()).count(self.checksums[name]) == 1]
+        same, newer, new = unique[:3]
+        same_blob = self.make_blob(same)
+        newer_blob = self.make_blob(newer, mtime_offset=10**9)
+        sums_stat = os.stat(os.path.join(self.root, 'SHA256SUMS.txt'))
+        dir_mode = stat.S_IMODE(os.stat(self.root).st_mode)
+        mtimes = {name: os.stat(os.path.join(self.root, name)).st_mtime_ns for name in names}
+
+        self.deduplicate()
+
+        # A file with an identical blob is replaced by a link
+        self.assertTrue(os.path.samefile(os.path.join(self.root, same), same_blob))
+        # ...unless that would change its modification time (the
+        # unused blob is then removed)
+        self.assertFalse(os.path.exists(newer_blob))
+        # Other files become blobs
+        self.assertTrue(os.path.samefile(os.path.join(self.root, new), self.store.blob_path(self.checksums[new])))
+
+        # Identical files with the same modification time are linked
+        # to the same blob
+        for name in names:
+            blob = self.store.blob_path(self.checksums[name])
+            self.assertEqual(os.path.exists(blob) and os.path.samefile(os.path.join(self.root, name), blob),
+                             name != newer and os.stat(blob).st_mtime_ns == mtimes[name])
+
+        # Published files, directories and checksums are unchanged
+        self.assertEqual(stat.S_IMODE(os.stat(self.root).st_mode), dir_mode)
+        self.assertEqual(dir_mode, 0o555)
+        new_sums_stat = os.stat(os.path.join(self.root, 'SHA256SUMS.txt'))
+        self.assertEqual((new_sums_stat.st_mtime_ns, new_sums_stat.st_mode),
+                         (sums_stat.st_mtime_ns, sums_stat.st_mode))
+        self.assertEqual({name: os.stat(os.path.join(self.root, name)).st_mtime_ns for name in names}, mtimes)
+
+        self.assertEqual(os.listdir(self.root), [name for name in os.listdir(self.root)
+                                                 if not name.endswith('.tmp')])
+
+    def test_collect_garbage(self):
+        names = sorted(self.checksums)
+        blob = self.make_blob(names[0])
+        self.deduplicate('--collect-garbage')
+        self.assertFalse(os.path.exists(blob))
+        self.assertFalse(os.path.exists(self.store.blob_path(self.checksums[names[1]])))
@@ -0,0 +1,33 @@
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from project.models import AuthorInvitation
+from user.test_views import TestMixin
+
+
+class TestRemoveOutstandingInvitations(TestMixin):
+
+    def test_remove_outstanding_invitations(self):
+        AuthorInvitation.objects.filter(is_active=True).update(request_datetime=timezone.now())
+        invitations = list(AuthorInvitation.objects.filter(is_active=True).order_by('id')[:2])
+        self.assertEqual(len(invitations), 2)
+        for invitation in invitations:
+            invitation.request_datetime = timezone.now() - timezone.timedelta(days=30)
+            invitation.save()
+
+        call_command('remove_outstanding_invitations', limit=1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [invitations[0].inviter.email])
+        self.assertIn(invitations[0].email, mail.outbox[0].body)
+        self.assertEqual(AuthorInvitation.objects.filter(id=invitations[0].id, is_active=False).count(), 1)
+        self.assertEqual(AuthorInvitation.objects.filter(id=invitations[1].id, is_active=True).count(), 1)
+
+        call_command('remove_outstanding_invitations')
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(AuthorInvitation.objects.filter(is_active=True).count(),
+                         AuthorInvitation.objects.filter(request_datetime__gte=timezone.now()
+                                                         - timezone.timedelta(days=1)).count())
+        invitation = AuthorInvitation.objects.get(id=invitations[1].id)
+        self.assertFalse(invitation.is_active)
+        self.assertIsNotNone(invitation.response_datetime)
@@ -0,0 +1,85 @@
+import datetime as dt
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from project.models import AccessLog, AccessLogSummary, PublishedProject
+from user.models import User
+from user.test_views import TestMixin
+
+
+class TestRollupAccessLogs(TestMixin):
+
+    def setUp(self):
+        super().setUp()
+        self.project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        self.user = User.objects.get(username='rgmark')
+        self.today = timezone.localdate()
+
+    def add_log(self, days_ago, hour, count):
+        start = timezone.make_aware(dt.datetime.combine(self.today - dt.timedelta(days=days_ago), dt.time(hour)))
+        return AccessLog.objects.create(project=self.project, user=self.user, count=count,
+                                        creation_datetime=start,
+                                        last_access_datetime=start + dt.timedelta(minutes=5))
+
+    def summaries(self, period):
+        return list(AccessLogSummary.objects.filter(period=period).order_by('date').values_list(
+            'date', 'count', 'log_count'))
+
+    def test_rollup(self):
+        self.add_log(40, 1, 2)
+        self.add_log(1, 1, 3)
+        self.add_log(1, 2, 4)
+        call_command('rollup_access_logs')
+
+        day = dt.timedelta(days=1)
+        self.assertEqual(self.summaries(AccessLogSummary.Period.DAY),
+                         [(self.today - 40 * day, 2, 1), (self.today - day, 7, 2)])
+        months = self.summaries(AccessLogSummary.Period.MONTH)
+        self.assertEqual(sum(row[1] for row in months), 9)
+        self.assertEqual(months[0][0], (self.today - 40 * day).replace(day=1))
+
+        # Only the most recent days are recomputed
+        AccessLogSummary.objects.filter(period=AccessLogSummary.Period.DAY,
+                                        date=self.today - 40 * day).update(count=1)
+        self.add_log(0, 1, 5)
+        with override_settings(ACCESS_LOG_RETENTION_DAYS=30):
+            call_command('rollup_access_logs')
+        self.assertEqual(self.summaries(AccessLogSummary.Period.DAY),
+                         [(self.today - 40 * day, 1, 1), (self.today - day, 7, 2), (self.today, 5, 1)])
+        self.assertEqual(AccessLog.objects.count(), 3)
+        AccessLogSummary.objects.filter(period=AccessLogSummary.Period.DAY,
+                                        date=self.today - 40 * day).update(count=2)
+
+        self.client.login(username='admin', password='Tester11!')
+        response = self.client.get(reverse('project_access_logs'))
+        counts = {project.id: project.log_count for project in response.context['c_projects']}
+        self.assertEqual(counts[self.project.id], 4)
+        response = self.client.get(reverse('user_access_logs_detail', args=(self.user.id,)))
+        self.assertEqual([log.count for log in response.context['logs']], [5, 7, 2])
+        response = self.client.get(reverse('download_project_accesses', args=(self.project.id,)))
+        self.assertEqual(len(response.content.decode().splitlines()), 4)
+
+    def test_late_updates(self):
+        """
+        Test that logs updated after they were summarized are counted.
+        """
+        day = dt.timedelta(days=1)
+        old = self.add_log(5, 23, 1)
+        yesterday = self.add_log(1, 23, 2)
+        self.add_log(0, 1, 3)
+        call_command('rollup_access_logs')
+
+        # Logs from the previous day may still be updated
+        AccessLog.objects.filter(id=yesterday.id).update(count=4)
+        call_command('rollup_access_logs')
+        self.assertEqual(self.summaries(AccessLogSummary.Period.DAY),
+                         [(self.today - 5 * day, 1, 1), (self.today - day, 4, 1), (self.today, 3, 1)])
+
+        # Older logs are recomputed if they were accessed recently
+        AccessLog.objects.filter(id=old.id).update(count=6, last_access_datetime=timezone.now())
+        call_command('rollup_access_logs')
+        self.assertEqual(self.summaries(AccessLogSummary.Period.DAY),
+                         [(self.today - 5 * day, 6, 1), (self.today - day, 4, 1), (self.today, 3, 1)])
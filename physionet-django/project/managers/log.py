@@ -1,12 +1,178 @@
 import datetime as dt
+import logging
+import threading
+import time
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import QuerySet, Manager
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models import F, QuerySet, Manager
+from django.dispatch import receiver
 from django.utils import timezone
 
 from physionet.enums import LogCategory
 
+LOGGER = logging.getLogger(__name__)
+
+
+class LogBuffer:
+    """
+    In-memory buffer of log events for one log category.
+
+    Events are coalesced per (project, user, data), in the same way as
+    update_or_create: an event within LOG_TIMEDELTA minutes of the
+    previous one increments its count rather than starting a new
+    entry.  flush() writes the buffered entries to the database,
+    extending the latest existing entries where possible, using one
+    UPDATE per extended entry and one bulk INSERT for the rest.
+
+    The buffer is flushed after a response has been sent (see
+    flush_log_buffers), once its oldest event is LOG_FLUSH_INTERVAL
+    seconds old, or during a request once it holds LOG_FLUSH_MAX_ENTRIES
+    entries.  No background thread is used, since uWSGI workers do not
+    run them by default.  Events that have not been flushed when a
+    worker is recycled are lost, which only affects access statistics.
+
+    Entries keep the times of the events themselves, even though they
+    are written later.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, model, category):
+        self.model = model
+        self.category = category
+        self._lock = threading.Lock()
+        # Map of (content type, object, user, data) to a list of
+        # [first time, last time, count] windows
+        self._entries = {}
+        self._size = 0
+        self._oldest = None
+
+    @classmethod
+    def get(cls, model, category):
+        """Get the shared buffer for a log category."""
+        with cls._instances_lock:
+            if category not in cls._instances:
+                cls._instances[category] = cls(model, category)
+            return cls._instances[category]
+
+    @classmethod
+    def flush_all(cls, due_only=False):
+        """
+        Write buffered events to the database.
+
+        If due_only is true, only buffers that are due to be flushed
+        are written.
+        """
+        flushed = False
+        for buffer in list(cls._instances.values()):
+            if not due_only or buffer.is_due():
+                flushed = buffer.flush() or flushed
+        return flushed
+
+    def is_due(self):
+        """Check whether the buffer should be flushed."""
+        with self._lock:
+            if not self._size:
+                return False
+            return (self._size >= settings.LOG_FLUSH_MAX_ENTRIES
+                    or time.monotonic() - self._oldest >= settings.LOG_FLUSH_INTERVAL)
+
+    def add(self, project, user, data='', when=None):
+        """
+        Add an event to the buffer without writing it to the database.
+        """
+        key = (ContentType.objects.get_for_model(project).id, project.id, user.id, data)
+        when = when or timezone.now()
+        timedelta = dt.timedelta(minutes=settings.LOG_TIMEDELTA)
+        with self._lock:
+            if not self._size:
+                self._oldest = time.monotonic()
+            windows = self._entries.setdefault(key, [])
+            if windows and windows[-1][1] + timedelta > when:
+                windows[-1][1] = max(windows[-1][1], when)
+                windows[-1][2] += 1
+            else:
+                windows.append([when, when, 1])
+                self._size += 1
+
+    def record(self, project, user, data=''):
+        """
+        Record an event.
+
+        The event is written immediately if LOG_FLUSH_INTERVAL is
+        zero, or if the buffer is full; otherwise it is written after
+        a later response (see LogBuffer.)
+        """
+        self.add(project, user, data)
+        if settings.LOG_FLUSH_INTERVAL <= 0 or self._size >= settings.LOG_FLUSH_MAX_ENTRIES:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered events to the database.
+
+        If writing fails, the events are returned to the buffer to be
+        retried by the next flush.  Returns True if any events were
+        written.
+        """
+        with self._lock:
+            entries, self._entries = self._entries, {}
+            oldest, self._oldest = self._oldest, None
+            self._size = 0
+        if not entries:
+            return False
+        try:
+            self._write(entries)
+        except Exception:
+            LOGGER.exception('Failed to write %s log entries', self.category)
+            with self._lock:
+                for key, windows in entries.items():
+                    self._entries[key] = windows + self._entries.get(key, [])
+                self._size = sum(len(windows) for windows in self._entries.values())
+                self._oldest = oldest if self._oldest is None else min(oldest, self._oldest)
+            return False
+        return True
+
+    def _write(self, entries):
+        timedelta = dt.timedelta(minutes=settings.LOG_TIMEDELTA)
+        earliest = min(windows[0][0] for windows in entries.values())
+        rows = self.model.objects.filter(
+            user_id__in={key[2] for key in entries},
+            object_id__in={key[1] for key in entries},
+            last_access_datetime__gt=earliest - timedelta,
+        ).order_by('creation_datetime').values_list(
+            'id', 'content_type_id', 'object_id', 'user_id', 'data', 'last_access_datetime')
+        latest = {tuple(row[1:5]): (row[0], row[5]) for row in rows}
+
+        new_logs = []
+        with transaction.atomic():
+            for key, windows in entries.items():
+                if key in latest:
+                    log_id, last_access = latest[key]
+                    first, last, count = windows[0]
+                    if last_access + timedelta > first:
+                        windows = windows[1:]
+                        self.model.objects.filter(id=log_id).update(
+                            count=F('count') + count, last_access_datetime=max(last, last_access))
+                for first, last, count in windows:
+                    new_logs.append(self.model(
+                        category=self.category, content_type_id=key[0], object_id=key[1],
+                        user_id=key[2], data=key[3], count=count,
+                        creation_datetime=first, last_access_datetime=last))
+            self.model.objects.bulk_create(new_logs)
+
+
+@receiver(request_finished)
+def flush_log_buffers(sender, **kwargs):
+    """
+    Write buffered log events that are due, once the response has been
+    sent.
+    """
+    LogBuffer.flush_all(due_only=True)
+
 
 class AccessLogManager(Manager):
     def get_queryset(self):
@@ -38,6 +204,7 @@ def update_or_create(self, defaults=None, **kwargs):
             ).order_by("-creation_datetime")[0]
             if instance.last_access_datetime + dt.timedelta(minutes=settings.LOG_TIMEDELTA) > timezone.now():
                 instance.count += 1
+                instance.last_access_datetime = timezone.now()
                 instance.save()
             else:
                 instance = self.create(**kwargs)
@@ -48,6 +215,13 @@ def update_or_create(self, defaults=None, **kwargs):
 
         return instance, created
 
+    def record(self, project, user):
+        """
+        Record an access to a project without writing to the database
+        immediately.  See LogBuffer.
+        """
+        LogBuffer.get(self.model, LogCategory.ACCESS).record(project, user)
+
 
 class GCPLogQuerySet(QuerySet):
     def create(self, **kwargs):
@@ -71,6 +245,7 @@ def update_or_create(self, defaults=None, **kwargs):
             ).order_by("-creation_datetime")[0]
             if instance.last_access_datetime + dt.timedelta(minutes=settings.LOG_TIMEDELTA) > timezone.now():
                 instance.count += 1
+                instance.last_access_datetime = timezone.now()
                 instance.save()
             else:
                 instance = self.create(**kwargs)
@@ -80,3 +255,10 @@ def update_or_create(self, defaults=None, **kwargs):
             created = True
 
         return instance, created
+
+    def record(self, project, user, data):
+        """
+        Record an upload to a project without writing to the database
+        immediately.  See LogBuffer.
+        """
+        LogBuffer.get(self.model, LogCategory.GCP).record(project, user, data)
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:22
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0078_delete_archivedproject'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='log',
+            name='creation_datetime',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='last_access_datetime',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.16 on 2026-10-19 03:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('project', '0079_log_datetime_defaults'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='log',
+            name='creation_datetime',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='AccessLogSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('D', 'Day'), ('M', 'Month')], max_length=1)),
+                ('date', models.DateField()),
+                ('first_access_datetime', models.DateTimeField()),
+                ('last_access_datetime', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('log_count', models.PositiveIntegerField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_summaries', to='project.publishedproject')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'default_permissions': (),
+                'indexes': [models.Index(fields=['period', 'project', 'date'], name='project_acc_period_8f43a8_idx'), models.Index(fields=['period', 'user', 'date'], name='project_acc_period_3e9290_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='accesslogsummary',
+            constraint=models.UniqueConstraint(fields=('period', 'date', 'project', 'user'), name='unique access log summary'),
+        ),
+    ]
@@ -4,7 +4,10 @@
 from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 from project.modelcomponents.fields import SafeHTMLField
@@ -233,6 +236,21 @@ def check_passphrase(self, raw_passphrase):
         return isnot_expired and check_password(raw_passphrase, self.passphrase)
 
 
+def anonymous_url_cache_key(content_type_id, object_id):
+    """
+    Return the cache key for a project's anonymous access URL.
+    """
+    return f'project.anonymousaccess:{content_type_id}:{object_id}'
+
+
+@receiver([post_save, post_delete], sender=AnonymousAccess)
+def anonymous_access_changed(sender, instance, **kwargs):
+    """
+    Discard the cached anonymous access URL when it changes.
+    """
+    cache.delete(anonymous_url_cache_key(instance.content_type_id, instance.object_id))
+
+
 class License(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=120, unique=True)
@@ -16,7 +16,7 @@
 from django.utils import timezone
 from django.utils.html import strip_tags
 
-from console.tasks import associated_task
+from console.tasks import FILES_QUEUE, HIGH_PRIORITY, associated_task
 from physionet.settings.base import StorageTypes
 from project.modelcomponents.access import AccessPolicy
 from project.modelcomponents.authors import PublishedAffiliation, PublishedAuthor
@@ -36,7 +36,7 @@
 
 
 @associated_task(PublishedProject, 'pid')
-@background()
+@background(queue=FILES_QUEUE, schedule={'priority': HIGH_PRIORITY})
 def move_files_as_readonly(pid, dir_from, dir_to, make_zip):
     """
     Schedule a background task to set the files as read only.
@@ -45,7 +45,7 @@ def move_files_as_readonly(pid, dir_from, dir_to, make_zip):
 
     published_project = PublishedProject.objects.get(id=pid)
 
-    published_project.make_checksum_file()
+    published_project.make_checksum_file(deduplicate=True)
 
     if settings.STORAGE_TYPE == StorageTypes.LOCAL:
         quota = published_project.quota_manager()
@@ -57,7 +57,15 @@ def move_files_as_readonly(pid, dir_from, dir_to, make_zip):
     # Make the files read only
     if settings.STORAGE_TYPE == StorageTypes.LOCAL:
         file_root = published_project.project_file_root()
+        derived_dirs = {
+            os.path.dirname(published_project.signal_pyramid_root()),
+            os.path.dirname(published_project.preview_index_root()),
+            os.path.dirname(published_project.file_manifest_path()),
+        }
         for root, dirs, files in os.walk(file_root):
+            # Signal pyramids, preview indices and manifests may be
+            # (re)built later, so leave them writable
+            dirs[:] = [d for d in dirs if os.path.join(root, d) not in derived_dirs]
             for f in files:
                 with open(os.path.join(root, f), 'rb') as file:
                     fline = file.read(2)
@@ -72,6 +80,9 @@ def move_files_as_readonly(pid, dir_from, dir_to, make_zip):
     if make_zip:
         published_project.make_zip()
 
+    if settings.ENABLE_SIGNAL_PYRAMIDS and published_project.has_wfdb:
+        published_project.make_signal_pyramids()
+
 
 class SubmissionStatus(IntEnum):
     """
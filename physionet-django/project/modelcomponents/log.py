@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
 
 from physionet.enums import LogCategory
 from project.managers.log import AccessLogQuerySet, GCPLogQuerySet, AccessLogManager, GCPLogManager
@@ -15,8 +16,9 @@ class Log(models.Model):
     user = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='logs')
     data = models.TextField(max_length=512)
     count = models.PositiveIntegerField(default=1)
-    creation_datetime = models.DateTimeField(auto_now_add=True)
-    last_access_datetime = models.DateTimeField(auto_now=True)
+    # Not auto_now, so that buffered entries keep the time of the access
+    creation_datetime = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
+    last_access_datetime = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         default_permissions = ()
@@ -44,3 +46,40 @@ class GCPLog(Log):
     class Meta:
         default_permissions = ()
         proxy = True
+
+
+class AccessLogSummary(models.Model):
+    """
+    Accesses to a published project by a user, aggregated by day or by
+    month from the access logs by the rollup_access_logs command.
+
+    count is the total number of accesses, and log_count is the number
+    of access log entries they were recorded in.
+    """
+    class Period(models.TextChoices):
+        DAY = 'D', 'Day'
+        MONTH = 'M', 'Month'
+
+    period = models.CharField(max_length=1, choices=Period.choices)
+    date = models.DateField()
+    project = models.ForeignKey('project.PublishedProject', on_delete=models.CASCADE,
+                                related_name='access_summaries')
+    user = models.ForeignKey('user.User', on_delete=models.CASCADE, related_name='access_summaries')
+    first_access_datetime = models.DateTimeField()
+    last_access_datetime = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    log_count = models.PositiveIntegerField()
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'date', 'project', 'user'],
+                                    name='unique access log summary')
+        ]
+        indexes = [
+            models.Index(fields=['period', 'project', 'date']),
+            models.Index(fields=['period', 'user', 'date']),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.project} - {self.user}'
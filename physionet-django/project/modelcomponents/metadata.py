@@ -319,7 +319,8 @@ def get_directory_content(self, subdir=''):
         the project's file root.
         """
         inspect_dir = self.get_inspect_dir(subdir)
-        return self.files.get_project_directory_content(inspect_dir, subdir, self.file_display_url, self.file_url)
+        return self.files.get_project_directory_content(inspect_dir, subdir, self.file_display_url, self.file_url,
+                                                        immutable=self.is_published())
 
     def schema_org_resource_type(self):
         """
@@ -361,7 +362,8 @@ def get_anonymous_url(self):
         """
         Returns current url for anonymous access
         """
-        anonymous = self.anonymous.first()
+        # There is at most one record; all() uses prefetched results
+        anonymous = next(iter(self.anonymous.all()), None)
         if not anonymous:
             return False
 
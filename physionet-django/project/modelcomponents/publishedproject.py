@@ -168,17 +168,92 @@ def zip_url(self):
         else:
             return os.path.join('published-projects', self.slug, self.zip_name())
 
-    def make_checksum_file(self):
+    def make_checksum_file(self, deduplicate=False):
         """
-        Make the checksums file for the main files
+        Make the checksums file for the main files.  If `deduplicate`
+        is true, also add them to the content store (see
+        project.contentstore); this is only done at publication.
         """
-        return self.files.make_checksum_file(self)
+        return self.files.make_checksum_file(self, deduplicate=deduplicate)
+
+    def file_manifest_path(self):
+        """
+        Path of the file manifest, which lists the path, size, SHA-256
+        checksum and modification time of each of the main files, one
+        JSON object per line.
+
+        Like signal_pyramid_root(), this is stored outside of
+        file_root().
+        """
+        return os.path.join(self.project_file_root(), 'manifests', self.version + '.ndjson')
+
+    def file_manifest(self):
+        """
+        Return an iterator over the entries of the file manifest,
+        sorted by path.  Raises FileNotFoundError if there is none.
+        """
+        return self.files.open_file_manifest(self)
+
+    def remove_file_manifest(self):
+        fname = self.file_manifest_path()
+        if os.path.isfile(fname):
+            os.remove(fname)
+
+    def signal_pyramid_root(self):
+        """
+        Root directory containing the project's signal pyramids.
+
+        This is stored outside of file_root() so that it is neither
+        visible to users nor counted in the project's storage.
+        """
+        return os.path.join(self.project_file_root(), 'signal-pyramids', self.version)
+
+    def signal_pyramid_path(self, record_name):
+        """
+        Path of the signal pyramid for a WFDB record, given the record
+        name relative to file_root().
+        """
+        return os.path.join(self.signal_pyramid_root(), record_name + '.pyr')
+
+    def preview_index_root(self):
+        """
+        Root directory containing the line indices used for previewing
+        the project's files.
+
+        Like signal_pyramid_root(), this is stored outside of
+        file_root().
+        """
+        return os.path.join(self.project_file_root(), 'preview-index', self.version)
+
+    def preview_index_path(self, file_path):
+        """
+        Path of the line index for a file, given the file name relative
+        to file_root().
+        """
+        return os.path.join(self.preview_index_root(), file_path + '.idx')
+
+    def make_signal_pyramids(self):
+        """
+        Make (new) min/max pyramids for the project's WFDB records.
+        """
+        return self.files.make_signal_pyramids(self)
+
+    def remove_signal_pyramids(self):
+        root = self.signal_pyramid_root()
+        if os.path.isdir(root):
+            shutil.rmtree(root)
+
+    def remove_preview_indices(self):
+        self.files.remove_preview_indices(self)
 
     def remove_files(self):
         """
         Remove files of this project
         """
         self.files.rm_dir(self.file_root(), remove_zip=self.remove_zip)
+        self.remove_signal_pyramids()
+        self.remove_preview_indices()
+        self.remove_file_manifest()
         self.set_storage_info()
 
     def deprecate_files(self, delete_files):
@@ -256,6 +331,9 @@ def remove(self, force=False):
         """
         if force:
             shutil.rmtree(self.file_root())
+            self.remove_signal_pyramids()
+            self.remove_preview_indices()
+            self.remove_file_manifest()
             return self.delete()
         else:
             raise Exception('Make sure you want to remove this item.')
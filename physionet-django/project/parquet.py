@@ -0,0 +1,753 @@
+import datetime
+import functools
+import math
+import struct
+import uuid
+import zlib
+
+MAGIC = b'PAR1'
+
+# Maximum size of the file footer (metadata) that will be read.
+MAX_FOOTER_SIZE = 16 * 1024 * 1024
+
+# Maximum size of a single (compressed or uncompressed) page that will
+# be read when sampling data.
+MAX_PAGE_SIZE = 16 * 1024 * 1024
+
+# Maximum number of rows returned by read_sample().
+MAX_SAMPLE_ROWS = 20
+
+# Enumerations defined by the Parquet format specification
+# (https://github.com/apache/parquet-format/blob/master/src/main/thrift/parquet.thrift)
+PHYSICAL_TYPES = ('BOOLEAN', 'INT32', 'INT64', 'INT96', 'FLOAT', 'DOUBLE',
+                  'BYTE_ARRAY', 'FIXED_LEN_BYTE_ARRAY')
+REPETITION_TYPES = ('REQUIRED', 'OPTIONAL', 'REPEATED')
+CODECS = ('UNCOMPRESSED', 'SNAPPY', 'GZIP', 'LZO', 'BROTLI', 'LZ4', 'ZSTD',
+          'LZ4_RAW')
+ENCODINGS = ('PLAIN', 'GROUP_VAR_INT', 'PLAIN_DICTIONARY', 'RLE',
+             'BIT_PACKED', 'DELTA_BINARY_PACKED', 'DELTA_LENGTH_BYTE_ARRAY',
+             'DELTA_BYTE_ARRAY', 'RLE_DICTIONARY', 'BYTE_STREAM_SPLIT')
+CONVERTED_TYPES = ('UTF8', 'MAP', 'MAP_KEY_VALUE', 'LIST', 'ENUM', 'DECIMAL',
+                   'DATE', 'TIME_MILLIS', 'TIME_MICROS', 'TIMESTAMP_MILLIS',
+                   'TIMESTAMP_MICROS', 'UINT_8', 'UINT_16', 'UINT_32',
+                   'UINT_64', 'INT_8', 'INT_16', 'INT_32', 'INT_64', 'JSON',
+                   'BSON', 'INTERVAL')
+LOGICAL_TYPES = {1: 'STRING', 2: 'MAP', 3: 'LIST', 4: 'ENUM', 5: 'DECIMAL',
+                 6: 'DATE', 7: 'TIME', 8: 'TIMESTAMP', 10: 'INTEGER',
+                 11: 'UNKNOWN', 12: 'JSON', 13: 'BSON', 14: 'UUID',
+                 15: 'FLOAT16'}
+TIME_UNITS = {1: 'MILLIS', 2: 'MICROS', 3: 'NANOS'}
+
+_TEXT_TYPES = ('STRING', 'UTF8', 'ENUM', 'JSON')
+_EPOCH = datetime.datetime(1970, 1, 1)
+_JULIAN_EPOCH_DAY = 2440588
+
+
+class ParquetError(Exception):
+    """Exception raised if a Parquet file cannot be read."""
+    pass
+
+
+# Exceptions that may result from decoding malformed data (for
+# example, a metadata field of the wrong type)
+_DECODE_ERRORS = (AttributeError, TypeError, ValueError, IndexError,
+                  KeyError, OverflowError, RecursionError, struct.error)
+
+
+def _reader(function):
+    """
+    Decorator that converts errors caused by malformed data into
+    ParquetError.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except _DECODE_ERRORS as exc:
+            raise ParquetError('Invalid Parquet data') from exc
+    return wrapper
+
+
+class _ThriftReader:
+    """
+    Decoder for the Thrift compact protocol.
+
+    Structures are decoded as dictionaries mapping field IDs to
+    values; lists and sets are decoded as lists.
+
+    >>> _ThriftReader(b'\\x15\\x04\\x18\\x03abc\\x19\\x25\\x02\\x04\\x00').read_struct()
+    {1: 2, 2: b'abc', 3: [1, 2]}
+    """
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def _byte(self):
+        try:
+            value = self.data[self.pos]
+        except IndexError:
+            raise ParquetError('Unexpected end of metadata')
+        self.pos += 1
+        return value
+
+    def _varint(self):
+        result = 0
+        shift = 0
+        while True:
+            byte = self._byte()
+            result |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def _zigzag(self):
+        value = self._varint()
+        return (value >> 1) ^ -(value & 1)
+
+    def _bytes(self, length):
+        if self.pos + length > len(self.data):
+            raise ParquetError('Unexpected end of metadata')
+        value = self.data[self.pos:self.pos + length]
+        self.pos += length
+        return bytes(value)
+
+    def _value(self, ftype):
+        if ftype in (1, 2):
+            return ftype == 1
+        elif ftype == 3:
+            return struct.unpack('b', self._bytes(1))[0]
+        elif ftype in (4, 5, 6):
+            return self._zigzag()
+        elif ftype == 7:
+            return struct.unpack('<d', self._bytes(8))[0]
+        elif ftype == 8:
+            return self._bytes(self._varint())
+        elif ftype in (9, 10):
+            header = self._byte()
+            size = header >> 4
+            if size == 15:
+                size = self._varint()
+            etype = header & 0x0f
+            if etype in (1, 2):
+                return [self._byte() == 1 for _ in range(size)]
+            return [self._value(etype) for _ in range(size)]
+        elif ftype == 11:
+            size = self._varint()
+            if not size:
+                return {}
+            types = self._byte()
+            return {self._value(types >> 4): self._value(types & 0x0f)
+                    for _ in range(size)}
+        elif ftype == 12:
+            return self.read_struct()
+        raise ParquetError('Invalid metadata')
+
+    def read_struct(self):
+        fields = {}
+        field_id = 0
+        while True:
+            header = self._byte()
+            ftype = header & 0x0f
+            if ftype == 0:
+                return fields
+            delta = header >> 4
+            field_id = field_id + delta if delta else self._zigzag()
+            fields[field_id] = self._value(ftype)
+
+
+class Column:
+    """
+    A leaf column (i.e., a primitive field) of a Parquet schema.
+
+    name is the dotted path of the column within the schema.
+    logical_type is the logical (or legacy "converted") type
+    annotation, such as 'STRING' or 'TIMESTAMP', or None.
+    """
+    def __init__(self, path, element, max_definition_level,
+                 max_repetition_level):
+        self.path = path
+        self.name = '.'.join(path)
+        self.physical_type = _enum(PHYSICAL_TYPES, element.get(1))
+        self.repetition = _enum(REPETITION_TYPES, element.get(3))
+        self.type_length = element.get(2)
+        self.max_definition_level = max_definition_level
+        self.max_repetition_level = max_repetition_level
+        self.scale = element.get(7) or 0
+        self.time_unit = None
+        self.unsigned = False
+
+        logical = element.get(10)
+        if logical:
+            lid, params = next(iter(logical.items()))
+            self.logical_type = LOGICAL_TYPES.get(lid)
+            if self.logical_type == 'DECIMAL':
+                self.scale = params.get(1, 0)
+            elif self.logical_type in ('TIME', 'TIMESTAMP'):
+                # TimeUnit is a union; its field ID indicates the unit
+                self.time_unit = TIME_UNITS.get(min(params.get(2) or {0: None}))
+            elif self.logical_type == 'INTEGER':
+                self.unsigned = not params.get(2, True)
+        else:
+            converted = _enum(CONVERTED_TYPES, element.get(6))
+            self.logical_type = converted
+            if converted and converted.startswith('UINT'):
+                self.unsigned = True
+            elif converted in ('TIMESTAMP_MILLIS', 'TIME_MILLIS'):
+                self.logical_type = converted.split('_')[0]
+                self.time_unit = 'MILLIS'
+            elif converted in ('TIMESTAMP_MICROS', 'TIME_MICROS'):
+                self.logical_type = converted.split('_')[0]
+                self.time_unit = 'MICROS'
+
+    def type_name(self):
+        """Return a human-readable description of the column type."""
+        if self.logical_type and self.time_unit:
+            return '{} ({}, {})'.format(self.physical_type, self.logical_type,
+                                        self.time_unit.lower())
+        elif self.logical_type:
+            return '{} ({})'.format(self.physical_type, self.logical_type)
+        return self.physical_type
+
+    def raw_value(self, value):
+        """
+        Convert a physical value to a value that can be compared
+        according to the column's sort order.
+        """
+        if self.logical_type == 'DECIMAL' and isinstance(value, bytes):
+            return int.from_bytes(value, 'big', signed=True)
+        if self.unsigned and self.physical_type == 'INT32':
+            return value & 0xffffffff
+        if self.unsigned and self.physical_type == 'INT64':
+            return value & 0xffffffffffffffff
+        return value
+
+    def display_value(self, value):
+        """
+        Convert a raw value into a JSON-compatible value for display.
+        """
+        if value is None:
+            return None
+        if self.physical_type == 'INT96':
+            nanos, day = struct.unpack('<qi', value)
+            value = _EPOCH + datetime.timedelta(days=day - _JULIAN_EPOCH_DAY,
+                                                microseconds=nanos // 1000)
+            return value.isoformat()
+        if self.logical_type == 'DECIMAL':
+            return _format_decimal(value, self.scale) if self.scale else str(value)
+        if self.logical_type == 'DATE':
+            return _date_value(value)
+        if self.logical_type == 'TIMESTAMP' and self.time_unit:
+            return _timestamp_value(value, self.time_unit)
+        if isinstance(value, bytes):
+            if self.logical_type in _TEXT_TYPES:
+                return value.decode('UTF-8', errors='replace')
+            if self.logical_type == 'UUID' and len(value) == 16:
+                return str(uuid.UUID(bytes=value))
+            return value.hex()
+        if isinstance(value, float) and not math.isfinite(value):
+            return str(value)
+        return value
+
+
+class ParquetMetadata:
+    """
+    Metadata stored in the footer of a Parquet file.
+    """
+    def __init__(self, fields):
+        self.version = fields.get(1)
+        self.num_rows = fields.get(3, 0)
+        self.row_groups = fields.get(4, [])
+        self.created_by = fields.get(6, b'').decode('UTF-8', errors='replace') or None
+        self.key_value_metadata = {
+            kv.get(1, b'').decode('UTF-8', errors='replace'):
+                kv.get(2, b'').decode('UTF-8', errors='replace')
+            for kv in fields.get(5, [])
+        }
+        self.columns = _leaf_columns(fields.get(2, []))
+
+
+def _enum(names, value):
+    if value is None:
+        return None
+    try:
+        return names[value]
+    except IndexError:
+        return str(value)
+
+
+def _format_decimal(value, scale):
+    """
+    >>> _format_decimal(-12345, 3)
+    '-12.345'
+    >>> _format_decimal(5, 2)
+    '0.05'
+    """
+    sign = '-' if value < 0 else ''
+    digits = str(abs(value)).rjust(scale + 1, '0')
+    return '{}{}.{}'.format(sign, digits[:-scale], digits[-scale:])
+
+
+def _date_value(days):
+    try:
+        return (_EPOCH + datetime.timedelta(days=days)).date().isoformat()
+    except OverflowError:
+        return days
+
+
+def _timestamp_value(value, unit):
+    """
+    >>> _timestamp_value(1500000000123456, 'MICROS')
+    '2017-07-14T02:40:00.123456'
+    """
+    microseconds = {
+        'MILLIS': value * 1000,
+        'MICROS': value,
+        'NANOS': value // 1000,
+    }[unit]
+    try:
+        return (_EPOCH + datetime.timedelta(microseconds=microseconds)).isoformat()
+    except OverflowError:
+        return value
+
+
+def _leaf_columns(schema):
+    """
+    Flatten a list of schema elements into a list of leaf Columns.
+    """
+    columns = []
+    elements = iter(schema[1:])
+
+    def walk(count, path, max_def, max_rep):
+        for _ in range(count):
+            try:
+                element = next(elements)
+            except StopIteration:
+                raise ParquetError('Invalid schema')
+            name = element.get(4, b'').decode('UTF-8', errors='replace')
+            repetition = element.get(3)
+            d = max_def + (repetition != 0)
+            r = max_rep + (repetition == 2)
+            if element.get(5):
+                walk(element[5], path + (name,), d, r)
+            else:
+                columns.append(Column(path + (name,), element, d, r))
+
+    if schema:
+        walk(schema[0].get(5, 0), (), 0, 0)
+    return columns
+
+
+@_reader
+def read_metadata(file, size):
+    """
+    Read the metadata of a Parquet file.
+
+    file is a seekable binary file object and size is the size of the
+    file.  Only the footer at the end of the file is read.
+    """
+    if size < 12:
+        raise ParquetError('Not a Parquet file')
+    file.seek(size - 8)
+    tail = file.read(8)
+    footer_size, magic = struct.unpack('<I4s', tail)
+    if magic != MAGIC:
+        raise ParquetError('Not a Parquet file')
+    if footer_size > MAX_FOOTER_SIZE or footer_size > size - 12:
+        raise ParquetError('Invalid metadata size')
+    file.seek(size - 8 - footer_size)
+    footer = file.read(footer_size)
+    return ParquetMetadata(_ThriftReader(footer).read_struct())
+
+
+def _plain_statistic(column, value):
+    """Decode a single PLAIN-encoded value stored in statistics."""
+    fmt = {'INT32': '<i', 'INT64': '<q', 'FLOAT': '<f', 'DOUBLE': '<d'}
+    try:
+        if column.physical_type in fmt:
+            value = struct.unpack(fmt[column.physical_type], value)[0]
+        elif column.physical_type == 'BOOLEAN':
+            value = bool(value[0])
+    except (struct.error, IndexError):
+        return None
+    return column.raw_value(value)
+
+
+@_reader
+def column_statistics(metadata):
+    """
+    Summarize the statistics of each column in a Parquet file.
+
+    Statistics for all row groups are combined.  Minimum and maximum
+    values, null counts, and distinct counts are included only if
+    they are available for every row group.
+
+    Returns a list of dictionaries, one for each leaf column.  Raises
+    ParquetError if the statistics are malformed.
+    """
+    result = []
+    for i, column in enumerate(metadata.columns):
+        stats = {
+            'name': column.name,
+            'type': column.type_name(),
+            'physical_type': column.physical_type,
+            'logical_type': column.logical_type,
+            'repetition': column.repetition,
+            'num_values': 0,
+            'null_count': 0,
+            'distinct_count': None,
+            'min': None,
+            'max': None,
+            'compressed_size': 0,
+            'uncompressed_size': 0,
+            'codecs': [],
+            'encodings': [],
+        }
+        low = high = None
+        have_minmax = have_nulls = True
+        # Deprecated min/max fields use signed comparison, which is
+        # only correct for plain numeric types
+        legacy_ok = (column.physical_type in ('BOOLEAN', 'INT32', 'INT64', 'FLOAT', 'DOUBLE')
+                     and not column.unsigned and column.logical_type != 'DECIMAL')
+        for row_group in metadata.row_groups:
+            chunks = row_group.get(1, [])
+            meta = chunks[i].get(3, {}) if i < len(chunks) else {}
+            stats['num_values'] += meta.get(5, 0)
+            stats['compressed_size'] += meta.get(7, 0)
+            stats['uncompressed_size'] += meta.get(6, 0)
+            codec = _enum(CODECS, meta.get(4))
+            if codec and codec not in stats['codecs']:
+                stats['codecs'].append(codec)
+            for encoding in meta.get(2, []):
+                encoding = _enum(ENCODINGS, encoding)
+                if encoding not in stats['encodings']:
+                    stats['encodings'].append(encoding)
+
+            st = meta.get(12, {})
+            if 3 in st and have_nulls:
+                stats['null_count'] += st[3]
+            else:
+                have_nulls = False
+            if len(metadata.row_groups) == 1:
+                stats['distinct_count'] = st.get(4)
+
+            if 6 in st and 5 in st:
+                gmin, gmax = st[6], st[5]
+            elif legacy_ok and 2 in st and 1 in st:
+                gmin, gmax = st[2], st[1]
+            else:
+                have_minmax = False
+                continue
+            gmin = _plain_statistic(column, gmin)
+            gmax = _plain_statistic(column, gmax)
+            if gmin is None or gmax is None:
+                have_minmax = False
+                continue
+            low = gmin if low is None else min(low, gmin)
+            high = gmax if high is None else max(high, gmax)
+
+        if not have_nulls:
+            stats['null_count'] = None
+        if have_minmax and metadata.row_groups:
+            stats['min'] = column.display_value(low)
+            stats['max'] = column.display_value(high)
+        result.append(stats)
+    return result
+
+
+def snappy_decompress(data):
+    """
+    Decompress a raw Snappy-compressed block.
+
+    >>> snappy_decompress(b'\\x0c\\x0cabcd\\x11\\x04')
+    b'abcdabcdabcd'
+    """
+    reader = _ThriftReader(data)
+    length = reader._varint()
+    if length > MAX_PAGE_SIZE:
+        raise ParquetError('Page too large')
+    pos = reader.pos
+    out = bytearray()
+    end = len(data)
+    try:
+        while pos < end:
+            tag = data[pos]
+            kind = tag & 3
+            pos += 1
+            if kind == 0:
+                n = tag >> 2
+                if n >= 60:
+                    extra = n - 59
+                    n = int.from_bytes(data[pos:pos + extra], 'little')
+                    pos += extra
+                n += 1
+                out += data[pos:pos + n]
+                pos += n
+                continue
+            elif kind == 1:
+                n = ((tag >> 2) & 7) + 4
+                offset = ((tag >> 5) << 8) | data[pos]
+                pos += 1
+            elif kind == 2:
+                n = (tag >> 2) + 1
+                offset = int.from_bytes(data[pos:pos + 2], 'little')
+                pos += 2
+            else:
+                n = (tag >> 2) + 1
+                offset = int.from_bytes(data[pos:pos + 4], 'little')
+                pos += 4
+            if offset == 0 or offset > len(out):
+                raise ParquetError('Invalid Snappy data')
+            start = len(out) - offset
+            if n <= offset:
+                out += out[start:start + n]
+            else:
+                for k in range(n):
+                    out.append(out[start + k])
+    except IndexError:
+        raise ParquetError('Invalid Snappy data')
+    if len(out) != length:
+        raise ParquetError('Invalid Snappy data')
+    return bytes(out)
+
+
+def _decompress(codec, data):
+    if codec == 'UNCOMPRESSED':
+        return data
+    elif codec == 'SNAPPY':
+        return snappy_decompress(data)
+    elif codec == 'GZIP':
+        try:
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+            result = decompressor.decompress(data, MAX_PAGE_SIZE)
+        except zlib.error:
+            raise ParquetError('Invalid GZIP data')
+        if decompressor.unconsumed_tail:
+            raise ParquetError('Page too large')
+        return result
+    raise ParquetError('Unsupported compression codec: {}'.format(codec))
+
+
+def _rle_hybrid(data, pos, end, bit_width, count):
+    """
+    Decode values using the RLE/bit-packing hybrid encoding.
+
+    Only the first count values are decoded.  Runs must lie between
+    pos and end, which must be within the data.
+
+    >>> _rle_hybrid(b'\\x06\\x01\\x03\\x88\\xc6\\xfa', 0, 6, 3, 11)
+    ([1, 1, 1, 0, 1, 2, 3, 4, 5, 6, 7], 6)
+    """
+    if bit_width > 32 or end > len(data):
+        raise ParquetError('Invalid level data')
+    values = []
+    width = (bit_width + 7) // 8
+    mask = (1 << bit_width) - 1
+    reader = _ThriftReader(data, pos)
+    while len(values) < count and reader.pos < end:
+        header = reader._varint()
+        if header & 1:
+            # Bit-packed run; only the groups that are needed are read
+            ngroups = header >> 1
+            if reader.pos + ngroups * bit_width > end:
+                raise ParquetError('Invalid level data')
+            n = min(ngroups * 8, count - len(values))
+            nbytes = (n * bit_width + 7) // 8
+            chunk = int.from_bytes(data[reader.pos:reader.pos + nbytes], 'little')
+            reader.pos += ngroups * bit_width
+            for k in range(n):
+                values.append((chunk >> (k * bit_width)) & mask)
+        else:
+            if reader.pos + width > end:
+                raise ParquetError('Invalid level data')
+            value = int.from_bytes(data[reader.pos:reader.pos + width], 'little')
+            reader.pos += width
+            values.extend([value] * min(header >> 1, count - len(values)))
+    if len(values) < count:
+        raise ParquetError('Invalid level data')
+    return values, reader.pos
+
+
+def _plain_values(column, data, pos, count):
+    """Decode PLAIN-encoded values."""
+    ptype = column.physical_type
+    fmt = {'INT32': 'i', 'INT64': 'q', 'FLOAT': 'f', 'DOUBLE': 'd'}
+    # Minimum number of bits per value, so that a corrupt count cannot
+    # exceed the size of the page
+    bits = {'BOOLEAN': 1, 'INT32': 32, 'INT64': 64, 'FLOAT': 32,
+            'DOUBLE': 64, 'INT96': 96}.get(ptype, 32)
+    if ptype == 'FIXED_LEN_BYTE_ARRAY':
+        if not isinstance(column.type_length, int) or column.type_length <= 0:
+            raise ParquetError('Invalid column type')
+        bits = 8 * column.type_length
+    if count * bits > 8 * (len(data) - pos):
+        raise ParquetError('Invalid page data')
+    try:
+        if ptype in fmt:
+            return list(struct.unpack_from('<{}{}'.format(count, fmt[ptype]), data, pos))
+        elif ptype == 'BOOLEAN':
+            return [bool(data[pos + k // 8] >> (k % 8) & 1) for k in range(count)]
+        elif ptype == 'INT96':
+            return [bytes(data[pos + 12 * k:pos + 12 * k + 12]) for k in range(count)]
+        elif ptype == 'FIXED_LEN_BYTE_ARRAY':
+            n = column.type_length
+            return [bytes(data[pos + n * k:pos + n * k + n]) for k in range(count)]
+        else:
+            values = []
+            for _ in range(count):
+                (n,) = struct.unpack_from('<I', data, pos)
+                values.append(bytes(data[pos + 4:pos + 4 + n]))
+                pos += 4 + n
+            return values
+    except (struct.error, IndexError):
+        raise ParquetError('Invalid page data')
+
+
+def _read_page(file, offset, limit):
+    """
+    Read a page header and page data from a column chunk.
+
+    Returns a tuple (header, data, next_offset).
+    """
+    file.seek(offset)
+    buf = file.read(min(limit, 64 * 1024))
+    reader = _ThriftReader(buf)
+    header = reader.read_struct()
+    size = header.get(3, 0)
+    if size < 0:
+        raise ParquetError('Invalid page size')
+    if size > MAX_PAGE_SIZE or header.get(2, 0) > MAX_PAGE_SIZE:
+        raise ParquetError('Page too large')
+    data = buf[reader.pos:reader.pos + size]
+    if len(data) < size:
+        data += file.read(size - len(data))
+    return header, data, offset + reader.pos + size
+
+
+@_reader
+def _read_column_sample(file, column, meta, nrows):
+    """
+    Read the first values of a column chunk.
+
+    Returns a list of up to nrows values (None for null values.)
+    """
+    if column.max_repetition_level > 0:
+        raise ParquetError('Nested columns are not supported')
+    codec = _enum(CODECS, meta.get(4))
+    offset = meta.get(9, 0)
+    if meta.get(11):
+        offset = min(offset, meta[11])
+    end = offset + meta.get(7, 0)
+    dictionary = None
+    values = []
+    while len(values) < nrows and offset < end:
+        header, data, offset = _read_page(file, offset, end - offset)
+        ptype = header.get(1)
+        # Only the levels of the values that are wanted are decoded
+        wanted = nrows - len(values)
+        if ptype == 2:
+            # Dictionary page
+            data = _decompress(codec, data)
+            dictionary = _plain_values(column, data, 0, header.get(7, {}).get(1, 0))
+            continue
+        elif ptype == 0:
+            page = header.get(5, {})
+            data = _decompress(codec, data)
+            count = page.get(1, 0)
+            encoding = page.get(2)
+            pos = 0
+            wanted = min(count, wanted)
+            if column.max_definition_level > 0:
+                (length,) = struct.unpack_from('<I', data, 0)
+                levels, _ = _rle_hybrid(data, 4, 4 + length,
+                                        column.max_definition_level.bit_length(), wanted)
+                pos = 4 + length
+            else:
+                levels = None
+        elif ptype == 3:
+            page = header.get(8, {})
+            count = page.get(1, 0)
+            encoding = page.get(4)
+            def_length = page.get(5, 0)
+            rep_length = page.get(6, 0)
+            levels_end = def_length + rep_length
+            wanted = min(count, wanted)
+            if column.max_definition_level > 0:
+                levels, _ = _rle_hybrid(data, rep_length, levels_end,
+                                        column.max_definition_level.bit_length(), wanted)
+            else:
+                levels = None
+            body = data[levels_end:]
+            if page.get(7, True):
+                body = _decompress(codec, body)
+            data = body
+            pos = 0
+        else:
+            continue
+
+        if levels is None:
+            present = [True] * wanted
+        else:
+            present = [level == column.max_definition_level for level in levels]
+        nvalues = sum(present)
+
+        if encoding == 0:
+            page_values = _plain_values(column, data, pos, nvalues)
+        elif encoding == 3 and column.physical_type == 'BOOLEAN':
+            (length,) = struct.unpack_from('<I', data, pos)
+            page_values, _ = _rle_hybrid(data, pos + 4, pos + 4 + length, 1, nvalues)
+            page_values = [bool(v) for v in page_values]
+        elif encoding in (2, 8):
+            if dictionary is None:
+                raise ParquetError('Missing dictionary page')
+            bit_width = data[pos]
+            indices, _ = _rle_hybrid(data, pos + 1, len(data), bit_width, nvalues)
+            try:
+                page_values = [dictionary[k] for k in indices]
+            except IndexError:
+                raise ParquetError('Invalid dictionary index')
+        else:
+            raise ParquetError('Unsupported encoding: {}'.format(_enum(ENCODINGS, encoding)))
+
+        page_values = iter(page_values)
+        values.extend(next(page_values) if p else None for p in present)
+    return values
+
+
+@_reader
+def _display_values(column, values):
+    """Convert raw values of a column into display values."""
+    return [column.display_value(column.raw_value(v)) for v in values]
+
+
+@_reader
+def read_sample(file, metadata, nrows=MAX_SAMPLE_ROWS):
+    """
+    Read the first rows of a Parquet file.
+
+    Only the first row group is read.  Nested (repeated) columns, and
+    pages using compression codecs other than Snappy or GZIP, or
+    encodings other than PLAIN, RLE (for booleans), or dictionary
+    encoding, are not supported; the values of such columns are None.
+
+    Returns a tuple (rows, unsupported), where rows is a list of rows
+    (each a list of display values, one per leaf column), and
+    unsupported is a list of names of columns that could not be read.
+    """
+    if not metadata.row_groups:
+        return [], []
+    row_group = metadata.row_groups[0]
+    nrows = min(nrows, row_group.get(3, 0))
+    chunks = row_group.get(1, [])
+    columns = []
+    unsupported = []
+    for column, chunk in zip(metadata.columns, chunks):
+        try:
+            values = _read_column_sample(file, column, chunk.get(3, {}), nrows)
+            columns.append(_display_values(column, values))
+        except ParquetError:
+            unsupported.append(column.name)
+            columns.append([])
+    rows = []
+    for k in range(nrows):
+        rows.append([c[k] if k < len(c) else None for c in columns])
+    return rows, unsupported
@@ -52,10 +52,13 @@ def open(self, path, mode='rb'):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_project_directory_content(self, path, subdir, file_display_url, file_url):
+    def get_project_directory_content(self, path, subdir, file_display_url, file_url, immutable=False):
         """
         Return information for displaying files and directories from
         the project's file root.
+
+        If `immutable` is true, the directory's contents are not
+        expected to change, and may be cached indefinitely.
         """
         raise NotImplementedError
 
@@ -130,8 +133,58 @@ def make_zip(self, project):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def make_checksum_file(self, project):
-        """Make the checksums file for the main files."""
+    def make_checksum_file(self, project, deduplicate=False):
+        """
+        Make the checksums file for the main files.
+
+        If `deduplicate` is true, files are also added to the content
+        store (if supported), which may change their modification
+        times; this should only be done before publication.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def deduplicate_files(self, project):
+        """
+        Add the files of a published project to the content store,
+        using the checksums in its manifest, without changing their
+        modification times.  Returns the number of files stored.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def open_file_manifest(self, project):
+        """
+        Open the file manifest of a published project.
+
+        Returns an iterator of dictionaries (see
+        project.utility.file_manifest_entry), sorted by path.  Raises
+        FileNotFoundError if no manifest is available.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def load_preview_index(self, project, path, source_size):
+        """
+        Load the line index (see project.rowindex) of a published
+        project file, given its path relative to the file root.
+        Returns None if there is no index for the current file.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save_preview_index(self, project, path, index):
+        """Save the line index of a published project file."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def remove_preview_indices(self, project):
+        """Remove the line indices of a published project's files."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def make_signal_pyramids(self, project):
+        """Make min/max pyramids for the project's WFDB records."""
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -144,6 +197,19 @@ def can_make_checksum(self):
         """Check if zip file is supported."""
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def can_deduplicate(self):
+        """
+        Check if identical published files are stored only once
+        (see project.contentstore).
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def can_make_signal_pyramids(self):
+        """Check if signal pyramids are supported."""
+        raise NotImplementedError
+
     @abc.abstractmethod
     def is_lightwave_supported(self):
         """Check if lightwave is supported."""
@@ -4,6 +4,7 @@
 from django.shortcuts import redirect
 from google.cloud.exceptions import Conflict, NotFound
 from physionet.gcs import GCSObject, GCSObjectException, create_bucket, delete_bucket
+from project import rowindex
 from project.projectfiles.base import BaseProjectFiles
 from project.quota import GCSQuotaManager
 from project.utility import DirectoryInfo, FileInfo, readable_size
@@ -74,7 +75,7 @@ def mv(self, source_path, target_path):
     def open(self, path, mode='rb'):
         return GCSObject(path).open(mode)
 
-    def get_project_directory_content(self, path, subdir, file_display_url, file_url):
+    def get_project_directory_content(self, path, subdir, file_display_url, file_url, immutable=False):
         files, dirs = self._list_dir(path)
 
         for file in files:
@@ -147,7 +148,38 @@ def make_zip(self, project):
         """Not implemented for GCS storage backend."""
         return None
 
-    def make_checksum_file(self, project):
+    def make_checksum_file(self, project, deduplicate=False):
+        """Not implemented for GCS storage backend."""
+        return None
+
+    def deduplicate_files(self, project):
+        """Not implemented for GCS storage backend."""
+        return 0
+
+    def open_file_manifest(self, project):
+        """Not implemented for GCS storage backend."""
+        raise FileNotFoundError(f'No file manifest for {project}')
+
+    def load_preview_index(self, project, path, source_size):
+        try:
+            data = GCSObject(self._preview_index_path(project, path)).blob.download_as_bytes()
+        except NotFound:
+            return None
+        return rowindex.LineIndex.from_bytes(data, source_size)
+
+    def save_preview_index(self, project, path, index):
+        GCSObject(self._preview_index_path(project, path)).upload_from_string(index.to_bytes())
+
+    def remove_preview_indices(self, project):
+        GCSObject(self._dir_path(self._preview_index_path(project, ''))).rm()
+
+    def _preview_index_path(self, project, path):
+        # Indices are kept in the (private) media bucket, since files
+        # in the project's own bucket are served directly
+        return os.path.join(settings.GCP_STORAGE_BUCKET_NAME, 'preview-index',
+                            project.slug, project.version, path + '.idx' if path else '')
+
+    def make_signal_pyramids(self, project):
         """Not implemented for GCS storage backend."""
         return None
 
@@ -157,6 +189,14 @@ def can_make_zip(self):
     def can_make_checksum(self):
         return False
 
+    def can_deduplicate(self):
+        # Objects cannot be linked, and each published project has its
+        # own bucket, from which its files are served directly
+        return False
+
+    def can_make_signal_pyramids(self):
+        return False
+
     def is_lightwave_supported(self):
         return False
 
@@ -1,54 +1,89 @@
 import hashlib
+import json
+import logging
 import os
 import shutil
 
 from django.conf import settings
 from physionet.utility import serve_file, sorted_tree_files, zip_dir
+from project import rowindex, wfdb
+from project.contentstore import ContentStore
 from project.projectfiles.base import BaseProjectFiles
 from project.quota import DemoQuotaManager
 from project.utility import (
+    LocalFileInfo,
     clear_directory,
+    file_manifest_entry,
+    forget_directory,
     get_directory_info,
-    get_file_info,
     get_tree_size,
-    list_items,
     move_items,
     remove_items,
     rename_file,
+    scan_directory,
     write_uploaded_file,
 )
 
+LOGGER = logging.getLogger(__name__)
+
 
 class LocalProjectFiles(BaseProjectFiles):
     @property
     def file_root(self):
         return settings.MEDIA_ROOT
 
+    @property
+    def content_store(self):
+        if settings.CONTENT_STORE_ROOT:
+            return ContentStore(settings.CONTENT_STORE_ROOT)
+        return None
+
     def mkdir(self, path):
         os.mkdir(path)
+        self._forget_parents(path)
 
     def rm(self, path):
-        remove_items([path], ignore_missing=False)
+        try:
+            remove_items([path], ignore_missing=False)
+        finally:
+            self._forget_parents(path)
 
     def fwrite(self, path, content):
-        with open(path, 'w') as outfile:
+        # Write a new file rather than modifying the existing one in
+        # place, since it may be linked to other projects
+        with open(path + '.tmp', 'w') as outfile:
             outfile.write(content)
+        os.replace(path + '.tmp', path)
+        self._forget_parents(path)
 
     def fput(self, path, file):
-        write_uploaded_file(
-            file=file,
-            overwrite=False,
-            write_file_path=os.path.join(path, file.name),
-        )
+        try:
+            write_uploaded_file(
+                file=file,
+                overwrite=False,
+                write_file_path=os.path.join(path, file.name),
+            )
+        finally:
+            forget_directory(path)
 
     def rename(self, source_path, target_path):
-        rename_file(source_path, target_path)
+        try:
+            rename_file(source_path, target_path)
+        finally:
+            self._forget_parents(source_path, target_path)
 
     def cp_file(self, source_path, target_path):
-        shutil.copyfile(source_path, target_path)
+        try:
+            shutil.copyfile(source_path, target_path)
+        finally:
+            self._forget_parents(target_path)
 
     def mv(self, source_path, target_path):
-        move_items([source_path], target_path)
+        try:
+            move_items([source_path], target_path)
+        finally:
+            self._forget_parents(source_path)
+            forget_directory(target_path)
 
     def open(self, path, mode='rb'):
         infile = open(path, mode)
@@ -56,17 +91,14 @@ def open(self, path, mode='rb'):
 
         return infile
 
-    def get_project_directory_content(self, path, subdir, file_display_url, file_url):
-        file_names, dir_names = list_items(path)
+    def get_project_directory_content(self, path, subdir, file_display_url, file_url, immutable=False):
+        files, dir_names = scan_directory(path, immutable=immutable)
         display_files, display_dirs = [], []
 
-        # Files require desciptive info and download links
-        for file in file_names:
-            file_info = get_file_info(os.path.join(path, file))
-            file_info.url = file_display_url(subdir=subdir, file=file)
-            file_info.raw_url = file_url(subdir=subdir, file=file)
-            file_info.download_url = file_info.raw_url + '?download'
-            display_files.append(file_info)
+        # Files require desciptive info and download links, which are
+        # computed when needed
+        for name, size, mtime in files:
+            display_files.append(LocalFileInfo(name, size, mtime, subdir, file_display_url, file_url))
 
         # Directories require links
         for dir_name in dir_names:
@@ -168,30 +200,120 @@ def make_zip(self, project):
         project.compressed_storage_size = os.path.getsize(fname)
         project.save()
 
-    def make_checksum_file(self, project):
-        fname = os.path.join(project.file_root(), 'SHA256SUMS.txt')
+    def make_checksum_file(self, project, deduplicate=False):
+        root = project.file_root()
+        fname = os.path.join(root, 'SHA256SUMS.txt')
         if os.path.isfile(fname):
             os.remove(fname)
 
+        checksums = []
+        checksum_file_hash = hashlib.sha256()
         with open(fname, 'w') as outfile:
-            for f in sorted_tree_files(project.file_root()):
+            for f in sorted_tree_files(root):
                 if f != 'SHA256SUMS.txt':
                     h = hashlib.sha256()
-                    with open(os.path.join(project.file_root(), f), 'rb') as fp:
+                    with open(os.path.join(root, f), 'rb') as fp:
                         block = fp.read(h.block_size)
                         while block:
                             h.update(block)
                             block = fp.read(h.block_size)
-                    outfile.write('{} {}\n'.format(h.hexdigest(), f))
+                    if deduplicate and self.content_store:
+                        self.content_store.add(os.path.join(root, f), h.hexdigest())
+                    line = '{} {}\n'.format(h.hexdigest(), f)
+                    outfile.write(line)
+                    checksum_file_hash.update(line.encode())
+                    checksums.append((f, h.hexdigest()))
+
+        # The manifest lists every file, including SHA256SUMS.txt
+        # itself, in the same (byte) order as sorted_tree_files
+        checksums.append(('SHA256SUMS.txt', checksum_file_hash.hexdigest()))
+        checksums.sort()
+
+        manifest_name = project.file_manifest_path()
+        os.makedirs(os.path.dirname(manifest_name), exist_ok=True)
+        with open(manifest_name + '.tmp', 'w') as outfile:
+            for f, sha256 in checksums:
+                outfile.write(json.dumps(file_manifest_entry(root, f, sha256)) + '\n')
+        os.replace(manifest_name + '.tmp', manifest_name)
 
         project.set_storage_info()
 
+    def deduplicate_files(self, project):
+        if not self.content_store:
+            return 0
+        count = 0
+        for entry in project.file_manifest():
+            path = os.path.join(project.file_root(), entry['path'])
+            if self.content_store.add(path, entry['sha256'], preserve_mtime=True):
+                count += 1
+        return count
+
+    def open_file_manifest(self, project):
+        try:
+            fp = open(project.file_manifest_path())
+        except FileNotFoundError:
+            # Projects published before manifests were introduced
+            # only have SHA256SUMS.txt
+            fp = open(os.path.join(project.file_root(), 'SHA256SUMS.txt'))
+            return self._read_checksum_file(project.file_root(), fp)
+        return self._read_manifest(fp)
+
+    def _read_manifest(self, fp):
+        with fp:
+            for line in fp:
+                yield json.loads(line)
+
+    def _read_checksum_file(self, root, fp):
+        with fp:
+            checksums = [line.rstrip('\n').split(' ', 1) for line in fp if line.strip()]
+        checksums.sort(key=lambda item: item[1])
+        for sha256, path in checksums:
+            try:
+                yield file_manifest_entry(root, path, sha256)
+            except OSError as err:
+                LOGGER.warning('Cannot read %s listed in %s: %s', path, root, err)
+
+    def load_preview_index(self, project, path, source_size):
+        return rowindex.LineIndex.load(project.preview_index_path(path), source_size)
+
+    def save_preview_index(self, project, path, index):
+        index.save(project.preview_index_path(path))
+
+    def remove_preview_indices(self, project):
+        root = project.preview_index_root()
+        if os.path.isdir(root):
+            shutil.rmtree(root)
+
+    def make_signal_pyramids(self, project):
+        project.remove_signal_pyramids()
+        for record in wfdb.list_records(self, project.file_root()):
+            try:
+                header, readers = wfdb.open_record(
+                    self, os.path.join(project.file_root(), record))
+            except (OSError, wfdb.WFDBError) as err:
+                LOGGER.warning('Cannot read record %s of %s: %s', record, project, err)
+                continue
+            try:
+                path = project.signal_pyramid_path(record)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                wfdb.write_pyramid(header, readers, path)
+            except (OSError, wfdb.WFDBError) as err:
+                LOGGER.warning('Cannot create signal pyramid for %s of %s: %s', record, project, err)
+            finally:
+                wfdb.close_record(readers)
+
     def can_make_zip(self):
         return True
 
     def can_make_checksum(self):
         return True
 
+    def can_deduplicate(self):
+        return self.content_store is not None
+
+    def can_make_signal_pyramids(self):
+        return True
+
     def is_lightwave_supported(self):
         return True
 
@@ -201,5 +323,11 @@ def has_wfdb_files(self, project):
     def is_wget_supported(self):
         return True
 
+    def _forget_parents(self, *paths):
+        # Discard cached listings of the directories containing the
+        # given paths, in case their modification times didn't change
+        for path in paths:
+            forget_directory(os.path.dirname(path))
+
     def serve_file_field(self, field):
         return serve_file(field.path, attach=False)
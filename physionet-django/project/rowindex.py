@@ -0,0 +1,322 @@
+import bisect
+import collections
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from array import array
+
+# Approximate number of bytes between entries of a line index.
+INDEX_SPACING = 256 * 1024
+
+# Approximate number of (uncompressed) bytes between checkpoints of a
+# gzip-compressed file.
+CHECKPOINT_SPACING = 16 * 1024 * 1024
+
+# Maximum number of compressed files whose checkpoints are retained in
+# memory.
+CHECKPOINT_CACHE_FILES = 8
+
+_READ_SIZE = 64 * 1024
+
+_INDEX_MAGIC = b'PNLNIDX1'
+_INDEX_HEADER = struct.Struct('<8sQQQQ')
+
+
+class ScanLimitExceeded(Exception):
+    """
+    Exception raised if locating a line would require reading more
+    data than allowed.
+    """
+    pass
+
+
+class LineIndex:
+    """
+    Index of line positions in a (possibly very large) text file.
+
+    The index consists of a sorted list of (line number, byte offset)
+    pairs, spaced roughly every INDEX_SPACING bytes, so that a given
+    line can be found by seeking to the preceding entry and reading at
+    most a few hundred kilobytes.
+
+    The index is built lazily: extend() scans the file only as far as
+    needed to locate a requested line.  `complete` indicates whether
+    the end of the file has been reached, in which case `scan_lines`
+    is the total number of lines.
+
+    source_size is the size of the indexed file, used to detect stale
+    indices.  For compressed files, this is the compressed size, while
+    offsets refer to the uncompressed data.
+
+    >>> import io
+    >>> data = b''.join(b'%d\\n' % i for i in range(100000))
+    >>> index = LineIndex(len(data))
+    >>> index.find(io.BytesIO(data), 54321)
+    (54321, 314816)
+    >>> index.complete
+    False
+    >>> index.find(io.BytesIO(data), 200000)
+    (100000, 588890)
+    >>> index.complete, index.scan_lines
+    (True, 100000)
+    """
+    def __init__(self, source_size):
+        self.source_size = source_size
+        self.lines = array('Q', [0])
+        self.offsets = array('Q', [0])
+        self.scan_lines = 0
+        self.scan_offset = 0
+        self.complete = False
+
+    @classmethod
+    def load(cls, path, source_size):
+        """
+        Load an index previously saved by save().
+
+        Returns None if the file does not exist or does not match the
+        given source size.
+        """
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return cls.from_bytes(data, source_size)
+
+    @classmethod
+    def from_bytes(cls, data, source_size):
+        """
+        Decode an index encoded by to_bytes().
+
+        Returns None if the data is invalid or does not match the given
+        source size.
+        """
+        try:
+            (magic, size, scan_lines, scan_offset,
+             complete) = _INDEX_HEADER.unpack_from(data)
+        except struct.error:
+            return None
+        if magic != _INDEX_MAGIC or size != source_size:
+            return None
+
+        entries = array('Q')
+        entries.frombytes(data[_INDEX_HEADER.size:])
+        index = cls(source_size)
+        index.lines = entries[0::2]
+        index.offsets = entries[1::2]
+        index.scan_lines = scan_lines
+        index.scan_offset = scan_offset
+        index.complete = bool(complete)
+        return index
+
+    def to_bytes(self):
+        """Encode the index as bytes."""
+        entries = array('Q', bytes(16 * len(self.lines)))
+        entries[0::2] = self.lines
+        entries[1::2] = self.offsets
+        return _INDEX_HEADER.pack(_INDEX_MAGIC, self.source_size,
+                                  self.scan_lines, self.scan_offset,
+                                  int(self.complete)) + entries.tobytes()
+
+    def save(self, path):
+        """
+        Save the index to a file.
+
+        The file is replaced atomically, so concurrent readers will see
+        either the old or the new contents.
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.to_bytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def extend(self, file, line, max_bytes=None):
+        """
+        Scan the file until the given line number has been indexed, or
+        the end of the file is reached.
+
+        file must be a seekable binary file object.  If max_bytes is
+        given and more than that many bytes would need to be read,
+        ScanLimitExceeded is raised; the part of the file that was
+        scanned remains indexed, so a later call can continue from
+        there.
+        """
+        if self.complete or self.scan_lines > line:
+            return
+        file.seek(self.scan_offset)
+        position = start = self.scan_offset
+        while not self.complete and self.scan_lines <= line:
+            if max_bytes is not None and position - start >= max_bytes:
+                raise ScanLimitExceeded()
+            data = file.read(_READ_SIZE)
+            if not data:
+                self.complete = True
+                if position > self.scan_offset:
+                    # Final line without a trailing newline
+                    self.scan_lines += 1
+                    self.scan_offset = position
+                break
+            last = data.rfind(b'\n')
+            if last >= 0:
+                self.scan_lines += data.count(b'\n')
+                self.scan_offset = position + last + 1
+                if self.scan_offset - self.offsets[-1] >= INDEX_SPACING:
+                    self.lines.append(self.scan_lines)
+                    self.offsets.append(self.scan_offset)
+            position += len(data)
+
+    def find(self, file, line, max_bytes=None):
+        """
+        Seek to the start of a line.
+
+        Returns a tuple (line, offset) of the line number and byte
+        offset that the file is positioned at.  If the file contains
+        fewer lines than requested, it is positioned at the end.
+        max_bytes limits the amount of data scanned (see extend().)
+        """
+        self.extend(file, line, max_bytes)
+        if self.complete and line >= self.scan_lines:
+            file.seek(self.scan_offset)
+            return self.scan_lines, self.scan_offset
+
+        i = bisect.bisect_right(self.lines, line) - 1
+        nlines = self.lines[i]
+        offset = self.offsets[i]
+        file.seek(offset)
+        while nlines < line:
+            data = file.read(_READ_SIZE)
+            if not data:
+                break
+            start = 0
+            while nlines < line:
+                end = data.find(b'\n', start)
+                if end < 0:
+                    break
+                nlines += 1
+                start = end + 1
+            offset += start if nlines == line else len(data)
+        file.seek(offset)
+        return nlines, offset
+
+
+class GzipReader:
+    """
+    Seekable reader for gzip-compressed files.
+
+    Seeking within a gzip stream normally requires decompressing all
+    of the data up to the target position.  While reading, this class
+    records snapshots of the decompressor state every
+    CHECKPOINT_SPACING bytes, so that later seeks can resume from the
+    nearest preceding checkpoint.  Checkpoints are shared by all
+    readers of the same file (identified by `key`) within a process,
+    for the most recently used CHECKPOINT_CACHE_FILES files.
+
+    Concatenated (multi-member) gzip files are supported.
+
+    If max_bytes is given, ScanLimitExceeded is raised once the reader
+    has decompressed more than that many bytes; checkpoints recorded
+    up to that point are kept, so later readers can continue from
+    there.
+
+    >>> import gzip, io
+    >>> data = bytes(range(256)) * 1000
+    >>> reader = GzipReader(io.BytesIO(gzip.compress(data)))
+    >>> reader.seek(123456)
+    >>> reader.read(4) == data[123456:123460]
+    True
+    >>> reader.tell()
+    123460
+    """
+    _cache = collections.OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, file, key=None, max_bytes=None):
+        self._file = file
+        self._max_bytes = max_bytes
+        self._decompressed = 0
+        with self._lock:
+            if key in self._cache:
+                checkpoints = self._cache.pop(key)
+            else:
+                checkpoints = ([0], [(0, zlib.decompressobj(zlib.MAX_WBITS | 16))])
+            if key is not None:
+                self._cache[key] = checkpoints
+                while len(self._cache) > CHECKPOINT_CACHE_FILES:
+                    self._cache.popitem(last=False)
+        # Uncompressed positions, and corresponding (compressed offset,
+        # decompressor) pairs, in increasing order
+        self._positions, self._states = checkpoints
+        self._restore(0)
+
+    def _restore(self, index):
+        compressed_offset, decompressor = self._states[index]
+        self._position = self._positions[index]
+        self._decompressor = decompressor.copy()
+        self._file.seek(compressed_offset)
+        self._buffer = b''
+        self._eof = False
+
+    def _checkpoint_before(self, offset):
+        return bisect.bisect_right(self._positions, offset) - 1
+
+    def _fill(self):
+        """Decompress another block of input into the buffer."""
+        if self._max_bytes is not None and self._decompressed >= self._max_bytes:
+            raise ScanLimitExceeded()
+        data = self._file.read(_READ_SIZE)
+        if not data:
+            self._eof = True
+            return
+        output = []
+        try:
+            while data:
+                if self._decompressor.eof:
+                    # Start of a new gzip member
+                    self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                output.append(self._decompressor.decompress(data))
+                data = self._decompressor.unused_data
+        except zlib.error as exc:
+            raise OSError(str(exc)) from exc
+        output = b''.join(output)
+        self._decompressed += len(output)
+        self._buffer += output
+
+        end = self._position + len(self._buffer)
+        with self._lock:
+            if end - self._positions[-1] >= CHECKPOINT_SPACING:
+                self._states.append((self._file.tell(), self._decompressor.copy()))
+                self._positions.append(end)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset):
+        i = self._checkpoint_before(offset)
+        if (offset < self._position
+                or self._positions[i] > self._position + len(self._buffer)):
+            self._restore(i)
+        while offset > self._position + len(self._buffer) and not self._eof:
+            self._position += len(self._buffer)
+            self._buffer = b''
+            self._fill()
+        skip = min(offset - self._position, len(self._buffer))
+        self._buffer = self._buffer[skip:]
+        self._position += skip
+
+    def read(self, size=-1):
+        while (size < 0 or len(self._buffer) < size) and not self._eof:
+            self._fill()
+        if size < 0:
+            size = len(self._buffer)
+        data = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        self._position += len(data)
+        return data
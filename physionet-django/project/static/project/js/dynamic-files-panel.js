@@ -4,17 +4,21 @@
     var panel = $('#files-panel');
     var cur_dir = panel.find('[data-dfp-cur-dir]').data('dfp-cur-dir');
     var panel_url = panel.find('[data-dfp-panel-url]').data('dfp-panel-url');
+    var params = new URLSearchParams(window.location.search);
 
-    function navigateDir(subdir, page_url, push_history) {
+    // state is an object with the attributes 'subdir', 'page' and
+    // 'filter' (page and filter select part of a large directory)
+    function navigateDir(state, page_url, push_history) {
         $.ajax({
             type: 'GET',
             url: panel_url,
-            data: {'subdir': subdir, 'v': '2'},
+            data: {'subdir': state.subdir, 'v': '2',
+                   'page': state.page || 1, 'filter': state.filter || ''},
             success: function(result) {
                 if (push_history)
-                    history.pushState(subdir, '', page_url);
+                    history.pushState(state, '', page_url);
                 else
-                    history.replaceState(subdir, '', page_url);
+                    history.replaceState(state, '', page_url);
                 panel.html(result);
                 setClickHandlers();
             },
@@ -23,16 +27,36 @@
 
     function setClickHandlers() {
         panel.find('a[data-dfp-dir]').click(function(event) {
-            navigateDir($(this).data('dfp-dir'), this.href, true);
+            navigateDir({'subdir': String($(this).data('dfp-dir')),
+                         'page': $(this).data('dfp-page'),
+                         'filter': $(this).attr('data-dfp-filter')},
+                        this.href, true);
             event.preventDefault();
         });
+        panel.find('input[data-dfp-filter-dir]').keydown(function(event) {
+            if (event.key === 'Enter') {
+                var filter = this.value;
+                var url = new URL(window.location);
+                url.search = filter ? '?filter=' + encodeURIComponent(filter) : '';
+                url.hash = 'files-panel';
+                navigateDir({'subdir': String($(this).data('dfp-filter-dir')),
+                             'page': 1, 'filter': filter},
+                            url.href, true);
+                event.preventDefault();
+            }
+        });
     }
     setClickHandlers();
 
     window.onpopstate = function(event) {
         if (event.state !== null) {
-            navigateDir(event.state, window.location, false);
+            var state = event.state;
+            if (typeof state === 'string')
+                state = {'subdir': state};
+            navigateDir(state, window.location, false);
         }
     };
-    history.replaceState(cur_dir, '');
+    history.replaceState({'subdir': String(cur_dir),
+                          'page': params.get('page'),
+                          'filter': params.get('filter')}, '');
 })();
@@ -1,10 +1,13 @@
-from unittest import TestCase
+import os
+import tempfile
+from unittest import TestCase, mock
 
 from django.test import override_settings
 from physionet.settings.base import StorageTypes
 from project.models import ActiveProject
 from project.projectfiles.gcs import GCSProjectFiles
 from project.projectfiles.local import LocalProjectFiles
+from project.utility import forget_directory, scan_directory
 
 
 class TestProjectFiles(TestCase):
@@ -17,3 +20,56 @@ def test_project_files_if_local_storage_type(self):
     def test_project_files_if_google_cloud_storage_type(self):
         project = ActiveProject()
         self.assertIsInstance(project.files, GCSProjectFiles)
+
+
+class TestScanDirectory(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = self.tmp_dir.name
+        os.mkdir(os.path.join(self.path, 'subdir'))
+        for name, content in (('b.txt', 'bb'), ('a.txt', 'a')):
+            with open(os.path.join(self.path, name), 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_listing(self):
+        files, dirs = scan_directory(self.path)
+        self.assertEqual([(name, size) for (name, size, _) in files], [('a.txt', 1), ('b.txt', 2)])
+        self.assertEqual(dirs, ['subdir'])
+
+    def test_cache(self):
+        """
+        Test that listings are reused until the directory changes.
+        """
+        listing = scan_directory(self.path)
+        with mock.patch('os.scandir', side_effect=AssertionError):
+            self.assertIs(scan_directory(self.path), listing)
+
+        os.utime(self.path, ns=(0, 0))
+        files, dirs = scan_directory(self.path)
+        self.assertIsNot((files, dirs), listing)
+        self.assertEqual(len(files), 2)
+
+        # Listings are discarded if the directory is replaced, even if
+        # its modification time is the same
+        listing = scan_directory(self.path)
+        os.rename(self.path, self.path + '.old')
+        os.mkdir(self.path)
+        os.utime(self.path, ns=(0, 0))
+        self.assertEqual(scan_directory(self.path), ([], []))
+        os.rmdir(self.path)
+        os.rename(self.path + '.old', self.path)
+
+        # ...or explicitly forgotten
+        listing = scan_directory(self.path + '/')
+        forget_directory(self.path)
+        self.assertIsNot(scan_directory(self.path), listing)
+
+        # Listings of mutable directories expire
+        listing = scan_directory(self.path)
+        with mock.patch('project.utility.DIRECTORY_CACHE_MAX_AGE', 0):
+            self.assertIsNot(scan_directory(self.path), listing)
+            listing = scan_directory(self.path, immutable=True)
+            self.assertIs(scan_directory(self.path, immutable=True), listing)
@@ -1,23 +1,45 @@
 
 import base64
+import gzip
 import html.parser
+import io
 import os
+import shutil
+import tempfile
+import time
 from http import HTTPStatus
 import json
+from array import array
+from datetime import timedelta
 from unittest import mock
 
+from background_task.models import Task
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
 from django.core import mail
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import PermissionDenied
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from console.views import make_checksum_background
+from physionet.enums import LogCategory
+from project import parquet, utility, wfdb
 from project.forms import ContentForm
+from project.managers.log import LogBuffer
+from project.projectfiles.local import LocalProjectFiles
+from project.views import project_auth
 from project.models import (
+    AccessLog,
     AccessPolicy,
     ActiveProject,
     Author,
     AuthorInvitation,
     DataAccessRequest,
     DataAccessRequestReviewer,
+    DUASignature,
     License,
     PublishedAuthor,
     PublishedProject,
@@ -668,6 +690,395 @@ def test_transfer_author(self):
         self.assertTrue(updated_project.authors.get(user=self.coauthor.user).is_submitting)
 
 
+class TestProjectAuth(TestCase):
+    """
+    Test the project_auth decorator
+    """
+    PROJECT_SLUG = 'T108xFtYkRAxiRiuOLEJ'
+
+    def setUp(self):
+        self.project = ActiveProject.objects.get(slug=self.PROJECT_SLUG)
+        self.submitting_user = User.objects.get(email='rgmark@mit.edu')
+        self.coauthor_user = User.objects.get(email='aewj@mit.edu')
+        self.other_user = User.objects.get(username='admin')
+        # Content types are cached for the lifetime of the process
+        ContentType.objects.get_for_model(ActiveProject)
+
+    def _call(self, user, auth_mode=0):
+        """
+        Call a view, wrapped with project_auth, that uses the author
+        information, and return its keyword arguments.
+        """
+        @project_auth(auth_mode=auth_mode)
+        def view(request, project_slug, **kwargs):
+            for author in kwargs['authors']:
+                author.user.profile.get_full_name()
+            return kwargs
+
+        request = RequestFactory().get('/')
+        request.user = user
+        return view(request, project_slug=self.PROJECT_SLUG)
+
+    def test_query_count(self):
+        """
+        Test that the project, authors, users and profiles are loaded
+        using a fixed number of queries.
+        """
+        with self.assertNumQueries(2):
+            kwargs = self._call(self.coauthor_user)
+        self.assertEqual(kwargs['project'], self.project)
+        self.assertEqual(
+            [a.id for a in kwargs['authors']],
+            list(self.project.authors.order_by('display_order').values_list('id', flat=True)))
+
+    def test_roles(self):
+        """
+        Test the role information passed to the view.
+        """
+        kwargs = self._call(self.submitting_user, auth_mode=1)
+        self.assertEqual(kwargs['author'].user, self.submitting_user)
+        self.assertEqual(kwargs['submitting_author'], kwargs['author'])
+        self.assertTrue(kwargs['is_author'])
+        self.assertTrue(kwargs['is_submitting'])
+
+        kwargs = self._call(self.coauthor_user)
+        self.assertEqual(kwargs['author'].user, self.coauthor_user)
+        self.assertEqual(kwargs['submitting_author'].user, self.submitting_user)
+        self.assertTrue(kwargs['is_author'])
+        self.assertFalse(kwargs['is_submitting'])
+
+        with self.assertRaises(PermissionDenied):
+            self._call(self.coauthor_user, auth_mode=1)
+
+        kwargs = self._call(self.other_user, auth_mode=2)
+        self.assertIsNone(kwargs['author'])
+        self.assertFalse(kwargs['is_author'])
+        self.assertFalse(kwargs['is_submitting'])
+
+        with self.assertRaises(PermissionDenied):
+            self._call(self.other_user, auth_mode=0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestAnonymousAccess(TestCase):
+    """
+    Test anonymous access to an active project using a passphrase
+    """
+    PROJECT_SLUG = 'T108xFtYkRAxiRiuOLEJ'
+
+    def setUp(self):
+        cache.clear()
+        self.project = ActiveProject.objects.get(slug=self.PROJECT_SLUG)
+        self.url, self.passphrase = self.project.generate_anonymous_access()
+        self.login_url = reverse('anonymous_login', args=(self.url,))
+        self.preview_url = reverse('project_preview', args=(self.PROJECT_SLUG,))
+
+    def test_login(self):
+        """
+        Test logging in with a passphrase.
+        """
+        response = self.client.get(self.preview_url)
+        self.assertEqual(response.status_code, 302)
+
+        response = self.client.post(self.login_url, data={'passphrase': 'incorrect'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('anonymousaccess', response.cookies)
+
+        response = self.client.post(self.login_url, data={'passphrase': self.passphrase})
+        self.assertRedirects(response, self.preview_url, fetch_redirect_response=False)
+        response = self.client.get(self.preview_url)
+        self.assertEqual(response.status_code, 200)
+
+        # A new URL invalidates the old one
+        self.project.generate_anonymous_access()
+        response = self.client.get(self.preview_url)
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(ANONYMOUS_ACCESS_CACHE_TIMEOUT=60)
+    def test_cached_url(self):
+        """
+        Test that the anonymous access URL is cached and invalidated.
+        """
+        self.client.post(self.login_url, data={'passphrase': self.passphrase})
+        self.assertEqual(self.client.get(self.preview_url).status_code, 200)
+        with mock.patch.object(ActiveProject, 'get_anonymous_url') as get_anonymous_url:
+            self.assertEqual(self.client.get(self.preview_url).status_code, 200)
+            get_anonymous_url.assert_not_called()
+
+        self.project.generate_anonymous_access()
+        self.assertEqual(self.client.get(self.preview_url).status_code, 302)
+
+    @override_settings(ANONYMOUS_ACCESS_MAX_ATTEMPTS=2)
+    def test_throttle(self):
+        """
+        Test that repeated attempts are rejected without checking the
+        passphrase.
+        """
+        for _ in range(2):
+            response = self.client.post(self.login_url, data={'passphrase': 'incorrect'})
+            self.assertEqual(response.status_code, 200)
+
+        with mock.patch.object(ActiveProject, 'is_valid_passphrase') as is_valid_passphrase:
+            response = self.client.post(self.login_url, data={'passphrase': self.passphrase})
+            is_valid_passphrase.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+
+        # Other clients are not affected
+        response = self.client.post(self.login_url, data={'passphrase': self.passphrase},
+                                    REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(ANONYMOUS_ACCESS_MAX_ATTEMPTS=2)
+    def test_throttle_forwarded_for(self):
+        """
+        Test that X-Forwarded-For (which clients can set) does not
+        change the throttled address.
+        """
+        for i in range(2):
+            self.client.post(self.login_url, data={'passphrase': 'incorrect'},
+                             HTTP_X_FORWARDED_FOR=f'192.0.2.{i}')
+        response = self.client.post(self.login_url, data={'passphrase': self.passphrase},
+                                    HTTP_X_FORWARDED_FOR='192.0.2.99')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(ANONYMOUS_ACCESS_MAX_URL_ATTEMPTS=2, ANONYMOUS_ACCESS_SLOW_INTERVAL=60)
+    def test_url_throttle(self):
+        """
+        Test that many attempts for a URL slow down each address,
+        without locking out the reviewer.
+        """
+        for i in range(3):
+            self.client.post(self.login_url, data={'passphrase': 'incorrect'}, REMOTE_ADDR=f'192.0.2.{i}')
+
+        # Once the limit is reached, each address can only try once per
+        # interval
+        response = self.client.post(self.login_url, data={'passphrase': 'incorrect'}, REMOTE_ADDR='192.0.2.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        response = self.client.post(self.login_url, data={'passphrase': self.passphrase},
+                                    REMOTE_ADDR='198.51.100.1')
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   HTTP_AUTH_CACHE_TIMEOUT=60)
+class TestHttpAuth(TestCase):
+    """
+    Test HTTP authentication for clients that don't support cookies
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(email='rgmark@mit.edu')
+
+    def _check(self, password):
+        request = RequestFactory().get(
+            '/', secure=True, HTTP_USER_AGENT='Wget/1.18',
+            HTTP_AUTHORIZATION=_basic_auth('rgmark@mit.edu', password))
+        request.session = {}
+        request.user = AnonymousUser()
+        utility.check_http_auth(request)
+        return request.user
+
+    def test_cached_credentials(self):
+        """
+        Test that a password is only verified once.
+        """
+        with mock.patch.object(utility.auth, 'authenticate', wraps=auth.authenticate) as authenticate:
+            self.assertEqual(self._check('Tester11!'), self.user)
+            self.assertEqual(self._check('Tester11!'), self.user)
+            self.assertEqual(authenticate.call_count, 1)
+
+            self.assertFalse(self._check('badpassword').is_authenticated)
+            self.assertFalse(self._check('badpassword').is_authenticated)
+            self.assertEqual(authenticate.call_count, 3)
+
+    def test_password_change(self):
+        """
+        Test that cached credentials are invalid after changing the
+        password.
+        """
+        self.assertEqual(self._check('Tester11!'), self.user)
+        self.user.set_password('Tester12!')
+        self.user.save()
+        self.assertFalse(self._check('Tester11!').is_authenticated)
+        self.assertEqual(self._check('Tester12!'), self.user)
+
+
+class TestSecureLinkRedirect(TestMixin):
+    """
+    Test redirecting directory downloads to signed links
+    """
+
+    @override_settings(MEDIA_X_ACCEL_ALIAS='/protected', SECURE_LINK_SECRET='secret')
+    def test_directory_redirect(self):
+        project = PublishedProject.objects.get(slug='demoeicu')
+        self.client.login(username='rgmark@mit.edu', password='Tester11!')
+        with mock.patch('project.views.can_view_project_files', return_value=True):
+            response = self.client.get(reverse('serve_published_project_file',
+                                               args=(project.slug, project.version, '')))
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(response['Location'].startswith('/signed-files/'))
+            self.assertTrue(response['Location'].endswith(
+                f'/published-projects/{project.slug}/{project.version}/-/'))
+
+            # Individual files are served as before
+            response = self.client.get(reverse('serve_published_project_file',
+                                               args=(project.slug, project.version, 'SHA256SUMS.txt')))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('X-Accel-Redirect', response)
+
+
+class TestFileManifest(TestMixin):
+    """
+    Test listing the files of published projects
+    """
+
+    def _get_manifest(self, project, **params):
+        response = self.client.get(reverse('published_project_file_manifest',
+                                           args=(project.slug, project.version)), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_stored_manifest(self):
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        os.chmod(project.project_file_root(), 0o755)
+        os.chmod(project.file_root(), 0o755)
+        project.make_checksum_file()
+        self.assertTrue(os.path.isfile(project.file_manifest_path()))
+
+        entries = self._get_manifest(project)
+        paths = [entry['path'] for entry in entries]
+        self.assertEqual(paths, sorted(paths))
+        self.assertIn('SHA256SUMS.txt', paths)
+        for entry in entries:
+            file_path = os.path.join(project.file_root(), entry['path'])
+            self.assertEqual(entry['size'], os.path.getsize(file_path))
+            self.assertEqual(entry['mtime'], int(os.path.getmtime(file_path)))
+        with open(os.path.join(project.file_root(), 'SHA256SUMS.txt')) as f:
+            checksums = dict(reversed(line.rstrip('\n').split(' ', 1)) for line in f)
+        for entry in entries:
+            if entry['path'] != 'SHA256SUMS.txt':
+                self.assertEqual(entry['sha256'], checksums[entry['path']])
+
+        self.assertEqual(self._get_manifest(project, prefix='23'),
+                         [entry for entry in entries if entry['path'].startswith('23')])
+        self.assertEqual(self._get_manifest(project, since=project.version), [])
+
+        response = self.client.get(reverse('published_project_file_manifest',
+                                           args=(project.slug, project.version)), {'since': '0.1'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_legacy_manifest(self):
+        """
+        Projects without a stored manifest are listed using
+        SHA256SUMS.txt
+        """
+        project = PublishedProject.objects.get(slug='demoeicu')
+        url = reverse('published_project_file_manifest', args=(project.slug, project.version))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(username='rgmark@mit.edu', password='Tester11!')
+        with mock.patch('project.views.can_view_project_files', return_value=True):
+            entries = self._get_manifest(project)
+        with open(os.path.join(project.file_root(), 'SHA256SUMS.txt')) as f:
+            checksums = sorted(line.rstrip('\n').split(' ', 1)[::-1] for line in f)
+        self.assertEqual([(entry['path'], entry['sha256']) for entry in entries],
+                         [tuple(item) for item in checksums])
+
+    def test_diff_file_manifests(self):
+        def entry(path, sha256, size=1):
+            return {'path': path, 'size': size, 'sha256': sha256, 'mtime': 0}
+
+        old = [entry('a', '1'), entry('b', '2'), entry('c', '3'), entry('e', '5')]
+        new = [entry('b', '2'), entry('c', '4'), entry('d', '5'), entry('e', '5', size=2)]
+        self.assertEqual(list(utility.diff_file_manifests(old, new)), [
+            {'path': 'a', 'status': 'removed'},
+            {**entry('c', '4'), 'status': 'modified'},
+            {**entry('d', '5'), 'status': 'added'},
+            {**entry('e', '5', size=2), 'status': 'modified'},
+        ])
+        self.assertEqual(list(utility.filter_file_manifest(old + new, 'b')), [entry('b', '2')])
+
+
+class TestDeltaDownload(TestMixin):
+    """
+    Test downloading the files that changed between versions
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        os.chmod(self.project.project_file_root(), 0o755)
+        os.chmod(self.project.file_root(), 0o755)
+        self.project.make_checksum_file()
+        self.url = reverse('serve_published_project_delta', args=(self.project.slug, self.project.version))
+        self.old_manifest = [
+            {'path': 'RECORDS', 'size': 0, 'sha256': 'x', 'mtime': 0},
+            {'path': 'obsolete.txt', 'size': 0, 'sha256': 'x', 'mtime': 0},
+        ]
+        self.old_project = mock.Mock(version='0.9')
+        self.old_project.file_manifest.return_value = iter(self.old_manifest)
+        self.new_manifest = list(self.project.file_manifest())
+
+    def test_delta_urls(self):
+        with mock.patch('project.views._get_viewable_versions',
+                        return_value=[self.project, self.old_project]):
+            response = self.client.get(self.url, {'since': '0.9'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        urls = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(urls), len(self.new_manifest))
+        self.assertTrue(urls[0].endswith(reverse(
+            'serve_published_project_file',
+            args=(self.project.slug, self.project.version, self.new_manifest[0]['path']))))
+
+    def test_same_version(self):
+        response = self.client.get(self.url, {'since': self.project.version})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'since': '0.1'}).status_code, 404)
+
+
+class TestFilesPanelPagination(TestMixin):
+    """
+    Test filtering and pagination of files panels
+    """
+
+    def test_published_files_panel(self):
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        url = reverse('published_files_panel', args=(project.slug, project.version))
+        response = self.client.get(url, {'subdir': '', 'v': '2'})
+        self.assertEqual(response.status_code, 200)
+        names = [f.name for f in response.context['display_files']]
+        self.assertGreater(len(names), 2)
+        self.assertNotContains(response, 'Filter files by name')
+
+        with mock.patch('project.views.FILES_PANEL_PAGE_SIZE', 2):
+            response = self.client.get(url, {'subdir': '', 'v': '2', 'page': '2'})
+            self.assertEqual([f.name for f in response.context['display_files']], names[2:4])
+            self.assertContains(response, 'Filter files by name')
+            self.assertContains(response, 'data-dfp-page="1"')
+
+            response = self.client.get(url, {'subdir': '', 'filter': names[0].upper()})
+            self.assertIn(names[0], [f.name for f in response.context['display_files']])
+            self.assertTrue(all(names[0] in f.name for f in response.context['display_files']))
+
+            response = self.client.get(url, {'subdir': '', 'filter': 'no-such-file'})
+            self.assertEqual(len(response.context['display_files']), 0)
+            self.assertContains(response, 'No matching files')
+
+    def test_project_files_panel(self):
+        project = ActiveProject.objects.get(title='MIT-BIH Arrhythmia Database')
+        self.client.login(username='rgmark@mit.edu', password='Tester11!')
+        url = reverse('project_files_panel', args=(project.slug,))
+        with mock.patch('project.views.FILES_PANEL_PAGE_SIZE', 1):
+            response = self.client.get(url, {'subdir': '', 'page': '2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['display_files'].number, 2)
+        self.assertContains(response, "navigateDir('', 1, '')")
+
+
 class TestAccessPublished(TestMixin):
     """
     Test that certain views or content in their various states can only
@@ -843,6 +1254,24 @@ def test_credentialed(self):
             HTTP_AUTHORIZATION=_basic_auth('admin@mit.edu', 'Tester11!'))
         self.assertEqual(response.status_code, 200)
 
+    def test_sign_dua_task_pending(self):
+        """
+        Test that a pending read-write task does not prevent signing
+        the DUA or updating the bucket policy.
+        """
+        project = PublishedProject.objects.get(title='Demo eICU Collaborative Research Database')
+        make_checksum_background(pid=project.id)
+
+        self.client.login(username='rgmark@mit.edu', password='Tester11!')
+        with mock.patch('project.views.has_s3_credentials', return_value=True), \
+                mock.patch('project.views.files_sent_to_S3', return_value='bucket'):
+            response = self.client.post(reverse('sign_dua', args=(project.slug, project.version)),
+                                        data={'agree': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(DUASignature.objects.filter(project=project, user__email='rgmark@mit.edu').exists())
+        self.assertTrue(Task.objects.filter(task_name='console.views.update_aws_bucket_policy',
+                                            task_params=json.dumps([[project.id], {}])).exists())
+
     def test_open(self):
         """
         Test access to an open project.
@@ -947,6 +1376,389 @@ def test_serve_file(self):
             self.assertEqual(response['X-Accel-Redirect'], path + '%C3%80')
 
 
+class TestPublishedSignal(TestMixin):
+    """
+    Test reading WFDB signal envelopes from published projects.
+    """
+
+    def _get(self, slug, version, record, **query):
+        return self.client.get(
+            reverse('published_project_signal', args=(slug, version, record)),
+            query)
+
+    def test_raw_samples(self):
+        """
+        Short intervals return raw samples matching the header.
+        """
+        # Format 212
+        response = self._get('demobsn', '1.0', '231', end=0.01)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['fs'], 360)
+        self.assertEqual(data['step'], 1)
+        self.assertEqual(data['signals'][0]['min'][0], 984)
+        self.assertEqual(data['signals'][1]['min'][0], 1039)
+        self.assertEqual(data['signals'][0]['max'], data['signals'][0]['min'])
+
+        # Format 16 with a byte offset
+        response = self._get('demowave', '1.0.0', 'wave_1', end=0.01)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([s['min'][0] for s in data['signals'][:3]],
+                         [-489, -458, 31])
+
+        # Checksums of the complete record
+        response = self._get('demowave', '1.0.0', 'wave_2', points=10000)
+        data = response.json()
+        self.assertEqual(data['end'], 10000)
+        checksums = [(sum(s['min']) + 32768) % 65536 - 32768
+                     for s in data['signals']]
+        self.assertEqual(checksums, [17532, 2004])
+
+    def test_envelope(self):
+        """
+        Long intervals are reduced to min/max envelopes.
+        """
+        response = self._get('demobsn', '1.0', '231', points=100)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['step'], 6500)
+        for signal in data['signals']:
+            self.assertEqual(len(signal['min']), 100)
+            for low, high in zip(signal['min'], signal['max']):
+                self.assertLessEqual(low, high)
+
+        response = self._get('demobsn', '1.0', '231', points=100,
+                             start=60, end=120, format='binary')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-WFDB-Start'], '21600')
+        self.assertEqual(response['X-WFDB-Step'], '216')
+        self.assertEqual(len(response.content), 2 * 2 * 100 * 2)
+
+    def test_pyramid(self):
+        """
+        Envelopes computed from a signal pyramid match the raw data.
+        """
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        project.make_signal_pyramids()
+        self.assertTrue(os.path.isfile(project.signal_pyramid_path('231')))
+        self.assertFalse(os.path.exists(
+            os.path.join(project.file_root(), 'signal-pyramids')))
+
+        header, readers = wfdb.open_record(
+            project.files, os.path.join(project.file_root(), '231'))
+        try:
+            for query, start, end, step in (
+                ({'points': 100}, 0, 650000, 8192),
+                ({'points': 100, 'start': 60, 'end': 120}, 21600, 43200, 224),
+            ):
+                data = self._get('demobsn', '1.0', '231', **query).json()
+                self.assertEqual((data['start'], data['end'], data['step']),
+                                 (start, end, step))
+                expected = wfdb.compute_envelope(header, readers, start, end, step)
+                self.assertEqual([(s['min'], s['max']) for s in data['signals']],
+                                 [(mins, maxs) for mins, maxs in expected])
+        finally:
+            wfdb.close_record(readers)
+
+        project.remove_signal_pyramids()
+        data = self._get('demobsn', '1.0', '231', points=100).json()
+        self.assertEqual(data['step'], 6500)
+
+    def test_truncated_record(self):
+        """
+        Frames missing from the end of a signal file are treated as
+        missing samples.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, 'trunc.hea'), 'w') as f:
+                f.write('trunc 2 100 5000\n'
+                        'a.dat 16 200 16 0 0 0 0 A\n'
+                        'b.dat 16 200 16 0 0 0 0 B\n')
+            with open(os.path.join(tmp_dir, 'a.dat'), 'wb') as f:
+                f.write(array('h', range(5000)).tobytes())
+            with open(os.path.join(tmp_dir, 'b.dat'), 'wb') as f:
+                f.write(array('h', range(3000)).tobytes())
+
+            files = LocalProjectFiles()
+            header, readers = wfdb.open_record(files, os.path.join(tmp_dir, 'trunc'))
+            try:
+                (a_min, a_max), (b_min, b_max) = wfdb.compute_envelope(header, readers, 0, 5000, 1000)
+                self.assertEqual(a_min, [0, 1000, 2000, 3000, 4000])
+                self.assertEqual(b_min, [0, 1000, 2000, None, None])
+                self.assertEqual(b_max, [999, 1999, 2999, None, None])
+
+                path = os.path.join(tmp_dir, 'trunc.pyr')
+                wfdb.write_pyramid(header, readers, path)
+                with wfdb.SignalPyramid(path) as pyramid:
+                    self.assertTrue(pyramid.matches(header))
+                    for (step, end) in ((16, 5000), (256, 5000), (4096, 5000), (4096, 4096)):
+                        self.assertEqual(pyramid.envelope(0, end, step),
+                                         wfdb.compute_envelope(header, readers, 0, end, step))
+            finally:
+                wfdb.close_record(readers)
+
+    @prevent_request_warnings
+    def test_errors(self):
+        response = self._get('demobsn', '1.0', 'fnord')
+        self.assertEqual(response.status_code, 404)
+        response = self._get('demobsn', '1.0', '231', points='x')
+        self.assertEqual(response.status_code, 400)
+        response = self._get('demobsn', '1.0', '../1.0/231')
+        self.assertEqual(response.status_code, 400)
+        response = self._get('demobsn', '1.0', 'RECORDS')
+        self.assertEqual(response.status_code, 404)
+
+        # Credentialed project
+        response = self._get('demoeicu', '2.0.0', 'foo')
+        self.assertEqual(response.status_code, 403)
+
+
+class TestFileView(TestMixin):
+    """
+    Test displaying file contents in the browser.
+    """
+
+    def test_encoding(self):
+        """
+        Text and CSV files are decoded as UTF-8 or a guessed encoding.
+        """
+        project = ActiveProject.objects.get(title='MIMIC-III Clinical Database')
+        self.client.login(username='rgmark@mit.edu', password='Tester11!')
+
+        files = {
+            'notes/utf8.csv': 'name,city\nJos\u00e9,M\u00fcnchen\n'.encode(),
+            'notes/latin1.csv': b'name,city\nJos\xe9,M\xfcnchen\n',
+            'notes/latin1.txt': b'abcdefg\n' * 20000 + b'Jos\xe9, M\xfcnchen\n',
+        }
+        for name, content in files.items():
+            with open(os.path.join(project.file_root(), name), 'wb') as f:
+                f.write(content)
+            response = self.client.get(reverse('display_active_project_file',
+                                               args=(project.slug, name)))
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'Jos\u00e9')
+            self.assertContains(response, 'M\u00fcnchen')
+
+
+class TestPublishedFileRows(TestMixin):
+    """
+    Test reading pages of rows from CSV files in published projects.
+    """
+
+    def _get(self, slug, version, path, **query):
+        return self.client.get(
+            reverse('published_project_file_rows', args=(slug, version, path)),
+            query)
+
+    def test_rows(self):
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        content = b'id,square\n' + b''.join(b'%d,%d\n' % (i, i * i) for i in range(1, 100000))
+        with open(os.path.join(project.file_root(), 'squares.csv'), 'wb') as f:
+            f.write(content)
+        with gzip.open(os.path.join(project.file_root(), 'squares.csv.gz'), 'wb') as f:
+            f.write(content)
+
+        for name in ('squares.csv', 'squares.csv.gz'):
+            response = self._get('demobsn', '1.0', name, start=54321, count=2)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(data['header'], ['id', 'square'])
+            self.assertEqual(data['start'], 54321)
+            self.assertEqual(data['rows'], [['54321', str(54321 ** 2)],
+                                            ['54322', str(54322 ** 2)]])
+            self.assertIsNone(data['total_rows'])
+            self.assertTrue(os.path.isfile(project.preview_index_path(name)))
+
+            data = self._get('demobsn', '1.0', name, start=99998).json()
+            self.assertEqual(data['rows'], [['99998', str(99998 ** 2)],
+                                            ['99999', str(99999 ** 2)]])
+            self.assertEqual(data['total_rows'], 100000)
+
+            data = self._get('demobsn', '1.0', name, start=10).json()
+            self.assertEqual(data['rows'][0], ['10', '100'])
+            self.assertEqual(len(data['rows']), 100)
+
+            data = self._get('demobsn', '1.0', name, start=200000).json()
+            self.assertEqual((data['start'], data['rows']), (100000, []))
+
+    def test_scan_limit(self):
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        content = b''.join(b'%d\n' % i for i in range(400000))
+        with open(os.path.join(project.file_root(), 'numbers.csv'), 'wb') as f:
+            f.write(content)
+        with gzip.open(os.path.join(project.file_root(), 'numbers.csv.gz'), 'wb') as f:
+            f.write(content)
+
+        for name in ('numbers.csv', 'numbers.csv.gz'):
+            with mock.patch('project.views.MAX_SCAN_BYTES', 900000), \
+                    mock.patch('project.fileviews.csv.MAX_SCAN_BYTES', 900000), \
+                    mock.patch('project.rowindex.CHECKPOINT_SPACING', 100000):
+                # Rows beyond the limit are not available...
+                response = self._get('demobsn', '1.0', name, start=300000, count=1)
+                self.assertEqual(response.status_code, 416)
+                self.assertGreater(response.json()['indexed_rows'], 0)
+
+                # ...until earlier requests have indexed the file
+                # further
+                for _ in range(10):
+                    response = self._get('demobsn', '1.0', name, start=300000, count=1)
+                    if response.status_code == 200:
+                        break
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['rows'], [['300000']])
+
+    @prevent_request_warnings
+    def test_errors(self):
+        response = self._get('demobsn', '1.0', 'fnord.csv')
+        self.assertEqual(response.status_code, 404)
+        response = self._get('demobsn', '1.0', 'RECORDS')
+        self.assertEqual(response.status_code, 400)
+        response = self._get('demobsn', '1.0', 'fnord.csv', start=-1)
+        self.assertEqual(response.status_code, 400)
+
+        # Credentialed project
+        response = self._get('demoeicu', '2.0.0', 'patient.csv')
+        self.assertEqual(response.status_code, 403)
+
+
+class TestParquetFile(TestMixin):
+    """
+    Test displaying Parquet files and their column statistics.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        shutil.copy(os.path.join(os.path.dirname(__file__), 'testdata', 'example.parquet'),
+                    self.project.file_root())
+
+    def test_display(self):
+        response = self.client.get(reverse('display_published_project_file',
+                                           args=('demobsn', '1.0', 'example.parquet')))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Parquet file with 50 rows')
+        self.assertContains(response, '<td>subject-001</td>', html=True)
+        self.assertContains(response, '<td>2020-01-01T00:00:01</td>', html=True)
+
+    def test_columns(self):
+        response = self.client.get(reverse('published_project_file_columns',
+                                           args=('demobsn', '1.0', 'example.parquet')))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['num_rows'], data['num_row_groups']), (50, 2))
+        columns = {c['name']: c for c in data['columns']}
+        self.assertEqual(list(columns), ['id', 'name', 'value', 'flag', 'day', 'ts', 'price'])
+        self.assertEqual((columns['id']['min'], columns['id']['max']), (0, 49))
+        self.assertEqual(columns['name']['type'], 'BYTE_ARRAY (STRING)')
+        self.assertEqual(columns['name']['null_count'], 8)
+        self.assertEqual(columns['name']['max'], 'subject-019')
+        self.assertEqual((columns['day']['min'], columns['day']['max']), ('2020-01-01', '2020-02-19'))
+        self.assertEqual(columns['ts']['max'], '2020-01-01T00:00:49')
+        self.assertEqual((columns['price']['min'], columns['price']['max']), ('0.00', '0.49'))
+
+    @prevent_request_warnings
+    def test_errors(self):
+        for path, status in (('fnord.parquet', 404), ('RECORDS', 400), ('../1.0/RECORDS', 400)):
+            response = self.client.get(reverse('published_project_file_columns',
+                                               args=('demobsn', '1.0', path)))
+            self.assertEqual(response.status_code, status)
+        response = self.client.get(reverse('published_project_file_columns',
+                                           args=('demoeicu', '2.0.0', 'example.parquet')))
+        self.assertEqual(response.status_code, 403)
+
+        # Metadata fields of the wrong type
+        footer = b'\x65\x02\x00'
+        with open(os.path.join(self.project.file_root(), 'bad.parquet'), 'wb') as f:
+            f.write(parquet.MAGIC + footer + len(footer).to_bytes(4, 'little') + parquet.MAGIC)
+        response = self.client.get(reverse('published_project_file_columns',
+                                           args=('demobsn', '1.0', 'bad.parquet')))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('display_published_project_file',
+                                           args=('demobsn', '1.0', 'bad.parquet')))
+        self.assertEqual(response.status_code, 200)
+
+    def test_corrupt_data(self):
+        """
+        Test that corrupt files only cause ParquetError.
+        """
+        with open(os.path.join(self.project.file_root(), 'example.parquet'), 'rb') as f:
+            original = f.read()
+        for pos in range(4, len(original) - 8, 7):
+            for value in (0x00, 0x7f, 0xff):
+                data = bytearray(original)
+                data[pos] = value
+                file = io.BytesIO(data)
+                try:
+                    metadata = parquet.read_metadata(file, len(data))
+                    parquet.column_statistics(metadata)
+                    parquet.read_sample(file, metadata)
+                except parquet.ParquetError:
+                    pass
+
+
+class TestAccessLog(TestMixin):
+    """
+    Test buffered recording of access logs.
+    """
+
+    def test_buffer(self):
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        user = User.objects.get(username='rgmark')
+        other = User.objects.get(username='aewj')
+        buffer = LogBuffer(AccessLog, LogCategory.ACCESS)
+        now = timezone.now()
+
+        for minutes in (40, 39, 38, 5):
+            buffer.add(project, user, when=now - timedelta(minutes=minutes))
+        buffer.add(project, other, when=now - timedelta(minutes=20))
+        self.assertFalse(AccessLog.objects.exists())
+        with self.assertNumQueries(4):
+            buffer.flush()
+        logs = AccessLog.objects.order_by('creation_datetime')
+        self.assertEqual(list(logs.values_list('user__username', 'count')),
+                         [('rgmark', 3), ('aewj', 1), ('rgmark', 1)])
+
+        # Later events extend the latest existing entry
+        buffer.add(project, user)
+        buffer.add(project, user)
+        buffer.flush()
+        self.assertEqual(list(logs.values_list('user__username', 'count')),
+                         [('rgmark', 3), ('aewj', 1), ('rgmark', 3)])
+        with self.assertNumQueries(0):
+            buffer.flush()
+
+    def test_view(self):
+        self.client.login(username='rgmark@mit.edu', password='Tester11!')
+        for _ in range(3):
+            response = self.client.get(reverse('published_project', args=('demobsn', '1.0')))
+            self.assertEqual(response.status_code, 200)
+        log = AccessLog.objects.get()
+        self.assertEqual((log.user.username, log.project.slug, log.count), ('rgmark', 'demobsn', 3))
+
+    @override_settings(LOG_FLUSH_INTERVAL=30, LOG_FLUSH_MAX_ENTRIES=3)
+    def test_flush_after_request(self):
+        project = PublishedProject.objects.get(slug='demobsn', version='1.0')
+        buffer = LogBuffer.get(AccessLog, LogCategory.ACCESS)
+        self.addCleanup(buffer.flush)
+        self.client.login(username='rgmark@mit.edu', password='Tester11!')
+        response = self.client.get(reverse('published_project', args=('demobsn', '1.0')))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AccessLog.objects.exists())
+
+        # Events are written after a response once they are old enough
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 30):
+            self.client.get(reverse('published_project', args=('demobsn', '1.0')))
+        self.assertEqual(AccessLog.objects.get().count, 2)
+
+        # ...or during a request once the buffer is full
+        for user in User.objects.exclude(username='rgmark')[:3]:
+            buffer.add(project, user)
+        self.assertEqual(AccessLog.objects.count(), 1)
+        self.client.get(reverse('published_project', args=('demobsn', '1.0')))
+        self.assertEqual(AccessLog.objects.count(), 4)
+
+
 class TestState(TestMixin):
     """
     Test that all objects are in their intended states, during and
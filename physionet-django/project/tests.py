@@ -1,10 +1,15 @@
 import doctest
 
-from project import utility
+from project import parquet, rowindex, utility, wfdb
+from project.fileviews import text
 
 # Automatically run documentation tests in these modules.
 DOCTEST_MODULES = [
+    parquet,
+    rowindex,
+    text,
     utility,
+    wfdb,
 ]
 
 DOCTEST_FLAGS = doctest.REPORT_NDIFF
@@ -1,6 +1,8 @@
 import base64
+import collections
 import datetime
 import errno
+import functools
 import html.parser
 import json
 import logging
@@ -8,6 +10,8 @@
 import pdb
 import re
 import shutil
+import threading
+import time
 import urllib.parse
 import uuid
 
@@ -16,14 +20,25 @@
 from django.conf import settings
 from django.contrib import auth, messages
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.http import Http404, HttpResponse
-from django.utils.crypto import constant_time_compare
+from django.utils.crypto import constant_time_compare, salted_hmac
 from googleapiclient.errors import HttpError
 
 
 LOGGER = logging.getLogger(__name__)
 
+# Maximum total number of entries in the directory listings cached by
+# scan_directory (in each process)
+DIRECTORY_CACHE_ENTRIES = 200000
+
+# Maximum age, in seconds, of a cached listing of a directory that may
+# change.  (Modifying a file's content doesn't change the directory's
+# modification time.)
+DIRECTORY_CACHE_MAX_AGE = 60
+
+
 class FileInfo():
     """
     For displaying lists of files in project pages
@@ -38,6 +53,43 @@ def __lt__(self, other):
         return self.name < other.name
 
 
+class LocalFileInfo(FileInfo):
+    """
+    FileInfo for a file listed by scan_directory.
+
+    The display strings and URLs are only computed when they are used,
+    so that listing a large directory is cheap if only some of the
+    files are displayed.
+    """
+    def __init__(self, name, size, mtime, subdir, file_display_url, file_url):
+        self.name = name
+        self._size = size
+        self._mtime = mtime
+        self._subdir = subdir
+        self._file_display_url = file_display_url
+        self._file_url = file_url
+
+    @functools.cached_property
+    def size(self):
+        return readable_size(self._size)
+
+    @functools.cached_property
+    def last_modified(self):
+        return datetime.date.fromtimestamp(self._mtime).strftime("%Y-%m-%d")
+
+    @functools.cached_property
+    def url(self):
+        return self._file_display_url(subdir=self._subdir, file=self.name)
+
+    @functools.cached_property
+    def raw_url(self):
+        return self._file_url(subdir=self._subdir, file=self.name)
+
+    @functools.cached_property
+    def download_url(self):
+        return self.raw_url + '?download'
+
+
 class DirectoryInfo():
     def __init__(self, name):
         self.name = name
@@ -148,6 +200,88 @@ def list_items(directory, return_separate=True):
     else:
         return sorted(os.listdir(directory))
 
+
+_directory_cache = collections.OrderedDict()
+_directory_cache_entries = 0
+_directory_cache_lock = threading.Lock()
+
+
+def scan_directory(path, immutable=False):
+    """
+    List the files and subdirectories in a directory.
+
+    Returns a list of (name, size, modification time) tuples for the
+    files, and a list of names of the subdirectories, each sorted by
+    name.  Each file is only stat'ed once.
+
+    Listings are cached in each process, for the most recently used
+    directories (up to DIRECTORY_CACHE_ENTRIES entries in total), and
+    reused as long as the directory's inode number, size and
+    modification time are unchanged (see also forget_directory.)
+    Unless `immutable` is true, a cached listing is also discarded
+    after DIRECTORY_CACHE_MAX_AGE seconds.
+    """
+    global _directory_cache_entries
+
+    path = os.path.normpath(path)
+    # The modification time alone may not change if the directory is
+    # modified twice within the filesystem's timestamp resolution, or
+    # if it is replaced by another directory
+    st = os.stat(path)
+    version = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    now = time.monotonic()
+    with _directory_cache_lock:
+        cached = _directory_cache.get(path)
+        if cached is not None:
+            cached_version, loaded, listing = cached
+            if cached_version == version and (immutable or now - loaded < DIRECTORY_CACHE_MAX_AGE):
+                _directory_cache.move_to_end(path)
+                return listing
+
+    files, dirs = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                else:
+                    info = entry.stat()
+                    files.append((entry.name, info.st_size, info.st_mtime))
+            except FileNotFoundError:
+                continue
+    files.sort()
+    dirs.sort()
+    listing = (files, dirs)
+
+    size = len(files) + len(dirs)
+    if size <= DIRECTORY_CACHE_ENTRIES:
+        with _directory_cache_lock:
+            old = _directory_cache.pop(path, None)
+            if old is not None:
+                _directory_cache_entries -= len(old[2][0]) + len(old[2][1])
+            _directory_cache[path] = (version, now, listing)
+            _directory_cache_entries += size
+            while _directory_cache_entries > DIRECTORY_CACHE_ENTRIES:
+                _, (_, _, (old_files, old_dirs)) = _directory_cache.popitem(last=False)
+                _directory_cache_entries -= len(old_files) + len(old_dirs)
+    return listing
+
+
+def forget_directory(path):
+    """
+    Discard the cached listing of a directory (see scan_directory.)
+
+    This should be called after modifying the directory or the files
+    in it.
+    """
+    global _directory_cache_entries
+
+    with _directory_cache_lock:
+        old = _directory_cache.pop(os.path.normpath(path), None)
+        if old is not None:
+            _directory_cache_entries -= len(old[2][0]) + len(old[2][1])
+
+
 def remove_items(items, ignore_missing=True):
     """
     Delete the list of (full file path) files/directories.
@@ -221,6 +355,60 @@ def get_tree_size(path):
     return total
 
 
+def file_manifest_entry(directory, path, sha256):
+    """
+    Describe a file for a project's file manifest.
+
+    The result is a dictionary with the keys 'path' (relative to
+    `directory`), 'size', 'sha256' and 'mtime' (in whole seconds since
+    the Unix epoch.)
+    """
+    st = os.stat(os.path.join(directory, path))
+    return {'path': path, 'size': st.st_size, 'sha256': sha256, 'mtime': int(st.st_mtime)}
+
+
+def filter_file_manifest(entries, prefix):
+    """
+    Select the entries of a file manifest whose path begins with
+    `prefix`.
+
+    Entries must be sorted by path, so that matching entries are
+    contiguous and the remaining entries need not be read.
+    """
+    for entry in entries:
+        if entry['path'].startswith(prefix):
+            yield entry
+        elif entry['path'] > prefix:
+            break
+
+
+def diff_file_manifests(old_entries, new_entries):
+    """
+    Compare two file manifests, both sorted by path.
+
+    Entries for files that are new or whose contents have changed are
+    yielded with an additional 'status' of 'added' or 'modified'.
+    Files that no longer exist are listed as {'path': ...,
+    'status': 'removed'}.  Unchanged files are omitted.
+    """
+    old_entries = iter(old_entries)
+    new_entries = iter(new_entries)
+    old = next(old_entries, None)
+    new = next(new_entries, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old['path'] < new['path']):
+            yield {'path': old['path'], 'status': 'removed'}
+            old = next(old_entries, None)
+        elif old is None or new['path'] < old['path']:
+            yield {**new, 'status': 'added'}
+            new = next(new_entries, None)
+        else:
+            if old['sha256'] != new['sha256'] or old['size'] != new['size']:
+                yield {**new, 'status': 'modified'}
+            old = next(old_entries, None)
+            new = next(new_entries, None)
+
+
 def readable_size(num, suffix='B'):
     "Display human readable size of byte number"
     for unit in ['','K','M','G','T','P','E','Z']:
@@ -412,6 +600,18 @@ def http_auth_allowed(request):
         return False
 
 
+def _http_auth_cache_key(authorization):
+    """
+    Return the cache key for a verified Authorization header.
+
+    The key is an HMAC of the header, so neither the cache key nor the
+    cache contents reveal the password.
+    """
+    digest = salted_hmac('project.utility.check_http_auth', authorization,
+                         algorithm='sha256').hexdigest()
+    return 'project.httpauth:' + digest
+
+
 def check_http_auth(request):
     """
     Check if a request includes HTTP authentication.
@@ -424,6 +624,12 @@ def check_http_auth(request):
     For safety, HTTP authentication is only used for certain requests
     from non-interactive user agents; see http_auth_allowed().
 
+    Verifying a password is deliberately slow.  Clients that don't
+    support cookies send the same credentials with every request, so
+    valid credentials are remembered in the cache for
+    settings.HTTP_AUTH_CACHE_TIMEOUT seconds, or until the user's
+    password changes.
+
     This should be invoked at the start of the view before checking
     user credentials, and should be paired with require_http_auth().
     """
@@ -453,7 +659,24 @@ def check_http_auth(request):
                 request.user = user
                 return
 
-        tokens = request.META['HTTP_AUTHORIZATION'].split()
+        authorization = request.META['HTTP_AUTHORIZATION']
+        timeout = settings.HTTP_AUTH_CACHE_TIMEOUT
+        if timeout:
+            cache_key = _http_auth_cache_key(authorization)
+            try:
+                uid, authhash = cache.get(cache_key)
+                user = User.objects.get(id=uid)
+            except (TypeError, User.DoesNotExist):
+                pass
+            else:
+                # As above, the cached credentials are valid only if
+                # the password has not changed.
+                if constant_time_compare(user.get_session_auth_hash(),
+                                         authhash) and user.is_active:
+                    request.user = user
+                    return
+
+        tokens = authorization.split()
         if len(tokens) == 2 and tokens[0].lower() == 'basic':
             try:
                 data = base64.b64decode(tokens[1], validate=True).decode()
@@ -466,6 +689,9 @@ def check_http_auth(request):
                                      password=password)
             if user and user.is_active:
                 request.user = user
+                if timeout:
+                    cache.set(cache_key, (user.id, user.get_session_auth_hash()),
+                              timeout)
 
                 # If the client supports cookies, save the state so
                 # that we don't have to verify the password on
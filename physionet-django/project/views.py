@@ -1,6 +1,9 @@
 import datetime as dt
+import json
 import logging
 import os
+import sys
+from array import array
 
 import notification.utility as notification
 from dal import autocomplete
@@ -12,10 +15,11 @@
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError
+from django.core.paginator import Page, Paginator
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.forms import inlineformset_factory, modelformset_factory
-from django.http import Http404, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template import loader
 from django.urls import reverse
@@ -24,9 +28,10 @@
 from physionet.forms import set_saved_fields_cookie
 from physionet.middleware.maintenance import ServiceUnavailable
 from physionet.storage import generate_signed_url_helper
-from physionet.utility import serve_file
-from project import forms, utility
+from physionet.utility import secure_link_url, serve_file
+from project import forms, parquet, rowindex, utility, wfdb
 from project.fileviews import display_project_file
+from project.fileviews.csv import MAX_SCAN_BYTES, read_rows
 from project.models import (
     AccessPolicy,
     AccessLog,
@@ -50,9 +55,16 @@
     Topic,
     UploadedDocument,
 )
-from project.authorization.access import can_view_project_files, can_access_project
+from project.authorization.access import (
+    ANONYMOUS_ACCESS_COOKIE,
+    ANONYMOUS_ACCESS_MAX_AGE,
+    anonymous_login_throttled,
+    can_access_project,
+    can_view_project_files,
+    has_anonymous_access,
+)
 from project.projectfiles import ProjectFiles
-from project.validators import validate_filename, validate_gcs_bucket_object
+from project.validators import validate_filename, validate_gcs_bucket_object, validate_subdir
 from user.forms import AssociatedEmailChoiceForm
 from user.models import AssociatedEmail, CloudInformation, CredentialApplication, LegacyCredential, Training
 from project.cloud.s3 import (
@@ -63,6 +75,9 @@
 
 LOGGER = logging.getLogger(__name__)
 
+# Maximum number of files shown on one page of a files panel
+FILES_PANEL_PAGE_SIZE = 1000
+
 
 def project_auth(auth_mode=0, post_auth_mode=0):
     """
@@ -82,19 +97,26 @@ def project_auth(auth_mode=0, post_auth_mode=0):
           its author editable stages.
     - 2 : the user must be the submitting author, and the project must
           be in one of its author editable stages.
+
+    The project is loaded together with its authors (and their users
+    and profiles).  The view receives
+    `authors` (ordered by display order), `author` (the user's Author
+    object, or None) and `submitting_author`, so it does not need to
+    query the authors again.
     """
     def real_decorator(base_view):
         def view_wrapper(request, *args, **kwargs):
             # Verify project
             try:
-                project = ActiveProject.objects.get(
-                    slug=kwargs['project_slug'])
+                project = ActiveProject.objects.prefetch_related(
+                    Prefetch('authors', queryset=Author.objects.select_related(
+                        'user__profile').order_by('display_order')),
+                ).get(slug=kwargs['project_slug'])
             except ObjectDoesNotExist:
                 raise PermissionDenied()
 
             # Authenticate passphrase for anonymous access
-            an_url = request.get_signed_cookie('anonymousaccess', None, max_age=60*60)
-            has_passphrase = project.get_anonymous_url() == an_url
+            has_passphrase = has_anonymous_access(request, project)
 
             # Get user
             user = request.user
@@ -104,9 +126,16 @@ def view_wrapper(request, *args, **kwargs):
                 return redirect_to_login(request.get_full_path())
 
             # Verify user's role in project
-            authors = project.authors.all().order_by('display_order')
-            is_author = not user.is_anonymous and bool(authors.filter(user=user))
-            is_submitting = (user == authors.get(is_submitting=True).user)
+            authors = project.authors.all()
+            author = None
+            submitting_author = None
+            for a in authors:
+                if user.is_authenticated and a.user_id == user.id:
+                    author = a
+                if a.is_submitting:
+                    submitting_author = a
+            is_author = author is not None
+            is_submitting = is_author and author == submitting_author
 
             # Authentication
             if auth_mode == 0:
@@ -139,6 +168,8 @@ def view_wrapper(request, *args, **kwargs):
                 kwargs['user'] = user
                 kwargs['project'] = project
                 kwargs['authors'] = authors
+                kwargs['author'] = author
+                kwargs['submitting_author'] = submitting_author
                 kwargs['is_author'] = is_author
                 kwargs['is_submitting'] = is_submitting
                 kwargs['has_passphrase'] = has_passphrase
@@ -409,7 +440,7 @@ def project_overview(request, project_slug, **kwargs):
     return render(request, 'project/project_overview.html',
         {'project':project, 'is_submitting':is_submitting,
          'under_submission':under_submission,
-         'submitting_author':kwargs['authors'].get(is_submitting=True)})
+         'submitting_author':kwargs['submitting_author']})
 
 
 @login_required
@@ -519,8 +550,7 @@ def edit_affiliation(request, project_slug, **kwargs):
     rendered template of the formset.
 
     """
-    project, authors = kwargs['project'], kwargs['authors']
-    author = authors.get(user=request.user)
+    project, author = kwargs['project'], kwargs['author']
 
     if project.submission_status not in [SubmissionStatus.UNSUBMITTED, SubmissionStatus.NEEDS_RESUBMISSION]:
         raise Http404()
@@ -559,10 +589,9 @@ def project_authors(request, project_slug, **kwargs):
     """
     Page displaying author information and actions.
     """
-    user, project, authors, is_submitting, = (kwargs[k] for k in
-        ('user', 'project', 'authors', 'is_submitting'))
+    user, project, authors, author, is_submitting, = (kwargs[k] for k in
+        ('user', 'project', 'authors', 'author', 'is_submitting'))
 
-    author = authors.get(user=user)
     AffiliationFormSet = inlineformset_factory(parent_model=Author,
         model=Affiliation, fields=('name',), extra=0,
         max_num=forms.AffiliationFormSet.max_forms, can_delete=False,
@@ -909,11 +938,16 @@ def get_file_forms(project, subdir, display_dirs):
     return (upload_files_form, create_folder_form, rename_item_form,
             move_items_form, delete_items_form)
 
-def get_project_file_info(project, subdir):
+def get_project_file_info(project, subdir, request=None):
     """
     Get the files, directories, and breadcrumb info for a project's
     subdirectory.
     Helper function for generating the files panel
+
+    If request is given, the files are filtered by its 'filter' query
+    parameter (part of the file name, ignoring case) and divided into
+    pages of FILES_PANEL_PAGE_SIZE according to its 'page' query
+    parameter.  display_files is then a Page.
     """
     display_files = display_dirs = ()
     try:
@@ -925,6 +959,12 @@ def get_project_file_info(project, subdir):
     except OSError:
         file_error = 'Unable to read directory'
 
+    if request is not None:
+        name_filter = request.GET.get('filter', '').strip().lower()
+        if name_filter:
+            display_files = [f for f in display_files if name_filter in f.name.lower()]
+        display_files = Paginator(display_files, FILES_PANEL_PAGE_SIZE).get_page(request.GET.get('page'))
+
     # Breadcrumbs
     dir_breadcrumbs = utility.get_dir_breadcrumbs(subdir)
     parent_dir = os.path.split(subdir)[0]
@@ -936,6 +976,8 @@ def get_project_file_warning(display_files, display_dirs, subdir):
     """
     Check for invalid or otherwise problematic file names.
     """
+    if isinstance(display_files, Page):
+        display_files = display_files.paginator.object_list
     lower_names = {}
     bad_names = []
     case_conflicts = []
@@ -997,7 +1039,7 @@ def project_files_panel(request, project_slug, **kwargs):
         files_editable = False
 
     (display_files, display_dirs, dir_breadcrumbs, parent_dir,
-     file_error) = get_project_file_info(project=project, subdir=subdir)
+     file_error) = get_project_file_info(project=project, subdir=subdir, request=request)
     file_warning = get_project_file_warning(display_files, display_dirs,
                                               subdir)
 
@@ -1137,7 +1179,7 @@ def project_files(request, project_slug, subdir='', **kwargs):
     )
 
     (display_files, display_dirs, dir_breadcrumbs, parent_dir,
-     file_error) = get_project_file_info(project=project, subdir=subdir)
+     file_error) = get_project_file_info(project=project, subdir=subdir, request=request)
     file_warning = get_project_file_warning(display_files, display_dirs, subdir)
 
     (upload_files_form, create_folder_form, rename_item_form,
@@ -1221,7 +1263,7 @@ def preview_files_panel(request, project_slug, **kwargs):
         raise Http404()
 
     (display_files, display_dirs, dir_breadcrumbs, parent_dir,
-     file_error) = get_project_file_info(project=project, subdir=subdir)
+     file_error) = get_project_file_info(project=project, subdir=subdir, request=request)
     files_panel_url = reverse('preview_files_panel', args=(project.slug,))
     file_warning = get_project_file_warning(display_files, display_dirs,
                                               subdir)
@@ -1269,7 +1311,7 @@ def project_preview(request, project_slug, subdir='', **kwargs):
             messages.error(request, e)
 
     (display_files, display_dirs, dir_breadcrumbs, parent_dir,
-     file_error) = get_project_file_info(project=project, subdir=subdir)
+     file_error) = get_project_file_info(project=project, subdir=subdir, request=request)
     files_panel_url = reverse('preview_files_panel', args=(project.slug,))
     file_warning = get_project_file_warning(display_files, display_dirs, subdir)
 
@@ -1402,7 +1444,7 @@ def project_submission(request, project_slug, **kwargs):
                 messages.success(request, 'Your project has been resubmitted. You will be notified when the editor makes their decision.')
         # Author approves publication
         elif 'approve_publication' in request.POST:
-            author = authors.get(user=user)
+            author = kwargs['author']
             if (request.POST and author.is_submitting and
                 request.POST['approve_publication'].isnumeric()):
                 try:
@@ -1659,12 +1701,11 @@ def published_files_panel(request, project_slug, version):
     user = request.user
 
     # Anonymous access authentication
-    an_url = request.get_signed_cookie('anonymousaccess', None, max_age=60*60)
-    has_passphrase = project.get_anonymous_url() == an_url
+    has_passphrase = has_anonymous_access(request, project)
 
     if can_view_project_files(project, user) or has_passphrase:
         (display_files, display_dirs, dir_breadcrumbs, parent_dir,
-         file_error) = get_project_file_info(project=project, subdir=subdir)
+         file_error) = get_project_file_info(project=project, subdir=subdir, request=request)
 
         files_panel_url = reverse('published_files_panel',
             args=(project.slug, project.version))
@@ -1726,11 +1767,18 @@ def serve_published_project_file(request, project_slug, version,
     user = request.user
 
     # Anonymous access authentication
-    an_url = request.get_signed_cookie('anonymousaccess', None, max_age=60*60)
-    has_passphrase = project.get_anonymous_url() == an_url
+    has_passphrase = has_anonymous_access(request, project)
 
     if can_view_project_files(project, user) or has_passphrase:
         file_path = os.path.join(project.file_root(), full_file_name)
+
+        # Let nginx serve the directory and its contents, so that
+        # recursive downloads don't need to come back here
+        if file_path.endswith('/'):
+            signed_url = secure_link_url(file_path, user.id or 0)
+            if signed_url:
+                return redirect(signed_url)
+
         try:
             attach = ('download' in request.GET)
 
@@ -1754,6 +1802,88 @@ def serve_published_project_file(request, project_slug, version,
     return utility.require_http_auth(request)
 
 
+def _get_viewable_versions(request, project_slug, *versions):
+    """
+    Get the given versions of a published project, if the user may
+    view the files of all of them; otherwise return None.
+
+    Raises Http404 if any of the versions does not exist.
+    """
+    projects = []
+    for version in versions:
+        try:
+            project = PublishedProject.objects.get(slug=project_slug, version=version)
+        except ObjectDoesNotExist:
+            raise Http404()
+        if not (can_view_project_files(project, request.user) or has_anonymous_access(request, project)):
+            return None
+        projects.append(project)
+    return projects
+
+
+def published_project_file_manifest(request, project_slug, version):
+    """
+    List the files of a published project, one JSON object per line.
+
+    Each line gives the 'path', 'size', 'sha256' and 'mtime' of a
+    file, in order of path, taken from the manifest stored when the
+    project was published.  Query parameters:
+
+    - prefix: only list files whose path begins with this string.
+    - since: another version of the project; only list files that
+      differ from that version, with a 'status' of 'added',
+      'modified' or 'removed'.
+    """
+    utility.check_http_auth(request)
+    since = request.GET.get('since')
+    projects = _get_viewable_versions(request, project_slug, version, *([since] if since else []))
+    if projects is None:
+        return utility.require_http_auth(request)
+
+    prefix = request.GET.get('prefix', '')
+    try:
+        entries = utility.filter_file_manifest(projects[0].file_manifest(), prefix)
+        if since:
+            old_entries = utility.filter_file_manifest(projects[1].file_manifest(), prefix)
+            entries = utility.diff_file_manifests(old_entries, entries)
+    except FileNotFoundError:
+        raise Http404()
+
+    return StreamingHttpResponse((json.dumps(entry) + '\n' for entry in entries),
+                                 content_type='application/x-ndjson')
+
+
+def serve_published_project_delta(request, project_slug, version):
+    """
+    List the files that have changed since an earlier version of a
+    published project, given by the 'since' parameter.
+
+    The download URLs of the added and modified files are listed one
+    per line, for use with 'wget -i'.  The files themselves are served
+    as usual, so that no worker is occupied building an archive.
+    Removed files are listed by the file manifest view.
+    """
+    utility.check_http_auth(request)
+    since = request.GET.get('since')
+    if not since:
+        raise Http404()
+    projects = _get_viewable_versions(request, project_slug, version, since)
+    if projects is None:
+        return utility.require_http_auth(request)
+    project, old_project = projects
+
+    try:
+        changes = utility.diff_file_manifests(old_project.file_manifest(), project.file_manifest())
+    except FileNotFoundError:
+        raise Http404()
+
+    url_prefix = notification.get_url_prefix(request, bulk_download=True)
+    lines = (url_prefix + reverse('serve_published_project_file',
+                                  args=(project.slug, project.version, entry['path'])) + '\n'
+             for entry in changes if entry['status'] != 'removed')
+    return StreamingHttpResponse(lines, content_type='text/plain; charset=utf-8')
+
+
 def display_published_project_file(request, project_slug, version,
                                    full_file_name):
     """
@@ -1769,8 +1899,7 @@ def display_published_project_file(request, project_slug, version,
     user = request.user
 
     # Anonymous access authentication
-    an_url = request.get_signed_cookie('anonymousaccess', None, max_age=60*60)
-    has_passphrase = project.get_anonymous_url() == an_url
+    has_passphrase = has_anonymous_access(request, project)
 
     if can_view_project_files(project, user) or has_passphrase:
         return display_project_file(request, project, full_file_name)
@@ -1786,6 +1915,248 @@ def display_published_project_file(request, project_slug, version,
                   context, status=403)
 
 
+def published_project_signal(request, project_slug, version, record_name):
+    """
+    Return min/max envelopes of a WFDB record in a published project.
+
+    record_name is the record path relative to the project's file
+    root (without the '.hea' suffix.)  Query parameters:
+
+    - start, end: the time range in seconds (default: the whole record)
+    - points: the maximum number of intervals per signal (default 1000)
+    - format: 'json' (default) or 'binary'
+
+    In binary format, the response contains, for each signal, the
+    array of minimum values followed by the array of maximum values,
+    as 16-bit little-endian integers (-32768 indicates an interval
+    with no valid samples.)  The other response parameters are given
+    in X-WFDB-* headers.
+
+    If a signal pyramid has been built for the record, it is used for
+    zoomed-out views; the returned start, end, and step may then be
+    rounded to a multiple of the pyramid's decimation factor.
+    """
+    try:
+        project = PublishedProject.objects.get(slug=project_slug,
+                                               version=version)
+    except ObjectDoesNotExist:
+        raise Http404()
+
+    user = request.user
+
+    # Anonymous access authentication
+    has_passphrase = has_anonymous_access(request, project)
+
+    if not (can_view_project_files(project, user) or has_passphrase):
+        return JsonResponse({'detail': 'Access denied.'}, status=403)
+
+    try:
+        validate_subdir(record_name)
+        start = float(request.GET.get('start', 0))
+        end = request.GET.get('end')
+        end = float(end) if end is not None else None
+        points = min(int(request.GET.get('points', 1000)), wfdb.MAX_POINTS)
+        if points < 1 or start < 0 or (end is not None and end < start):
+            raise ValueError
+    except (ValidationError, ValueError):
+        return JsonResponse({'detail': 'Invalid parameters.'}, status=400)
+
+    record_path = os.path.join(project.file_root(), record_name)
+    try:
+        header, readers = wfdb.open_record(project.files, record_path)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise Http404()
+    except wfdb.WFDBError as err:
+        return JsonResponse({'detail': str(err)}, status=400)
+    try:
+        pyramid = wfdb.SignalPyramid(project.signal_pyramid_path(record_name))
+    except (OSError, wfdb.WFDBError):
+        pyramid = None
+    try:
+        start_frame = round(start * header.fs)
+        end_frame = header.nsamp if end is None else round(end * header.fs)
+        start_frame, end_frame, step, envelopes = wfdb.read_envelope(
+            header, readers, start_frame, end_frame, points, pyramid)
+    finally:
+        wfdb.close_record(readers)
+        if pyramid is not None:
+            pyramid.close()
+
+    if request.GET.get('format') == 'binary':
+        data = array('h')
+        for mins, maxs in envelopes:
+            for values in (mins, maxs):
+                data.extend(-32768 if v is None else v for v in values)
+        if sys.byteorder == 'big':
+            data.byteswap()
+        response = HttpResponse(data.tobytes(),
+                                content_type='application/octet-stream')
+        response['X-WFDB-Frequency'] = header.fs
+        response['X-WFDB-Start'] = start_frame
+        response['X-WFDB-End'] = end_frame
+        response['X-WFDB-Step'] = step
+        response['X-WFDB-Signals'] = len(envelopes)
+        return response
+
+    return JsonResponse({
+        'record': record_name,
+        'fs': header.fs,
+        'nsamp': header.nsamp,
+        'start': start_frame,
+        'end': end_frame,
+        'step': step,
+        'signals': [
+            {
+                'description': signal.description,
+                'units': signal.units,
+                'gain': signal.gain,
+                'baseline': signal.baseline,
+                'min': mins,
+                'max': maxs,
+            }
+            for signal, (mins, maxs) in zip(header.signals, envelopes)
+        ],
+    })
+
+
+def published_project_file_rows(request, project_slug, version, full_file_name):
+    """
+    Return a page of rows from a CSV file in a published project.
+
+    full_file_name is the file path relative to the project's file
+    root; the file must be a CSV file, optionally gzip-compressed.
+    Query parameters:
+
+    - start: the index of the first row (default 0)
+    - count: the maximum number of rows (default 100)
+
+    Row 0 is the first line of the file.  If the file appears to have
+    a header, that line is also returned as 'header'.
+
+    Rows are located using a line index (see project.rowindex), which
+    is extended as needed and saved with the project's files, so later
+    requests can seek directly to any row that has previously been
+    scanned.  Each request scans a limited amount of the file (see
+    project.fileviews.csv.MAX_SCAN_BYTES); if the requested row lies
+    beyond that, the response has status 416 and gives the number of
+    rows indexed so far, and a later request can continue from there.
+    """
+    try:
+        project = PublishedProject.objects.get(slug=project_slug,
+                                               version=version)
+    except ObjectDoesNotExist:
+        raise Http404()
+
+    user = request.user
+
+    # Anonymous access authentication
+    has_passphrase = has_anonymous_access(request, project)
+
+    if not (can_view_project_files(project, user) or has_passphrase):
+        return JsonResponse({'detail': 'Access denied.'}, status=403)
+
+    try:
+        validate_subdir(full_file_name)
+        start = int(request.GET.get('start', 0))
+        count = int(request.GET.get('count', 100))
+        if start < 0 or count < 1:
+            raise ValueError
+    except (ValidationError, ValueError):
+        return JsonResponse({'detail': 'Invalid parameters.'}, status=400)
+
+    if not full_file_name.endswith(('.csv', '.csv.gz')):
+        return JsonResponse({'detail': 'Not a CSV file.'}, status=400)
+
+    abs_path = os.path.join(project.file_root(), full_file_name)
+    try:
+        infile = project.files.open(abs_path)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise Http404()
+
+    with infile:
+        index = (project.files.load_preview_index(project, full_file_name, infile.size)
+                 or rowindex.LineIndex(infile.size))
+        scanned = (index.scan_lines, index.complete)
+        if full_file_name.endswith('.gz'):
+            file = rowindex.GzipReader(infile, key=(abs_path, infile.size),
+                                       max_bytes=MAX_SCAN_BYTES)
+        else:
+            file = infile
+        try:
+            header_row, start, rows = read_rows(file, index, start, count)
+            error = None
+        except rowindex.ScanLimitExceeded:
+            error = JsonResponse({'detail': 'Range not available.',
+                                  'indexed_rows': index.scan_lines}, status=416)
+        except (OSError, EOFError):
+            return JsonResponse({'detail': 'Invalid compressed file.'}, status=400)
+
+    if (index.scan_lines, index.complete) != scanned:
+        try:
+            project.files.save_preview_index(project, full_file_name, index)
+        except Exception:
+            LOGGER.exception('Cannot save preview index for {} of {}'.format(full_file_name, project))
+    if error:
+        return error
+
+    return JsonResponse({
+        'file': full_file_name,
+        'header': header_row,
+        'start': start,
+        'rows': rows,
+        'total_rows': index.scan_lines if index.complete else None,
+    })
+
+
+def published_project_file_columns(request, project_slug, version, full_file_name):
+    """
+    Return the schema and column statistics of a Parquet file in a
+    published project.
+
+    full_file_name is the file path relative to the project's file
+    root.  Only the file's footer metadata is read.
+    """
+    try:
+        project = PublishedProject.objects.get(slug=project_slug,
+                                               version=version)
+    except ObjectDoesNotExist:
+        raise Http404()
+
+    user = request.user
+
+    # Anonymous access authentication
+    has_passphrase = has_anonymous_access(request, project)
+
+    if not (can_view_project_files(project, user) or has_passphrase):
+        return JsonResponse({'detail': 'Access denied.'}, status=403)
+
+    try:
+        validate_subdir(full_file_name)
+    except ValidationError:
+        return JsonResponse({'detail': 'Invalid parameters.'}, status=400)
+
+    abs_path = os.path.join(project.file_root(), full_file_name)
+    try:
+        infile = project.files.open(abs_path)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise Http404()
+
+    with infile:
+        try:
+            metadata = parquet.read_metadata(infile, infile.size)
+            columns = parquet.column_statistics(metadata)
+        except parquet.ParquetError as err:
+            return JsonResponse({'detail': str(err)}, status=400)
+
+    return JsonResponse({
+        'file': full_file_name,
+        'num_rows': metadata.num_rows,
+        'num_row_groups': len(metadata.row_groups),
+        'created_by': metadata.created_by,
+        'columns': columns,
+    })
+
+
 def serve_published_project_zip(request, project_slug, version):
     """
     Serve the zip file of a published project.
@@ -1802,8 +2173,7 @@ def serve_published_project_zip(request, project_slug, version):
     user = request.user
 
     # Anonymous access authentication
-    an_url = request.get_signed_cookie('anonymousaccess', None, max_age=60*60)
-    has_passphrase = project.get_anonymous_url() == an_url
+    has_passphrase = has_anonymous_access(request, project)
 
     if can_view_project_files(project, user) or has_passphrase:
         try:
@@ -1898,8 +2268,7 @@ def published_project(request, project_slug, version, subdir=''):
     main_platform_citation = next((item for item in platform_citations.values() if item is not None), '')
 
     # Anonymous access authentication
-    an_url = request.get_signed_cookie('anonymousaccess', None, max_age=60 * 60)
-    has_passphrase = project.get_anonymous_url() == an_url
+    has_passphrase = has_anonymous_access(request, project)
 
     can_view_files = can_view_project_files(project, user) or has_passphrase
     is_authorized = can_access_project(project, user) or has_passphrase
@@ -1927,6 +2296,10 @@ def published_project(request, project_slug, version, subdir=''):
     current_site = get_current_site(request)
     bulk_url_prefix = notification.get_url_prefix(request, bulk_download=True)
     all_project_versions = PublishedProject.objects.filter(slug=project_slug).order_by('version_order')
+    previous_version = None
+    for other_version in all_project_versions:
+        if other_version.version_order < project.version_order:
+            previous_version = other_version
     context = {
         'project': project,
         'authors': authors,
@@ -1947,6 +2320,7 @@ def published_project(request, project_slug, version, subdir=''):
         'citations': citations,
         'news': news,
         'all_project_versions': all_project_versions,
+        'previous_version': previous_version,
         'parent_projects': parent_projects,
         'data_access': data_access,
         'messages': messages.get_messages(request),
@@ -1960,10 +2334,10 @@ def published_project(request, project_slug, version, subdir=''):
     # The file and directory contents
     if can_view_files:
         if user.is_authenticated:
-            AccessLog.objects.update_or_create(project=project, user=request.user)
+            AccessLog.objects.record(project=project, user=request.user)
 
         (display_files, display_dirs, dir_breadcrumbs, parent_dir,
-         file_error) = get_project_file_info(project=project, subdir=subdir)
+         file_error) = get_project_file_info(project=project, subdir=subdir, request=request)
         if file_error:
             status = 404
         else:
@@ -2034,9 +2408,10 @@ def sign_dua(request, project_slug, version):
     license_content = project.license_content(fmt='html')
 
     if request.method == 'POST' and 'agree' in request.POST:
-        DUASignature.objects.create(user=user, project=project)
-        if has_s3_credentials() and files_sent_to_S3(project) is not None:
-            update_aws_bucket_policy(project.id)
+        with transaction.atomic():
+            DUASignature.objects.create(user=user, project=project)
+            if has_s3_credentials() and files_sent_to_S3(project) is not None:
+                update_aws_bucket_policy(project.id)
         return render(request, 'project/sign_dua_complete.html', {
             'project':project})
 
@@ -2378,10 +2753,17 @@ def anonymous_login(request, anonymous_url):
         if form.is_valid():
             # Validates passphrase
             passphrase = request.POST["passphrase"]
+            wait = anonymous_login_throttled(request, anonymous_url)
+            if wait:
+                messages.error(request, 'Too many attempts. Please try again later.')
+                throttled = render(request, 'project/anonymous_login.html', {'anonymous_url': anonymous_url,
+                                   'form': form}, status=429)
+                throttled['Retry-After'] = str(wait)
+                return throttled
             if project.is_valid_passphrase(passphrase):
                 # Set cookie and redirects to project page
-                response.set_signed_cookie('anonymousaccess', anonymous_url,
-                                           max_age=60*60, httponly=True,
+                response.set_signed_cookie(ANONYMOUS_ACCESS_COOKIE, anonymous_url,
+                                           max_age=ANONYMOUS_ACCESS_MAX_AGE, httponly=True,
                                            secure=(not settings.DEBUG),
                                            samesite='Lax')
                 return response
@@ -2429,6 +2811,6 @@ def generate_signed_url(request, project_slug):
     )
 
     data = f'filename: {filename};size: {size // (1024)}kB'
-    GCPLog.objects.update_or_create(project=project, user=request.user, data=data)
+    GCPLog.objects.record(project=project, user=request.user, data=data)
 
     return JsonResponse({'url': url})
@@ -0,0 +1,645 @@
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+# Number of bytes occupied by a group of samples, and number of
+# samples in that group, for each supported storage format.
+_FORMAT_GROUP = {
+    16: (2, 1),
+    80: (1, 1),
+    212: (3, 2),
+}
+
+# Sample values that WFDB uses to indicate missing data.
+INVALID_SAMPLE = {
+    16: -32768,
+    80: -128,
+    212: -2048,
+}
+
+# Maximum number of frames decoded in memory at one time.
+CHUNK_FRAMES = 1 << 20
+
+# Maximum number of intervals that may be requested by read_envelope().
+MAX_POINTS = 10000
+
+_record_line = re.compile(r'(?P<name>[^\s/]+)(?:/(?P<nseg>\d+))?\s+(?P<nsig>\d+)'
+                          r'(?:\s+(?P<fs>[\d.eE+-]+)\S*(?:\s+(?P<nsamp>\d+))?)?')
+_format_spec = re.compile(r'(?P<fmt>\d+)(?:x(?P<spf>\d+))?(?::(?P<skew>\d+))?'
+                          r'(?:\+(?P<offset>\d+))?')
+_gain_spec = re.compile(r'(?P<gain>[\d.eE+-]+)(?:\((?P<baseline>-?\d+)\))?'
+                        r'(?:/(?P<units>\S+))?')
+
+# Translation tables used to sign-extend the high nibbles of format
+# 212 samples into a full byte.
+_212_HIGH_FIRST = bytes(((b & 0x0f) | (0xf0 if b & 0x08 else 0)) for b in range(256))
+_212_HIGH_SECOND = bytes(((b >> 4) | (0xf0 if b & 0x80 else 0)) for b in range(256))
+# Translation table converting offset binary (format 80) to signed bytes.
+_80_SIGNED = bytes(((b - 128) & 0xff) for b in range(256))
+
+
+class WFDBError(Exception):
+    """Exception raised if a WFDB record cannot be read."""
+    pass
+
+
+class SignalInfo():
+    """
+    Description of one signal in a WFDB record.
+    """
+    def __init__(self, file_name, fmt, byte_offset, gain, baseline, units,
+                 adc_zero, initial_value, description):
+        self.file_name = file_name
+        self.fmt = fmt
+        self.byte_offset = byte_offset
+        self.gain = gain
+        self.baseline = baseline
+        self.units = units
+        self.adc_zero = adc_zero
+        self.initial_value = initial_value
+        self.description = description
+
+
+class SignalFile():
+    """
+    A signal file and the (interleaved) signals it contains.
+
+    indices lists the positions of the file's signals within the
+    record, in the order in which they are stored in each frame.
+    """
+    def __init__(self, name, fmt, byte_offset):
+        self.name = name
+        self.fmt = fmt
+        self.byte_offset = byte_offset
+        self.indices = []
+
+
+class RecordHeader():
+    """
+    Contents of a WFDB header (.hea) file.
+
+    Only single-segment records, in which every signal has one sample
+    per frame, are supported.
+    """
+    def __init__(self, name, fs, nsamp, signals):
+        self.name = name
+        self.fs = fs
+        self.nsamp = nsamp
+        self.signals = signals
+
+    def signal_files(self):
+        """
+        Group the record's signals according to the files that
+        contain them.
+        """
+        files = {}
+        for index, signal in enumerate(self.signals):
+            try:
+                sfile = files[signal.file_name]
+            except KeyError:
+                sfile = files[signal.file_name] = SignalFile(
+                    signal.file_name, signal.fmt, signal.byte_offset)
+            if sfile.fmt != signal.fmt:
+                raise WFDBError('Mixed formats in {}'.format(signal.file_name))
+            sfile.indices.append(index)
+        return list(files.values())
+
+
+def parse_header(text, default_name=''):
+    """
+    Parse the text of a WFDB header file.
+
+    >>> h = parse_header('100 2 360 650000\\n'
+    ...                  '100.dat 212 200 11 1024 995 -22131 0 MLII\\n'
+    ...                  '100.dat 212 200/uV 11 1024 1011 20052 0 V5\\n')
+    >>> (h.name, h.fs, h.nsamp)
+    ('100', 360.0, 650000)
+    >>> [(s.description, s.gain, s.baseline, s.units) for s in h.signals]
+    [('MLII', 200.0, 1024, 'mV'), ('V5', 200.0, 1024, 'uV')]
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            lines.append(line)
+    if not lines:
+        raise WFDBError('Empty header file')
+
+    match = _record_line.match(lines[0])
+    if not match:
+        raise WFDBError('Invalid record line')
+    if match.group('nseg'):
+        raise WFDBError('Multi-segment records are not supported')
+    nsig = int(match.group('nsig'))
+    try:
+        fs = float(match.group('fs') or 250)
+    except ValueError:
+        raise WFDBError('Invalid sampling frequency')
+    nsamp = int(match.group('nsamp') or 0)
+
+    if len(lines) < nsig + 1:
+        raise WFDBError('Missing signal specifications')
+
+    signals = []
+    for line in lines[1:nsig + 1]:
+        fields = line.split(maxsplit=8)
+        if len(fields) < 2:
+            raise WFDBError('Invalid signal specification')
+        fspec = _format_spec.fullmatch(fields[1])
+        if not fspec:
+            raise WFDBError('Invalid signal format {}'.format(fields[1]))
+        fmt = int(fspec.group('fmt'))
+        if fmt not in _FORMAT_GROUP:
+            raise WFDBError('Unsupported signal format {}'.format(fmt))
+        if int(fspec.group('spf') or 1) != 1 or int(fspec.group('skew') or 0):
+            raise WFDBError('Multi-frequency and skewed signals are not supported')
+
+        gain, baseline, units = 200.0, None, 'mV'
+        if len(fields) > 2:
+            gspec = _gain_spec.fullmatch(fields[2])
+            if not gspec:
+                raise WFDBError('Invalid gain {}'.format(fields[2]))
+            gain = float(gspec.group('gain')) or 200.0
+            if gspec.group('baseline') is not None:
+                baseline = int(gspec.group('baseline'))
+            units = gspec.group('units') or units
+
+        try:
+            adc_zero = int(fields[4]) if len(fields) > 4 else 0
+            initial_value = int(fields[5]) if len(fields) > 5 else adc_zero
+        except ValueError:
+            raise WFDBError('Invalid signal specification')
+        if baseline is None:
+            baseline = adc_zero
+
+        signals.append(SignalInfo(
+            file_name=fields[0],
+            fmt=fmt,
+            byte_offset=int(fspec.group('offset') or 0),
+            gain=gain,
+            baseline=baseline,
+            units=units,
+            adc_zero=adc_zero,
+            initial_value=initial_value,
+            description=(fields[8] if len(fields) > 8 else ''),
+        ))
+
+    return RecordHeader(name=match.group('name') or default_name,
+                        fs=fs, nsamp=nsamp, signals=signals)
+
+
+def decode_samples(data, fmt):
+    """
+    Convert a string of bytes into an array of sample values.
+
+    The result is a flat sequence of samples (for a file that
+    contains multiple signals, the samples of each frame are stored
+    consecutively.)  data must contain a whole number of sample
+    groups (i.e., for format 212, a multiple of three bytes.)
+
+    All of the conversions are performed using bytes and array
+    operations, so that the work is done by the interpreter's C code
+    rather than by a Python loop over individual samples.
+
+    >>> list(decode_samples(bytes([0xe4, 0x13, 0x03]), 212))
+    [996, 259]
+    >>> list(decode_samples(bytes([0xff, 0x0f, 0x00]), 212))
+    [-1, 0]
+    >>> list(decode_samples(bytes([0xef, 0xff, 0x00, 0x80]), 16))
+    [-17, -32768]
+    >>> list(decode_samples(bytes([0, 128, 255]), 80))
+    [-128, 0, 127]
+    """
+    if fmt == 16:
+        samples = array('h')
+        samples.frombytes(data)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+    elif fmt == 80:
+        samples = array('b')
+        samples.frombytes(data.translate(_80_SIGNED))
+    elif fmt == 212:
+        # Each three bytes contain two 12-bit samples: the first is
+        # the first byte plus the low nibble of the second byte; the
+        # second is the third byte plus the high nibble of the second
+        # byte.  Rearrange these into 16-bit little-endian values.
+        middle = data[1::3]
+        buf = bytearray(len(data) // 3 * 4)
+        buf[0::4] = data[0::3]
+        buf[1::4] = middle.translate(_212_HIGH_FIRST)
+        buf[2::4] = data[2::3]
+        buf[3::4] = middle.translate(_212_HIGH_SECOND)
+        samples = array('h')
+        samples.frombytes(buf)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+    else:
+        raise WFDBError('Unsupported signal format {}'.format(fmt))
+    return samples
+
+
+class _SignalFileReader:
+    """
+    Random access to the frames stored in one signal file.
+
+    If the underlying file object supports it, the file is
+    memory-mapped, so that reading a range of frames only touches the
+    pages that are needed.
+    """
+    def __init__(self, file, sfile):
+        self.file = file
+        self.fmt = sfile.fmt
+        self.nsig = len(sfile.indices)
+        self.byte_offset = sfile.byte_offset
+        self.group_bytes, self.group_samples = _FORMAT_GROUP[self.fmt]
+        try:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            size = len(self.map)
+        except (AttributeError, OSError, ValueError):
+            self.map = None
+            size = file.size
+        data_bytes = max(size - self.byte_offset, 0)
+        total_samples = (data_bytes // self.group_bytes) * self.group_samples
+        self.nframes = total_samples // self.nsig
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def _read(self, offset, length):
+        if self.map is not None:
+            return self.map[offset:offset + length]
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def read_frames(self, start, end):
+        """
+        Read and decode frames start (inclusive) through end
+        (exclusive), returning a flat array of samples.
+        """
+        end = min(end, self.nframes)
+        if end <= start:
+            return decode_samples(b'', self.fmt)
+
+        # Sample groups may span frame boundaries (e.g. format 212
+        # with an odd number of signals), so read whole groups and
+        # discard the excess.
+        first = start * self.nsig
+        last = end * self.nsig
+        group_first = first // self.group_samples
+        group_last = -(-last // self.group_samples)
+        data = self._read(self.byte_offset + group_first * self.group_bytes,
+                          (group_last - group_first) * self.group_bytes)
+        data = data[:len(data) - len(data) % self.group_bytes]
+        samples = decode_samples(data, self.fmt)
+        skip = first - group_first * self.group_samples
+        return samples[skip:skip + (last - first)]
+
+
+def open_record(files, record_path):
+    """
+    Open a WFDB record stored in a project.
+
+    files is a project's files object (see
+    project.projectfiles.base.BaseProjectFiles) and record_path is
+    the absolute path of the record, without the '.hea' suffix.
+
+    Returns a tuple (header, readers), where readers is a list of
+    (SignalFile, reader) pairs.  The readers must be closed by the
+    caller using close_record().
+    """
+    with files.open(record_path + '.hea') as hfile:
+        text = hfile.read(1024 * 1024).decode('ISO-8859-1')
+    header = parse_header(text, os.path.basename(record_path))
+
+    record_dir = os.path.dirname(record_path)
+    readers = []
+    try:
+        for sfile in header.signal_files():
+            if os.path.basename(sfile.name) != sfile.name:
+                raise WFDBError('Invalid signal file name')
+            file = files.open(os.path.join(record_dir, sfile.name))
+            readers.append((sfile, _SignalFileReader(file, sfile)))
+    except BaseException:
+        close_record(readers)
+        raise
+
+    if not header.nsamp:
+        header.nsamp = min((r.nframes for _, r in readers), default=0)
+    return header, readers
+
+
+def list_records(files, directory):
+    """
+    List the WFDB records in a project directory.
+
+    The RECORDS file in the directory is read; entries ending with a
+    slash are treated as subdirectories, which are listed recursively.
+    Record names are returned relative to the given directory.
+    """
+    try:
+        with files.open(os.path.join(directory, 'RECORDS')) as rfile:
+            lines = rfile.read().decode('ISO-8859-1').splitlines()
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    for line in lines:
+        name = line.strip()
+        if not name or name.startswith(('#', '/')) or '..' in name.split('/'):
+            continue
+        if name.endswith('/'):
+            for record in list_records(files, os.path.join(directory, name)):
+                yield name + record
+        else:
+            yield name
+
+
+def close_record(readers):
+    for _, reader in readers:
+        reader.close()
+
+
+def _bucket_extrema(samples, invalid):
+    """
+    Return the minimum and maximum valid values in a sequence.
+
+    If the sequence contains no valid samples, return (None, None).
+    """
+    low = min(samples)
+    if low == invalid:
+        valid = [v for v in samples if v != invalid]
+        if not valid:
+            return None, None
+        return min(valid), max(valid)
+    return low, max(samples)
+
+
+def compute_envelope(header, readers, start, end, step):
+    """
+    Compute min/max envelopes using intervals of a fixed length.
+
+    The frames between start (inclusive) and end (exclusive) are
+    divided into intervals of `step` frames (the last interval may be
+    shorter), and the minimum and maximum sample value of each signal
+    within each interval is calculated.
+
+    The record is read in bounded chunks, so that memory usage does
+    not depend on the length of the requested interval.
+
+    Returns a list containing a (mins, maxs) pair of lists for each
+    signal, each with one value per interval.  Values are expressed in
+    ADC units; missing samples (including frames beyond the end of a
+    truncated signal file) are skipped, and intervals with no valid
+    samples are None.
+    """
+    envelopes = [([], []) for _ in header.signals]
+
+    chunk = max(step, CHUNK_FRAMES // step * step)
+    for chunk_start in range(start, end, chunk):
+        chunk_end = min(chunk_start + chunk, end)
+        intervals = -(-(chunk_end - chunk_start) // step)
+        for sfile, reader in readers:
+            samples = reader.read_frames(chunk_start, chunk_end)
+            count = len(samples) // reader.nsig
+            invalid = INVALID_SAMPLE[reader.fmt]
+            for position, index in enumerate(sfile.indices):
+                values = samples[position::reader.nsig]
+                mins, maxs = envelopes[index]
+                for i in range(0, count, step):
+                    low, high = _bucket_extrema(values[i:i + step], invalid)
+                    mins.append(low)
+                    maxs.append(high)
+                padding = intervals - -(-count // step)
+                mins.extend([None] * padding)
+                maxs.extend([None] * padding)
+
+    return envelopes
+
+
+def read_envelope(header, readers, start, end, points, pyramid=None):
+    """
+    Compute min/max envelopes for each signal of a WFDB record.
+
+    header and readers are the values returned by open_record().  The
+    frames between start (inclusive) and end (exclusive) are divided
+    into at most `points` intervals of equal length (the last interval
+    may be shorter), and the minimum and maximum sample value of each
+    signal within each interval is calculated.  If the number of
+    frames is less than or equal to `points`, each interval consists
+    of a single frame, so the minimum and maximum are equal to the raw
+    sample values.
+
+    If pyramid is a SignalPyramid for the record, and the intervals
+    are long enough to use one of its levels, the envelopes are
+    computed from the pyramid rather than from the signal files.  In
+    that case, start, end, and the interval length are rounded
+    outwards to multiples of the level's decimation factor.
+
+    Returns a tuple (start, end, step, envelopes), where envelopes is
+    a list containing a (mins, maxs) pair of lists for each signal.
+    Values are expressed in ADC units; missing samples are skipped,
+    and intervals with no valid samples are None.
+    """
+    end = min(end, header.nsamp)
+    start = max(0, min(start, end))
+    nframes = end - start
+    step = max(1, -(-nframes // max(points, 1)))
+
+    if pyramid is not None and pyramid.matches(header):
+        factor = pyramid.best_factor(step)
+        if factor:
+            start = start // factor * factor
+            end = min(-(-end // factor) * factor, header.nsamp)
+            step = -(-step // factor) * factor
+            return start, end, step, pyramid.envelope(start, end, step)
+
+    return start, end, step, compute_envelope(header, readers, start, end, step)
+
+
+# Decimation factors of the levels stored in a signal pyramid.  Each
+# factor must be a multiple of the previous one, and CHUNK_FRAMES
+# must be a multiple of every factor.
+PYRAMID_LEVELS = (16, 256, 4096)
+
+_PYRAMID_MAGIC = b'WFDBPYR1'
+_PYRAMID_HEADER = struct.Struct('<8sIIQ')
+_PYRAMID_LEVEL = struct.Struct('<IQ')
+
+# Values stored in a pyramid for an interval with no valid samples.
+# Since the minimum is greater than the maximum, these values act as
+# identity elements when intervals are combined.
+_EMPTY_MIN = 32767
+_EMPTY_MAX = -32768
+
+
+def _interleave(columns):
+    """
+    Interleave equal-length sample arrays into a single array.
+
+    >>> list(_interleave([array('h', [1, 2]), array('h', [3, 4])]))
+    [1, 3, 2, 4]
+    """
+    count = len(columns)
+    result = array('h', bytes(2 * count * len(columns[0])))
+    for position, column in enumerate(columns):
+        result[position::count] = column
+    return result
+
+
+def _reduce_level(mins, maxs, factor):
+    """
+    Combine groups of adjacent intervals of a pyramid level.
+
+    >>> _reduce_level(array('h', [1, 5, 32767]), array('h', [3, 9, -32768]), 2)
+    (array('h', [1, 32767]), array('h', [9, -32768]))
+    """
+    return (array('h', (min(mins[i:i + factor]) for i in range(0, len(mins), factor))),
+            array('h', (max(maxs[i:i + factor]) for i in range(0, len(maxs), factor))))
+
+
+def _write_level_data(file, columns):
+    data = _interleave(columns)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    file.write(data.tobytes())
+
+
+def write_pyramid(header, readers, path):
+    """
+    Build a min/max pyramid for a WFDB record and save it to a file.
+
+    header and readers are the values returned by open_record().  For
+    each factor in PYRAMID_LEVELS, the minimum and maximum of each
+    signal over each interval of `factor` frames are stored, so that
+    envelopes of long intervals can later be computed without reading
+    the entire record (see SignalPyramid.)
+
+    The pyramid is written to a temporary file which is renamed to
+    `path` once it is complete.
+    """
+    nsig = len(header.signals)
+    levels = [tempfile.TemporaryFile() for _ in PYRAMID_LEVELS]
+    try:
+        for chunk_start in range(0, header.nsamp, CHUNK_FRAMES):
+            chunk_end = min(chunk_start + CHUNK_FRAMES, header.nsamp)
+            envelopes = compute_envelope(header, readers, chunk_start, chunk_end,
+                                         PYRAMID_LEVELS[0])
+            columns = [
+                (array('h', (_EMPTY_MIN if v is None else v for v in mins)),
+                 array('h', (_EMPTY_MAX if v is None else v for v in maxs)))
+                for mins, maxs in envelopes
+            ]
+            previous = PYRAMID_LEVELS[0]
+            for factor, level_file in zip(PYRAMID_LEVELS, levels):
+                if factor != previous:
+                    columns = [_reduce_level(mins, maxs, factor // previous)
+                               for mins, maxs in columns]
+                _write_level_data(level_file, [c for pair in columns for c in pair])
+                previous = factor
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            out.write(_PYRAMID_HEADER.pack(_PYRAMID_MAGIC, nsig, len(PYRAMID_LEVELS),
+                                           header.nsamp))
+            for factor in PYRAMID_LEVELS:
+                out.write(_PYRAMID_LEVEL.pack(factor, -(-header.nsamp // factor)))
+            for level_file in levels:
+                level_file.seek(0)
+                shutil.copyfileobj(level_file, out)
+        os.replace(tmp_path, path)
+    finally:
+        for level_file in levels:
+            level_file.close()
+
+
+class SignalPyramid:
+    """
+    A precomputed min/max pyramid created by write_pyramid().
+
+    The file consists of a header listing the number of signals, the
+    number of frames in the record, and the decimation factor and
+    number of intervals of each level, followed by the data of each
+    level in turn.  Each interval of a level is stored as a minimum
+    and maximum (little-endian, 16-bit) for each signal.
+    """
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap cannot map an empty file
+            self._data = b''
+        try:
+            magic, self.nsig, nlevels, self.nsamp = _PYRAMID_HEADER.unpack_from(self._data)
+            if magic != _PYRAMID_MAGIC:
+                raise WFDBError('Invalid signal pyramid')
+            self.levels = {}
+            offset = _PYRAMID_HEADER.size + nlevels * _PYRAMID_LEVEL.size
+            for i in range(nlevels):
+                factor, npoints = _PYRAMID_LEVEL.unpack_from(
+                    self._data, _PYRAMID_HEADER.size + i * _PYRAMID_LEVEL.size)
+                self.levels[factor] = (npoints, offset)
+                offset += npoints * self.nsig * 4
+            if offset > len(self._data):
+                raise WFDBError('Truncated signal pyramid')
+        except struct.error:
+            self.close()
+            raise WFDBError('Invalid signal pyramid')
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def matches(self, header):
+        """Check whether the pyramid is consistent with a record header."""
+        return self.nsig == len(header.signals) and self.nsamp == header.nsamp
+
+    def best_factor(self, step):
+        """
+        Return the largest decimation factor not exceeding step, or
+        None if step is smaller than every level's factor.
+        """
+        return max((f for f in self.levels if f <= step), default=None)
+
+    def envelope(self, start, end, step):
+        """
+        Compute min/max envelopes from the pyramid.
+
+        start, end, and step must be multiples of one of the levels'
+        decimation factors (except that end may equal the length of
+        the record.)  The result has the same form as
+        compute_envelope().
+        """
+        factor = self.best_factor(step)
+        npoints, offset = self.levels[factor]
+        first = start // factor
+        last = min(-(-end // factor), npoints)
+        group = step // factor
+        width = 2 * self.nsig
+
+        data = array('h')
+        data.frombytes(self._data[offset + first * width * 2:offset + last * width * 2])
+        if sys.byteorder != 'little':
+            data.byteswap()
+
+        envelopes = []
+        for index in range(self.nsig):
+            mins, maxs = _reduce_level(data[2 * index::width], data[2 * index + 1::width], group)
+            envelopes.append(([None if lo > hi else lo for lo, hi in zip(mins, maxs)],
+                              [None if lo > hi else hi for lo, hi in zip(mins, maxs)]))
+        return envelopes
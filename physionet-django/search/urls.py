@@ -29,12 +29,27 @@
     re_path('^files/(?P<project_slug>[\w-]+)/(?P<version>[\d\.]+)/(?P<full_file_name>.*)$',
         project_views.serve_published_project_file,
         name='serve_published_project_file'),
+    re_path('^manifest/(?P<project_slug>[\w-]+)/(?P<version>[\d\.]+)/$',
+        project_views.published_project_file_manifest,
+        name='published_project_file_manifest'),
     re_path('^content/(?P<project_slug>[\w\-]+)/(?P<version>[\d\.]+)/(?P<full_file_name>.+)$',
         project_views.display_published_project_file,
         name='display_published_project_file'),
+    re_path('^signals/(?P<project_slug>[\w\-]+)/(?P<version>[\d\.]+)/(?P<record_name>.+)$',
+        project_views.published_project_signal,
+        name='published_project_signal'),
+    re_path('^rows/(?P<project_slug>[\w\-]+)/(?P<version>[\d\.]+)/(?P<full_file_name>.+)$',
+        project_views.published_project_file_rows,
+        name='published_project_file_rows'),
+    re_path('^columns/(?P<project_slug>[\w\-]+)/(?P<version>[\d\.]+)/(?P<full_file_name>.+)$',
+        project_views.published_project_file_columns,
+        name='published_project_file_columns'),
     path('content/<project_slug>/get-zip/<version>/',
         project_views.serve_published_project_zip,
         name='serve_published_project_zip'),
+    path('content/<project_slug>/get-delta/<version>/',
+        project_views.serve_published_project_delta,
+        name='serve_published_project_delta'),
     path(
         'content/<project_slug>/view-license/<version>/',
         project_views.published_project_license,
@@ -115,7 +130,13 @@
     'published_files_panel': {'_query_': {'subdir': 'doc'}},
     'published_project_subdir': {'subdir': 'doc'},
     'serve_published_project_file': {'full_file_name': 'Makefile'},
+    'serve_published_project_delta': {'_query_': {'since': '10.5.24'}},
     'display_published_project_file': {'full_file_name': 'Makefile'},
+    'published_project_signal': {'project_slug': 'demobsn', 'version': '1.0',
+                                 'record_name': '231'},
+    # No CSV or Parquet files in open demo projects; see project.test_views
+    'published_project_file_rows': {'full_file_name': 'example.csv', '_skip_': True},
+    'published_project_file_columns': {'full_file_name': 'example.parquet', '_skip_': True},
 
     'sign_dua': _demo_credentialed_access,
 
@@ -1,8 +1,10 @@
 import logging
 
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
 
-from user.models import User
+from user.models import User, permission_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -33,3 +35,23 @@ def get_user(self, user_id):
             return User.objects.get(pk=user_id)
         except User.DoesNotExist:
             return None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """
+        Return the set of permission strings the user has.
+
+        If settings.PERMISSION_CACHE_TIMEOUT is set, the result is
+        stored in the default cache, so that permissions need not be
+        loaded from the database on every request.  The cached value
+        is invalidated when the user's groups or permissions change
+        (see user.models.invalidate_permission_cache.)
+        """
+        if (settings.PERMISSION_CACHE_TIMEOUT and obj is None and user_obj.is_active
+                and not user_obj.is_anonymous and not hasattr(user_obj, '_perm_cache')):
+            key = permission_cache_key(user_obj.pk)
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj)
+                cache.set(key, permissions, settings.PERMISSION_CACHE_TIMEOUT)
+            user_obj._perm_cache = permissions
+        return super().get_all_permissions(user_obj, obj)
@@ -1,14 +1,41 @@
 import logging
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from user.models import User, AssociatedEmail
 
 LOGGER = logging.getLogger(__name__)
 
+# Number of rows deleted per transaction
+CHUNK_SIZE = 500
+
+
+def delete_in_chunks(queryset, fields, limit):
+    """
+    Delete up to `limit` objects matching a queryset.
+
+    Objects are deleted in chunks of CHUNK_SIZE, each in its own
+    transaction, so that a large backlog does not hold locks for long.
+    Returns a list of tuples of the given fields for each deleted
+    object.
+    """
+    deleted = []
+    while len(deleted) < limit:
+        with transaction.atomic():
+            chunk = list(queryset.order_by('id').values_list('id', *fields)[:min(CHUNK_SIZE, limit - len(deleted))])
+            if not chunk:
+                break
+            queryset.filter(id__in=[row[0] for row in chunk]).delete()
+        deleted += [row[1:] for row in chunk]
+    return deleted
+
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10000,
+                            help='Maximum number of accounts, and of emails, to remove - default is 10000')
 
     def handle(self, *args, **options):
         """
@@ -17,33 +44,26 @@ def handle(self, *args, **options):
         """
         today = timezone.now()
         limit = today - timezone.timedelta(days=3)
-        user_list = User.objects.filter(is_active=False, join_date__lt=limit)
-        deleted = []
-        for user in user_list:
-            deleted.append("\n - Username: {0}\n   Email: {1}\n   Full Name: "
-                           "{2}".format(user.username, user.email,
-                                        user.get_full_name()))
-            user.delete()
+        deleted = delete_in_chunks(
+            User.objects.filter(is_active=False, join_date__lt=limit),
+            ('username', 'email', 'profile__first_names', 'profile__last_name'),
+            options['limit'])
 
         if deleted:
             LOGGER.info("The following accounts were removed:")
-            for line in deleted:
-                LOGGER.info(line)
+            for username, email, first_names, last_name in deleted:
+                LOGGER.info("\n - Username: {0}\n   Email: {1}\n   Full Name: "
+                            "{2} {3}".format(username, email, first_names, last_name))
         LOGGER.info("Total accounts removed {}".format(len(deleted)))
 
-        associated_email_list = AssociatedEmail.objects.filter(
-            is_verified=False, added_date__lt=limit, user__is_active=True)
-        deleted = []
-
-        for associated_email in associated_email_list:
-            deleted.append("\n - Email: {0}\n   Belonged to: {1}\n   Username:"
-                           " {2}".format(associated_email.email,
-                                         associated_email.user.get_full_name(),
-                                         associated_email.user.username))
-            associated_email.delete()
+        deleted = delete_in_chunks(
+            AssociatedEmail.objects.filter(is_verified=False, added_date__lt=limit, user__is_active=True),
+            ('email', 'user__profile__first_names', 'user__profile__last_name', 'user__username'),
+            options['limit'])
 
         if deleted:
             LOGGER.info("The following associated emails were removed:")
-            for line in deleted:
-                LOGGER.info(line)
+            for email, first_names, last_name, username in deleted:
+                LOGGER.info("\n - Email: {0}\n   Belonged to: {1} {2}\n   Username:"
+                            " {3}".format(email, first_names, last_name, username))
         LOGGER.info("Total associated emails removed {}".format(len(deleted)))
@@ -0,0 +1,54 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+import notification.utility as notification
+from user.models import AssociatedEmail
+
+LOGGER = logging.getLogger(__name__)
+
+# Days after which unverified secondary email addresses are removed
+UNVERIFIED_DAY_LIMIT = 15
+
+# Number of addresses removed per transaction
+CHUNK_SIZE = 500
+
+
+def remove_unverified_emails(limit):
+    """
+    Remove up to `limit` secondary email addresses that have not been
+    verified within UNVERIFIED_DAY_LIMIT days, and notify their owners.
+
+    Returns the number of addresses removed.
+    """
+    expired = AssociatedEmail.objects.filter(
+        is_primary_email=False, is_verified=False,
+        added_date__lt=timezone.now() - timezone.timedelta(days=UNVERIFIED_DAY_LIMIT))
+    removed = 0
+    while removed < limit:
+        with transaction.atomic():
+            chunk = list(expired.select_related('user__profile').select_for_update(of=('self',))
+                         .order_by('id')[:min(CHUNK_SIZE, limit - removed)])
+            if not chunk:
+                break
+            expired.filter(id__in=[associated_email.id for associated_email in chunk]).delete()
+            notification.unverified_emails_removed_notify(chunk, UNVERIFIED_DAY_LIMIT)
+        for associated_email in chunk:
+            LOGGER.info(f'Deleted email {associated_email.email} from user {associated_email.user.email}')
+        removed += len(chunk)
+    return removed
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10000,
+                            help='Maximum number of addresses to remove - default is 10000')
+
+    def handle(self, *args, **options):
+        """
+        Remove secondary email addresses that have not been verified.
+        """
+        removed = remove_unverified_emails(options['limit'])
+        LOGGER.info(f'Total unverified emails removed {removed}')
@@ -0,0 +1,29 @@
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from user.models import AssociatedEmail, User
+from user.test_views import TestMixin
+
+
+class TestRemoveUnverifiedEmails(TestMixin):
+
+    def test_remove_unverified_emails(self):
+        AssociatedEmail.objects.update(added_date=timezone.now())
+        user = User.objects.get(username='rgmark')
+        old = timezone.now() - timezone.timedelta(days=30)
+        expired = [AssociatedEmail.objects.create(user=user, email=f'unverified{i}@example.com') for i in range(3)]
+        AssociatedEmail.objects.filter(id__in=[ae.id for ae in expired]).update(added_date=old)
+        recent = AssociatedEmail.objects.create(user=user, email='recent@example.com')
+
+        call_command('remove_unverified_emails', limit=2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, [user.email])
+        self.assertIn(expired[0].email, mail.outbox[0].body)
+        self.assertEqual(AssociatedEmail.objects.filter(id__in=[ae.id for ae in expired]).count(), 1)
+
+        call_command('remove_unverified_emails')
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(AssociatedEmail.objects.filter(id__in=[ae.id for ae in expired]).exists())
+        self.assertTrue(AssociatedEmail.objects.filter(id=recent.id).exists())
+        self.assertTrue(user.associated_emails.filter(is_primary_email=True).exists())
@@ -8,10 +8,11 @@
 # from django.contrib.auth. import user_logged_in
 from django.contrib.auth import signals
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin, Permission, Group
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import EmailValidator, FileExtensionValidator
 from django.db import DatabaseError, models, transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.db.models import CharField, Q
 from django.db.models.functions import Lower
@@ -520,6 +521,68 @@ def update_user_login(sender, **kwargs):
 signals.user_logged_in.connect(update_user_login, sender=User)
 
 
+# Cache key whose value is changed to invalidate all cached permissions
+PERMISSION_CACHE_VERSION_KEY = 'user-permissions-version'
+
+
+def permission_cache_key(user_id):
+    """
+    Return the cache key for a user's permissions.
+    """
+    version = cache.get_or_set(PERMISSION_CACHE_VERSION_KEY, get_random_string(12), None)
+    return f'user-permissions:{version}:{user_id}'
+
+
+def invalidate_permission_cache(user_ids=None):
+    """
+    Remove the cached permissions of the given users, or of all users
+    if user_ids is None.
+    """
+    if not settings.PERMISSION_CACHE_TIMEOUT:
+        return
+    if user_ids is None:
+        cache.set(PERMISSION_CACHE_VERSION_KEY, get_random_string(12), None)
+    else:
+        cache.delete_many([permission_cache_key(user_id) for user_id in user_ids])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidate cached permissions when a user's groups or permissions
+    are changed.
+    """
+    if action.startswith('post_'):
+        if not reverse:
+            invalidate_permission_cache([instance.pk])
+        elif pk_set:
+            invalidate_permission_cache(pk_set)
+        else:
+            invalidate_permission_cache()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Permission)
+def group_permissions_changed(sender, **kwargs):
+    """
+    Invalidate all cached permissions when a group or permission is
+    changed.
+    """
+    if kwargs.get('action', 'post_').startswith('post_'):
+        invalidate_permission_cache()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Invalidate a user's cached permissions when the user is changed
+    (for example, if is_active or is_superuser is changed.)
+    """
+    invalidate_permission_cache([instance.pk])
+
+
 class AssociatedEmail(models.Model):
     """
     An email the user associates with their account
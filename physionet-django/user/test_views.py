@@ -24,6 +24,7 @@
 from django.utils import timezone
 import requests_mock
 
+from physionet.middleware.querycount import QueryRecorder
 from user.enums import TrainingStatus
 from user.models import (
     AssociatedEmail,
@@ -184,6 +185,34 @@ def assertMessage(self, response, level):
         self.assertEqual(max(m.level for m in response.context['messages']),
             level)
 
+    def assertMaxQueries(self, num, func=None, *args, **kwargs):
+        """
+        Assert that at most `num` database queries are executed.
+
+        Like assertNumQueries, this can be used as a context manager,
+        or called with a function and its arguments (for example,
+        self.client.get and a URL), in which case the function's result
+        is returned.
+
+        On failure, the message lists the queries that were executed
+        more than once, which usually indicate a loop that should use
+        select_related or prefetch_related.
+        """
+        context = self._max_queries(num)
+        if func is None:
+            return context
+        with context:
+            return func(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def _max_queries(self, num):
+        with QueryRecorder() as recorder:
+            yield recorder
+        if recorder.count > num:
+            repeated = ''.join(f'\n{n} x {sql}' for (sql, n) in recorder.duplicates()[:10])
+            self.fail(f'{recorder.count} queries executed, {num} expected at most.'
+                      f' Repeated queries:{repeated or " none"}')
+
     def make_get_request(self, viewname, reverse_kwargs=None):
         """
         Helper Function.